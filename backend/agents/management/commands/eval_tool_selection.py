@@ -0,0 +1,82 @@
+from pathlib import Path
+from types import SimpleNamespace
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from agents.services.context_window import count_tokens
+from agents.services.tool_selection import LexicalEmbedder, OpenAIToolEmbedder, ToolSelectionPolicy, ToolSelector
+
+DATASET = Path(__file__).resolve().parents[2] / "evals" / "tool_selection.json"
+
+
+def _schema(spec):
+    properties = {name: {"type": "string", "description": desc} for name, desc in spec["parameters"].items()}
+    return {"type": "function", "function": {"name": spec["name"], "description": spec["description"], "parameters": {"type": "object", "properties": properties}}}
+
+
+def _tool(spec):
+    return SimpleNamespace(name=spec["name"], description=spec["description"], args={k: {"description": v} for k, v in spec["parameters"].items()})
+
+
+class Command(BaseCommand):
+    help = "Offline eval of agent tool selection: recall of the needed tools and tool schema tokens per call."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", default=str(DATASET))
+        parser.add_argument("--top-k", type=int, default=None, help="Defaults to TOOL_SELECTION_TOP_K")
+        parser.add_argument("--embedder", choices=["lexical", "openai"], default="lexical")
+        parser.add_argument("--model", default="gpt-4o-mini", help="Tokenizer used to count schema tokens")
+        parser.add_argument("--verbose", action="store_true", help="Print every case with missed tools")
+
+    def handle(self, *args, **options):
+        data = json.loads(Path(options["file"]).read_text())
+        specs = [*data["pinned"], *(t for tools in data["toolkits"].values() for t in tools)]
+        schemas = {s["name"]: _schema(s) for s in specs}
+        policy = ToolSelectionPolicy.from_settings()
+        policy.enabled, policy.min_tools, policy.min_recall = True, 0, 0.0
+        if options["top_k"]:
+            policy.top_k = options["top_k"]
+        embedder = LexicalEmbedder() if options["embedder"] == "lexical" else OpenAIToolEmbedder(
+            policy.embedding_model or "text-embedding-3-small"
+        )
+        selector = ToolSelector([_tool(s) for s in specs], pinned=[s["name"] for s in data["pinned"]], policy=policy, embedder=embedder)
+
+        def tokens(names):
+            return count_tokens([SystemMessage(content=json.dumps([schemas[n] for n in names], sort_keys=True))], options["model"])
+
+        all_tokens = tokens(list(schemas))
+        started = time.perf_counter()
+        selector.select([HumanMessage(content="warm up")])  # embeds the tool index
+        index_seconds = time.perf_counter() - started
+
+        recalls, bound, bound_tokens, latencies, complete = [], [], [], [], 0
+        for case in data["cases"]:
+            messages = [HumanMessage(content=m["content"]) if m["role"] == "user" else AIMessage(content=m["content"]) for m in case.get("context", [])]
+            messages.append(HumanMessage(content=case["query"]))
+            started = time.perf_counter()
+            selected = selector.select(messages)
+            latencies.append(time.perf_counter() - started)
+            expected = set(case["expected"])
+            hit = expected & set(selected)
+            recalls.append(len(hit) / len(expected))
+            complete += hit == expected
+            bound.append(len(selected))
+            bound_tokens.append(tokens(selected))
+            if options["verbose"] and hit != expected:
+                self.stdout.write(f"MISS {case['query']!r}: {sorted(expected - hit)}")
+
+        n = len(data["cases"])
+        mean_tokens = statistics.mean(bound_tokens)
+        self.stdout.write(f"embedder={embedder.name} top_k={policy.top_k} cases={n} tools={len(schemas)} (pinned {len(data['pinned'])})")
+        self.stdout.write(f"recall={statistics.mean(recalls):.3f} all_needed_bound={complete}/{n}")
+        self.stdout.write(f"tools_bound mean={statistics.mean(bound):.1f} of {len(schemas)}")
+        self.stdout.write(
+            f"schema_tokens mean={mean_tokens:.0f} vs all={all_tokens} ({1 - mean_tokens / all_tokens:.1%} fewer per call)"
+        )
+        self.stdout.write(
+            f"selection_ms index={index_seconds * 1000:.1f} p50={statistics.median(latencies) * 1000:.2f} max={max(latencies) * 1000:.2f}"
+        )
@@ -2,6 +2,7 @@ from typing import Any, Dict, List
 import logging
 
 from agents.models import Agent
+from agents.services.graph_factory import invalidate_agent_graphs
 from agents.services.suggestions import SuggestionGenerator
 from connections.services.composio_service import ComposioService
 
@@ -80,6 +81,8 @@ def finalize_setup(user_id: str, agent_id: str, connections: List[Dict[str, Any]
 
         # Persist only changed fields for clarity
         agent.save(update_fields=["memory", "toolkits", "updated_at"])
+        # Toolkits changed: the next message must bind the new tool set
+        invalidate_agent_graphs(agent_id=agent.id)
 
         # Best-effort: generate suggestions using current toolkit plan and connections
         try:
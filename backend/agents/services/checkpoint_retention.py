@@ -0,0 +1,171 @@
+from __future__ import annotations
+from dataclasses import dataclass, asdict
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, IntegerField, Max, Sum, TextField, Value
+from django.db.models.functions import Cast, Coalesce, Length
+from django.utils import timezone
+
+from chat.models import GraphCheckpoint, GraphCheckpointWrite, Run, Thread
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionPolicy:
+    """What to keep in `chat_graph_checkpoints`.
+
+    - keep_last: newest checkpoints kept per thread (plus the rest of their delta group).
+    - ambient_max_age_days: ambient threads idle this long lose all unprotected checkpoints (0 disables).
+    - batch_size / max_batches: bound each delete statement and the total work per run.
+    """
+    keep_last: int = 50
+    ambient_max_age_days: int = 14
+    batch_size: int = 500
+    max_batches: int = 50
+
+    @classmethod
+    def from_settings(cls) -> "RetentionPolicy":
+        return cls(
+            keep_last=max(1, int(getattr(settings, "CHECKPOINT_RETENTION_KEEP_LAST", cls.keep_last))),
+            ambient_max_age_days=int(getattr(settings, "CHECKPOINT_RETENTION_AMBIENT_DAYS", cls.ambient_max_age_days)),
+            batch_size=max(1, int(getattr(settings, "CHECKPOINT_RETENTION_BATCH_SIZE", cls.batch_size))),
+            max_batches=max(1, int(getattr(settings, "CHECKPOINT_RETENTION_MAX_BATCHES", cls.max_batches))),
+        )
+
+
+@dataclass
+class RetentionReport:
+    threads_scanned: int = 0
+    rows_deleted: int = 0
+    bytes_reclaimed: int = 0
+    batches: int = 0
+    truncated: bool = False
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _group_of(checkpoint_id: str, snapshot_id: str) -> str:
+    # Snapshots (and legacy rows without snapshot_id) anchor their own group
+    return snapshot_id or checkpoint_id
+
+
+def _protected_checkpoint_ids(thread_id: Any) -> Set[str]:
+    """Checkpoints that must survive regardless of age or count."""
+    ids: Set[str] = set(
+        Run.objects.filter(thread_id=thread_id)
+        .exclude(checkpoint_id__isnull=True)
+        .exclude(checkpoint_id="")
+        .values_list("checkpoint_id", flat=True)
+    )
+    # Runs paused on a human-in-the-loop interrupt resume from their own checkpoints
+    ids.update(
+        GraphCheckpoint.objects.filter(thread_id=thread_id, run__status="waiting_human").values_list("checkpoint_id", flat=True)
+    )
+    # Interrupts recorded as pending writes that were never answered with a resume
+    interrupted = set(
+        GraphCheckpointWrite.objects.filter(thread_id=thread_id, channel="__interrupt__").values_list("checkpoint_id", flat=True)
+    )
+    if interrupted:
+        resumed = set(
+            GraphCheckpointWrite.objects.filter(thread_id=thread_id, channel="__resume__", checkpoint_id__in=interrupted)
+            .values_list("checkpoint_id", flat=True)
+        )
+        ids.update(interrupted - resumed)
+    return ids
+
+
+def _deletable_ids(thread_id: Any, keep_last: int) -> List[Any]:
+    """Row ids of `thread_id` outside every protected delta group, oldest first."""
+    rows = list(
+        GraphCheckpoint.objects.filter(thread_id=thread_id)
+        .order_by("-created_at")
+        .values_list("id", "checkpoint_id", "snapshot_id")
+    )
+    if not rows:
+        return []
+    keep = {cid for _, cid, _ in rows[:keep_last]} | _protected_checkpoint_ids(thread_id)
+    protected_groups = {_group_of(cid, sid) for _, cid, sid in rows if cid in keep}
+    candidates = {_group_of(cid, sid) for _, cid, sid in rows} - protected_groups
+    if candidates:
+        # Groups still referenced from other threads (e.g. forks) cannot be dropped
+        protected_groups.update(
+            GraphCheckpoint.objects.filter(snapshot_id__in=candidates)
+            .exclude(thread_id=thread_id)
+            .values_list("snapshot_id", flat=True)
+        )
+    return [pk for pk, cid, sid in reversed(rows) if _group_of(cid, sid) not in protected_groups]
+
+
+def _delete_batch(thread_id: Any, ids: List[Any]) -> tuple[int, int]:
+    """Delete one bounded batch of checkpoints and their pending writes, returning (rows, bytes) reclaimed."""
+    with transaction.atomic():
+        qs = GraphCheckpoint.objects.filter(id__in=ids)
+        size = qs.aggregate(
+            total=Sum(
+                Coalesce(Length("blob"), Value(0), output_field=IntegerField())
+                + Length(Cast("state", TextField()))
+                + Length(Cast("writes", TextField()))
+            )
+        )["total"] or 0
+        writes_qs = GraphCheckpointWrite.objects.filter(thread_id=thread_id, checkpoint_id__in=qs.values("checkpoint_id"))
+        size += writes_qs.aggregate(
+            total=Sum(Coalesce(Length("blob"), Value(0), output_field=IntegerField()))
+        )["total"] or 0
+        writes_qs.delete()
+        deleted, _ = qs.delete()
+    return deleted, int(size)
+
+
+def _candidate_threads(policy: RetentionPolicy) -> Iterable[Any]:
+    over_limit = (
+        GraphCheckpoint.objects.values("thread_id")
+        .annotate(n=Count("id"))
+        .filter(n__gt=policy.keep_last)
+        .values_list("thread_id", flat=True)
+    )
+    for thread_id in over_limit.iterator():
+        yield thread_id, policy.keep_last
+
+
+def _expired_ambient_threads(policy: RetentionPolicy) -> Iterable[Any]:
+    if policy.ambient_max_age_days <= 0:
+        return
+    cutoff = timezone.now() - timedelta(days=policy.ambient_max_age_days)
+    expired = (
+        Thread.objects.filter(is_ambient=True)
+        .annotate(last_checkpoint=Max("checkpoints__created_at"))
+        .filter(last_checkpoint__lt=cutoff)
+        .values_list("id", flat=True)
+    )
+    for thread_id in expired.iterator():
+        yield thread_id, 0
+
+
+def compact_checkpoints(policy: Optional[RetentionPolicy] = None) -> RetentionReport:
+    """Apply the retention policy, deleting in bounded batches; safe to run repeatedly."""
+    policy = policy or RetentionPolicy.from_settings()
+    report = RetentionReport()
+    seen: Set[Any] = set()
+    for source in (_expired_ambient_threads(policy), _candidate_threads(policy)):
+        for thread_id, keep_last in source:
+            if thread_id in seen:
+                continue
+            seen.add(thread_id)
+            report.threads_scanned += 1
+            ids = _deletable_ids(thread_id, keep_last)
+            for start in range(0, len(ids), policy.batch_size):
+                if report.batches >= policy.max_batches:
+                    report.truncated = True
+                    return report
+                rows, size = _delete_batch(thread_id, ids[start:start + policy.batch_size])
+                report.rows_deleted += rows
+                report.bytes_reclaimed += size
+                report.batches += 1
+    return report
@@ -1,6 +1,15 @@
-from typing import Any, Dict, Iterator, List, Optional
-import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import asyncio
+import threading
+import uuid
+import logging
+from django.conf import settings
+from django.core.cache import cache as _shared_cache
 from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 from asgiref.sync import sync_to_async
 
 from langchain_core.runnables import RunnableConfig
@@ -10,23 +19,642 @@ from langgraph.checkpoint.base import (
     CheckpointMetadata,
     CheckpointTuple,
     PendingWrite,
+    WRITES_IDX_MAP,
+    copy_checkpoint,
     get_checkpoint_id,
     get_checkpoint_metadata,
 )
+from langgraph.checkpoint.base.id import uuid6
 
-from chat.models import GraphCheckpoint, Thread, Run
+from chat.models import GraphCheckpoint, GraphCheckpointWrite, Run
+
+try:
+    import zstandard  # optional: compress large checkpoint blobs
+except Exception:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+try:
+    # optional: native async checkpoint I/O on Postgres
+    from psycopg.conninfo import make_conninfo
+    from psycopg.types.json import Jsonb
+    from psycopg_pool import AsyncConnectionPool
+except Exception:  # pragma: no cover
+    AsyncConnectionPool = None  # type: ignore
+
+_ZSTD_SUFFIX = "+zstd"
+# Joins the saver namespace and a subgraph's checkpoint_ns in the checkpoint_ns column
+# (LangGraph namespaces themselves use "|" and ":")
+_NS_SEP = "/"
+
+logger = logging.getLogger(__name__)
+
+
+# Process-wide record of the most recent checkpoint written/read per (thread_id, ns):
+# (checkpoint_id, snapshot_id, depth, channel_values). Lets put() decide between a
+# delta and a full snapshot without reading the parent row back from the DB.
+_CHAIN_HEADS: "OrderedDict[Tuple[str, str], Tuple[str, str, int, Dict[str, Any]]]" = OrderedDict()
+_CHAIN_HEADS_MAX = 1024
+_CHAIN_HEADS_LOCK = threading.Lock()
+
+
+def _remember_head(key: Tuple[str, str], head: Tuple[str, str, int, Dict[str, Any]]) -> None:
+    with _CHAIN_HEADS_LOCK:
+        _CHAIN_HEADS[key] = head
+        _CHAIN_HEADS.move_to_end(key)
+        while len(_CHAIN_HEADS) > _CHAIN_HEADS_MAX:
+            _CHAIN_HEADS.popitem(last=False)
+
+
+def _lookup_head(key: Tuple[str, str]) -> Optional[Tuple[str, str, int, Dict[str, Any]]]:
+    with _CHAIN_HEADS_LOCK:
+        return _CHAIN_HEADS.get(key)
+
+
+# Run each thread's checkpoints are attached to when the caller does not pass
+# configurable.run_id, resolved once per thread instead of on every put().
+_THREAD_RUNS: "OrderedDict[str, str]" = OrderedDict()
+_THREAD_RUNS_MAX = 4096
+_THREAD_RUNS_LOCK = threading.Lock()
+
+
+def _remember_run(thread_id: str, run_id: str) -> None:
+    with _THREAD_RUNS_LOCK:
+        _THREAD_RUNS[thread_id] = run_id
+        _THREAD_RUNS.move_to_end(thread_id)
+        while len(_THREAD_RUNS) > _THREAD_RUNS_MAX:
+            _THREAD_RUNS.popitem(last=False)
+
+
+def _cached_run_id(thread_id: str, cfg: Dict[str, Any]) -> Optional[str]:
+    """Run id for a put(): the one in config (remembered for later callers), else the cached one."""
+    if cfg.get("run_id"):
+        _remember_run(thread_id, str(cfg["run_id"]))
+        return str(cfg["run_id"])
+    with _THREAD_RUNS_LOCK:
+        return _THREAD_RUNS.get(thread_id)
+
+
+def _forget_runs(thread_id: str) -> None:
+    with _THREAD_RUNS_LOCK:
+        _THREAD_RUNS.pop(thread_id, None)
+
+
+def _split_filter(filter: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Split a list() metadata filter into lookups on the indexed source/step/run_id columns
+    and the remaining keys, which are matched against the metadata JSON."""
+    columns: Dict[str, Any] = {}
+    extra: Dict[str, Any] = {}
+    for key, value in (filter or {}).items():
+        if key == "source" and isinstance(value, str):
+            columns["source"] = value
+        elif key == "step" and isinstance(value, int) and not isinstance(value, bool):
+            columns["step"] = value
+        elif key == "run_id" and value:
+            try:
+                columns["run_id"] = uuid.UUID(str(value))
+            except ValueError:
+                extra[key] = value
+        else:
+            extra[key] = value
+    return columns, extra
+
+
+@dataclass
+class _CacheEntry:
+    stamp: str
+    size: int = 0
+    tuple: Optional[CheckpointTuple] = None
+    # Pending writes by checkpoint id, tracked separately: they may arrive before their
+    # checkpoint's put(), possibly several checkpoints ahead of the cached tuple.
+    writes: Dict[str, Dict[Tuple[str, int], PendingWrite]] = field(default_factory=dict)
+
+
+class LatestCheckpointCache:
+    """Byte-bounded LRU of the latest CheckpointTuple per (thread_id, ns), written through
+    on put/put_writes.
+
+    Each entry remembers the version stamp it was built under; the stamp lives in the
+    shared Django cache and is rotated by every put/put_writes, so a write from any
+    other worker turns the next lookup here into a miss.
+    """
+
+    STAMP_TTL = 24 * 3600
+    MAX_ENTRIES = 4096
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries: "OrderedDict[Tuple[str, str], _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _stamp_key(key: Tuple[str, str]) -> str:
+        return f"ckpt:stamp:{key[0]}:{key[1]}"
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def read_stamp(self, key: Tuple[str, str], create: bool = False) -> Optional[str]:
+        """Current shared stamp for `key`; with `create`, seed one if none exists yet."""
+        try:
+            if create:
+                _shared_cache.add(self._stamp_key(key), uuid.uuid4().hex, self.STAMP_TTL)
+            return _shared_cache.get(self._stamp_key(key))
+        except Exception:
+            logger.debug("checkpoint cache: stamp read failed", exc_info=True)
+            return None
+
+    def _rotate_stamp(self, key: Tuple[str, str]) -> Optional[str]:
+        stamp = uuid.uuid4().hex
+        try:
+            _shared_cache.set(self._stamp_key(key), stamp, self.STAMP_TTL)
+        except Exception:
+            logger.debug("checkpoint cache: stamp write failed", exc_info=True)
+            return None
+        return stamp
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.MAX_ENTRIES):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def get(self, key: Tuple[str, str], checkpoint_id: Optional[str] = None) -> Optional[CheckpointTuple]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+        tup = entry.tuple if entry is not None else None
+        if tup is None or (checkpoint_id and checkpoint_id != tup.config["configurable"]["checkpoint_id"]):
+            self.misses += 1
+            return None
+        if self.read_stamp(key) != entry.stamp:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._drop(key)
+            self.misses += 1
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            current = entry.writes.get(tup.config["configurable"]["checkpoint_id"]) or {}
+            writes = [current[k] for k in sorted(current)]
+        self.hits += 1
+        # The pregel loop mutates the checkpoint it is handed; never give out the cached one
+        return CheckpointTuple(tup.config, copy_checkpoint(tup.checkpoint), tup.metadata, tup.parent_config, writes)
+
+    def store(
+        self,
+        key: Tuple[str, str],
+        tup: CheckpointTuple,
+        size: int,
+        stamp: Optional[str] = None,
+        extends: Optional[str] = None,
+    ) -> None:
+        """Cache `tup` as the latest checkpoint. Without `stamp` (a write) the shared stamp is rotated.
+        `extends` is set by put(): the parent a delta was written against (whose size is carried
+        over), or "" for a snapshot. Only puts adopt writes that arrived ahead of them.
+        """
+        if not self.enabled:
+            return
+        stamp = stamp or self._rotate_stamp(key)
+        with self._lock:
+            prev = self._entries.get(key)
+            if extends and prev is not None and prev.tuple is not None and prev.tuple.config["configurable"]["checkpoint_id"] == extends:
+                size += prev.size
+            self._drop(key)
+            if stamp is None or size > self.max_bytes:
+                return
+            cid = tup.config["configurable"]["checkpoint_id"]
+            entry = _CacheEntry(stamp=stamp, size=size, tuple=CheckpointTuple(tup.config, copy_checkpoint(tup.checkpoint), tup.metadata, tup.parent_config, []))
+            if extends is not None and prev is not None:
+                # Writes for this checkpoint (or later ones) that landed before its put()
+                entry.writes = {c: w for c, w in prev.writes.items() if c >= cid}
+            else:
+                entry.writes[cid] = {
+                    (task_id, WRITES_IDX_MAP.get(ch, i)): (task_id, ch, val)
+                    for i, (task_id, ch, val) in enumerate(tup.pending_writes or [])
+                }
+            self._entries[key] = entry
+            self._bytes += size
+            self._evict()
+
+    def add_writes(self, key: Tuple[str, str], checkpoint_id: str, task_id: str, writes: List[Tuple[int, str, Any]]) -> None:
+        if not self.enabled:
+            return
+        stamp = self._rotate_stamp(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if stamp is None:
+                self._drop(key)
+                return
+            if entry is None:
+                # Writes can precede their checkpoint's put(); hold them until it arrives
+                entry = self._entries[key] = _CacheEntry(stamp=stamp)
+                self._evict()
+            entry.stamp = stamp
+            # Checkpoint ids are time-ordered: late writes for an older checkpoint don't touch the latest one
+            if entry.tuple is not None and checkpoint_id < entry.tuple.config["configurable"]["checkpoint_id"]:
+                return
+            pending = entry.writes.setdefault(checkpoint_id, {})
+            for idx, ch, val in writes:
+                if ch in WRITES_IDX_MAP:
+                    pending[(task_id, idx)] = (task_id, ch, val)
+                else:
+                    pending.setdefault((task_id, idx), (task_id, ch, val))
+
+    def invalidate_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == str(thread_id)]:
+                self._drop(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+def _cache_from_settings() -> LatestCheckpointCache:
+    enabled = getattr(settings, "CHECKPOINT_CACHE_ENABLED", False)
+    return LatestCheckpointCache(getattr(settings, "CHECKPOINT_CACHE_MAX_BYTES", 64 * 1024 * 1024) if enabled else 0)
+
+
+# Shared by every DjangoCheckpointer in the process (graphs are compiled per agent)
+LATEST_CHECKPOINTS = _cache_from_settings()
 
 
 class DjangoCheckpointer(BaseCheckpointSaver):
     """Django-backed checkpointer aligned with langgraph-checkpoint v2.1.1.
 
-    Keys by thread_id and optional checkpoint_id. Relies on BaseCheckpointSaver.serde
-    for encoding/decoding complex values, but stores Checkpoint dicts directly in JSON.
+    Keys by thread_id and optional checkpoint_id. Checkpoints are stored as the serde's
+    typed bytes in `GraphCheckpoint.blob` (zstd-compressed above `compress_threshold`);
+    rows written before that are still read from the legacy `state` JSON column.
+
+    Delta mode: a row stores only the channels listed in `new_versions` (list channels
+    that merely grew store just the appended items). Every `snapshot_interval` steps a
+    full snapshot is written; reads replay deltas on top of the nearest snapshot.
     """
 
-    def __init__(self, namespace: str = "default") -> None:
+    # Rows fetched per round trip by list(); pending writes are loaded per chunk
+    list_chunk_size = 100
+
+    def __init__(
+        self,
+        namespace: str = "default",
+        *,
+        delta: Optional[bool] = None,
+        snapshot_interval: Optional[int] = None,
+        compress_threshold: Optional[int] = None,
+    ) -> None:
         super().__init__()
         self.namespace = namespace
+        self.delta = getattr(settings, "CHECKPOINT_DELTA_ENABLED", True) if delta is None else delta
+        interval = snapshot_interval or getattr(settings, "CHECKPOINT_SNAPSHOT_INTERVAL", 20)
+        self.snapshot_interval = max(1, int(interval))
+        if compress_threshold is None:
+            compress_threshold = getattr(settings, "CHECKPOINT_COMPRESS_THRESHOLD", 16384)
+        self.compress_threshold = int(compress_threshold)
+
+    # ---- encoding helpers ----
+    def _encode_blob(self, payload: Dict[str, Any]) -> Tuple[str, bytes]:
+        """Serialize once with the serde's typed encoding, compressing large payloads."""
+        type_, data = self.serde.dumps_typed(payload)
+        if zstandard is not None and 0 < self.compress_threshold <= len(data):
+            return type_ + _ZSTD_SUFFIX, zstandard.ZstdCompressor().compress(data)
+        return type_, data
+
+    def _decode_blob(self, type_: str, data: bytes) -> Dict[str, Any]:
+        if type_.endswith(_ZSTD_SUFFIX):
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read compressed checkpoints")
+            type_ = type_[: -len(_ZSTD_SUFFIX)]
+            data = zstandard.ZstdDecompressor().decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    def _load_payload(self, obj: GraphCheckpoint) -> Dict[str, Any]:
+        """Decode a row's stored checkpoint (full or delta) from blob or legacy JSON."""
+        if obj.blob is not None:
+            return self._decode_blob(obj.blob_type, bytes(obj.blob))
+        return self._decode_state(obj.state)
+
+    def _decode_state(self, state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Legacy path for rows that still keep the checkpoint in the JSON `state` column."""
+        try:
+            # Avoid json.dumps on complex LC message types (e.g., ToolMessage)
+            raw_bytes = self.serde.dumps(state) if state else b"{}"
+            return self.serde.loads(raw_bytes)
+        except Exception:
+            # Fallback to raw dict if serde fails
+            return state or {}
+
+    def _encode_delta(
+        self,
+        checkpoint: Checkpoint,
+        new_versions: Dict[str, Any],
+        parent_values: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Return a partial checkpoint holding only channels changed since the parent."""
+        values = checkpoint.get("channel_values") or {}
+        changed: Dict[str, Any] = {}
+        appends: Dict[str, List[Any]] = {}
+        for ch in new_versions:
+            if ch not in values:
+                continue
+            val = values[ch]
+            prev = parent_values.get(ch)
+            if (
+                isinstance(val, list)
+                and isinstance(prev, list)
+                and 0 < len(prev) <= len(val)
+                and val[: len(prev)] == prev
+            ):
+                appends[ch] = val[len(prev):]
+            else:
+                changed[ch] = val
+        delta: Dict[str, Any] = {**checkpoint, "channel_values": changed}
+        if appends:
+            delta["channel_appends"] = appends
+        return delta
+
+    @staticmethod
+    def _apply_delta(values: Dict[str, Any], parent: Dict[str, Any], delta: Dict[str, Any]) -> None:
+        """Advance `values` from the parent's channels to the delta's channels in place."""
+        parent_versions = parent.get("channel_versions") or {}
+        versions = delta.get("channel_versions") or {}
+        written = delta.get("channel_values") or {}
+        appends = delta.get("channel_appends") or {}
+        for ch, ver in versions.items():
+            if parent_versions.get(ch) == ver:
+                continue
+            if ch in written:
+                values[ch] = written[ch]
+            elif ch in appends:
+                values[ch] = list(values.get(ch) or []) + list(appends[ch])
+            else:
+                values.pop(ch, None)
+
+    @staticmethod
+    def _stored_size(obj: GraphCheckpoint) -> int:
+        return len(obj.blob) if obj.blob is not None else len(str(obj.state or ""))
+
+    def _materialize(
+        self,
+        obj: GraphCheckpoint,
+        groups: Optional[Dict[str, Dict[str, GraphCheckpoint]]] = None,
+        sizes: Optional[List[int]] = None,
+    ) -> Checkpoint:
+        """Rebuild the full checkpoint for `obj`, replaying deltas from its snapshot.
+        Appends the stored size of every row read to `sizes` when given.
+        """
+        sizes = [] if sizes is None else sizes
+        if obj.is_snapshot:
+            sizes.append(self._stored_size(obj))
+            return self._load_payload(obj)  # type: ignore[return-value]
+        groups = {} if groups is None else groups
+        rows = groups.get(obj.snapshot_id)
+        if rows is None:
+            qs = GraphCheckpoint.objects.filter(snapshot_id=obj.snapshot_id, checkpoint_ns=obj.checkpoint_ns)
+            rows = {r.checkpoint_id: r for r in qs}
+            groups[obj.snapshot_id] = rows
+        chain: List[GraphCheckpoint] = []
+        cur: Optional[GraphCheckpoint] = obj
+        while cur is not None and not cur.is_snapshot:
+            chain.append(cur)
+            cur = rows.get(cur.parent_id)
+        if cur is None:
+            raise ValueError(f"Checkpoint {obj.checkpoint_id} is missing its snapshot {obj.snapshot_id}")
+        sizes.extend(self._stored_size(r) for r in (cur, *chain))
+        base = self._load_payload(cur)
+        values: Dict[str, Any] = dict(base.get("channel_values") or {})
+        parent = base
+        for row in reversed(chain):
+            delta = self._load_payload(row)
+            self._apply_delta(values, parent, delta)
+            parent = delta
+        out: Dict[str, Any] = {k: v for k, v in parent.items() if k != "channel_appends"}
+        out["channel_values"] = values
+        return out  # type: ignore[return-value]
+
+    def _load_writes(self, thread_id: Any, checkpoint_ns: str, checkpoint_ids: List[str]) -> Dict[str, List[PendingWrite]]:
+        """Fetch pending writes for several checkpoints of one thread in a single query."""
+        out: Dict[str, List[PendingWrite]] = {cid: [] for cid in checkpoint_ids}
+        if not checkpoint_ids:
+            return out
+        qs = GraphCheckpointWrite.objects.filter(
+            thread_id=thread_id, checkpoint_ns=checkpoint_ns, checkpoint_id__in=checkpoint_ids
+        ).order_by("checkpoint_id", "task_id", "idx")
+        for w in qs.only("checkpoint_id", "task_id", "channel", "blob", "blob_type"):
+            value = self._decode_blob(w.blob_type, bytes(w.blob)) if w.blob is not None else None
+            out[w.checkpoint_id].append((w.task_id, w.channel, value))
+        return out
+
+    def _legacy_writes(self, obj: GraphCheckpoint) -> List[PendingWrite]:
+        """Writes stored inline on rows created before GraphCheckpointWrite existed."""
+        return [(w[0], w[1], self._decode_state(w[2]) if isinstance(w[2], dict) else w[2]) for w in (obj.writes or [])]
+
+    def _build_tuple(
+        self,
+        obj: GraphCheckpoint,
+        writes: List[PendingWrite],
+        groups: Optional[Dict[str, Dict[str, GraphCheckpoint]]] = None,
+        stamp: Optional[str] = None,
+    ) -> CheckpointTuple:
+        """Turn the row picked by get_tuple into a CheckpointTuple, caching it under `stamp`."""
+        thread_id = str(obj.thread_id)
+        # Deserialize checkpoint state via BaseCheckpointSaver.serde
+        sizes: List[int] = []
+        checkpoint: Checkpoint = self._materialize(obj, groups, sizes=sizes)
+        _remember_head(
+            (thread_id, obj.checkpoint_ns),
+            (obj.checkpoint_id, obj.snapshot_id or obj.checkpoint_id, obj.depth, checkpoint.get("channel_values") or {}),
+        )
+        metadata: CheckpointMetadata = obj.metadata or {}
+        pending_writes: List[PendingWrite] = self._legacy_writes(obj) + writes
+        parent_cfg: Optional[RunnableConfig] = self._parent_config(obj)
+        # Echo the resolved checkpoint_id so the next put() links its parent correctly
+        out_cfg: RunnableConfig = {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": self._graph_ns(obj.checkpoint_ns),
+                "checkpoint_id": obj.checkpoint_id,
+            }
+        }
+        tup = CheckpointTuple(config=out_cfg, checkpoint=checkpoint, metadata=metadata, parent_config=parent_cfg, pending_writes=pending_writes)
+        if stamp:
+            LATEST_CHECKPOINTS.store((thread_id, obj.checkpoint_ns), tup, sum(sizes), stamp=stamp)
+        return tup
+
+    def _storage_ns(self, checkpoint_ns: Optional[str]) -> str:
+        """checkpoint_ns column value for a graph (or subgraph) checkpoint_ns."""
+        return f"{self.namespace}{_NS_SEP}{checkpoint_ns}" if checkpoint_ns else self.namespace
+
+    def _graph_ns(self, stored: str) -> str:
+        prefix = self.namespace + _NS_SEP
+        return stored[len(prefix):] if stored.startswith(prefix) else ""
+
+    @staticmethod
+    def _parent_cfg(thread_id: Any, checkpoint_ns: str, parent_id: str, metadata: Optional[Dict[str, Any]]) -> Optional[RunnableConfig]:
+        if not parent_id:
+            return None
+        # A fork's first checkpoint hangs off a checkpoint of the thread it was cloned from
+        parent_thread = ((metadata or {}).get("forked_from") or {}).get("thread_id") or str(thread_id)
+        return {"configurable": {"thread_id": parent_thread, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id}}
+
+    def _parent_config(self, obj: GraphCheckpoint) -> Optional[RunnableConfig]:
+        return self._parent_cfg(obj.thread_id, self._graph_ns(obj.checkpoint_ns), obj.parent_id, obj.metadata)
+
+    def _iter_tuples(
+        self,
+        rows: List[GraphCheckpoint],
+        writes: Dict[Tuple[str, str, str], List[PendingWrite]],
+        groups: Dict[str, Dict[str, GraphCheckpoint]],
+    ) -> Iterator[CheckpointTuple]:
+        for obj in rows:
+            # Deserialize each checkpoint entry
+            chk: Checkpoint = self._materialize(obj, groups)
+            md: CheckpointMetadata = obj.metadata or {}
+            pw: List[PendingWrite] = self._legacy_writes(obj) + writes.get((str(obj.thread_id), obj.checkpoint_ns, obj.checkpoint_id), [])
+            cfg: RunnableConfig = {"configurable": {"thread_id": str(obj.thread_id), "checkpoint_ns": self._graph_ns(obj.checkpoint_ns), "checkpoint_id": obj.checkpoint_id}}
+            yield CheckpointTuple(config=cfg, checkpoint=chk, metadata=md, parent_config=self._parent_config(obj), pending_writes=pw)
+
+    @staticmethod
+    def _rows_by_thread(rows: List[GraphCheckpoint]) -> Dict[Tuple[Any, str], List[str]]:
+        by_thread: Dict[Tuple[Any, str], List[str]] = {}
+        for obj in rows:
+            by_thread.setdefault((obj.thread_id, obj.checkpoint_ns), []).append(obj.checkpoint_id)
+        return by_thread
+
+    def _list_chunk(self, rows: List[GraphCheckpoint]) -> Iterator[CheckpointTuple]:
+        # One writes query per (thread, ns) in the chunk instead of one per checkpoint
+        writes: Dict[Tuple[str, str, str], List[PendingWrite]] = {}
+        for (tid, ns), cids in self._rows_by_thread(rows).items():
+            for cid, pws in self._load_writes(tid, ns, cids).items():
+                writes[(str(tid), ns, cid)] = pws
+        # Deltas in the same snapshot group share one load of the group rows
+        yield from self._iter_tuples(rows, writes, {})
+
+    @staticmethod
+    def _before_q(before: RunnableConfig, thread_id: Optional[str]) -> Q:
+        """Keyset condition on (created_at, id) for rows older than the `before` checkpoint."""
+        bid = get_checkpoint_id(before)
+        if not bid:
+            return Q()
+        anchor = GraphCheckpoint.objects.filter(checkpoint_id=bid)
+        tid = (before.get("configurable") or {}).get("thread_id") or thread_id
+        if tid:
+            anchor = anchor.filter(thread_id=tid)
+        key = anchor.values_list("created_at", "id").first()
+        if key is None:
+            # Unknown anchor: checkpoint ids are uuid6, so they still sort by creation time
+            return Q(checkpoint_id__lt=bid)
+        return Q(created_at__lt=key[0]) | Q(created_at=key[0], id__lt=key[1])
+
+    def _prepare_put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: Dict[str, Any],
+    ) -> Tuple[Dict[str, Any], Callable[[], None]]:
+        """Encode `checkpoint` as a delta or snapshot row.
+
+        Returns the GraphCheckpoint field values (without thread/run) and the callback to run
+        once the row is committed.
+        """
+        cfg = (config or {}).get("configurable", {})
+        thread_id = cfg.get("thread_id")
+        # Normalize metadata using helper
+        metadata = get_checkpoint_metadata(config, metadata)
+
+        checkpoint_id = str(checkpoint.get("id") or "")
+        parent_id = str(cfg.get("checkpoint_id") or "")
+        storage_ns = self._storage_ns(cfg.get("checkpoint_ns"))
+        head_key = (str(thread_id), storage_ns)
+        head = _lookup_head(head_key)
+        # Write a delta only when the parent is the chain head this process knows about
+        if self.delta and parent_id and head and head[0] == parent_id and head[2] + 1 < self.snapshot_interval:
+            snapshot_id, depth = head[1], head[2] + 1
+            payload = self._encode_delta(checkpoint, new_versions, head[3])
+        else:
+            snapshot_id, depth = checkpoint_id, 0
+            payload = checkpoint
+        blob_type, blob = self._encode_blob(payload)
+
+        fields = {
+            "checkpoint_ns": storage_ns,
+            "checkpoint_id": checkpoint_id,
+            "parent_id": parent_id,
+            "is_snapshot": depth == 0,
+            "snapshot_id": snapshot_id,
+            "depth": depth,
+            "blob": blob,
+            "blob_type": blob_type,
+            "metadata": metadata or {},
+            "source": str((metadata or {}).get("source") or ""),
+            "step": (metadata or {}).get("step"),
+            "writes": [],
+        }
+        graph_ns = cfg.get("checkpoint_ns", "")
+        # The same tuple a cold get_tuple() of this row builds
+        latest = CheckpointTuple(
+            config={"configurable": {"thread_id": str(thread_id), "checkpoint_ns": graph_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=checkpoint,
+            metadata=metadata,
+            parent_config=self._parent_cfg(thread_id, graph_ns, parent_id, metadata),
+            pending_writes=[],
+        )
+
+        def _after_commit() -> None:
+            _remember_head(head_key, (checkpoint_id, snapshot_id, depth, dict(checkpoint.get("channel_values") or {})))
+            # Deltas are sized as the entry they extend plus their own bytes
+            LATEST_CHECKPOINTS.store(head_key, latest, len(blob), extends=parent_id if depth else "")
+
+        return fields, _after_commit
+
+    def _prepare_writes(
+        self,
+        config: RunnableConfig,
+        writes: List[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> Tuple[List[GraphCheckpointWrite], Callable[[], None]]:
+        """Build unsaved write rows and the cache update to run once they are committed."""
+        cfg = (config or {}).get("configurable", {})
+        thread_id = cfg.get("thread_id")
+        checkpoint_id = cfg.get("checkpoint_id")
+        rows: List[GraphCheckpointWrite] = []
+        for i, (ch, val) in enumerate(writes):
+            blob_type, blob = self._encode_blob(val)
+            rows.append(
+                GraphCheckpointWrite(
+                    thread_id=thread_id,
+                    checkpoint_ns=self._storage_ns(cfg.get("checkpoint_ns")),
+                    checkpoint_id=str(checkpoint_id),
+                    task_id=task_id,
+                    task_path=task_path or "",
+                    idx=WRITES_IDX_MAP.get(ch, i),
+                    channel=ch,
+                    blob=blob,
+                    blob_type=blob_type,
+                )
+            )
+        cached = [(r.idx, r.channel, val) for r, (_, val) in zip(rows, writes)]
+        cache_key = (str(thread_id), self._storage_ns(cfg.get("checkpoint_ns")))
+        return rows, lambda: LATEST_CHECKPOINTS.add_writes(cache_key, str(checkpoint_id), task_id, cached)
 
     # ---- sync API ----
     def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
@@ -35,24 +663,21 @@ class DjangoCheckpointer(BaseCheckpointSaver):
         if not thread_id:
             return None
         cid = get_checkpoint_id(config)
-        qs = GraphCheckpoint.objects.filter(thread_id=thread_id)
+        storage_ns = self._storage_ns(cfg.get("checkpoint_ns"))
+        cache_key = (str(thread_id), storage_ns)
+        cached = LATEST_CHECKPOINTS.get(cache_key, cid)
+        if cached is not None:
+            return cached
+        # Read the stamp before the DB so a concurrent write can only make this entry stale-on-arrival
+        stamp = LATEST_CHECKPOINTS.read_stamp(cache_key, create=True) if LATEST_CHECKPOINTS.enabled and not cid else None
+        qs = GraphCheckpoint.objects.filter(thread_id=thread_id, checkpoint_ns=storage_ns)
         if cid:
             qs = qs.filter(checkpoint_id=cid)
         obj = qs.order_by("-created_at").first()
         if not obj:
             return None
-        # Deserialize checkpoint state via BaseCheckpointSaver.serde
-        try:
-            # Avoid json.dumps on complex LC message types (e.g., ToolMessage)
-            raw_bytes = self.serde.dumps(obj.state) if obj.state else b"{}"
-            checkpoint: Checkpoint = self.serde.loads(raw_bytes)
-        except Exception:
-            # Fallback to raw dict if serde fails
-            checkpoint = obj.state or {}
-        metadata: CheckpointMetadata = obj.metadata or {}
-        pending_writes: List[PendingWrite] = [tuple(w) for w in (obj.writes or [])]  # type: ignore[list-item]
-        parent_cfg: Optional[RunnableConfig] = None
-        return CheckpointTuple(config=config, checkpoint=checkpoint, metadata=metadata, parent_config=parent_cfg, pending_writes=pending_writes)
+        writes = self._load_writes(obj.thread_id, obj.checkpoint_ns, [obj.checkpoint_id])[obj.checkpoint_id]
+        return self._build_tuple(obj, writes, stamp=stamp)
 
     def list(
         self,
@@ -67,25 +692,38 @@ class DjangoCheckpointer(BaseCheckpointSaver):
         qs = GraphCheckpoint.objects.all()
         if thread_id:
             qs = qs.filter(thread_id=thread_id)
+        if "checkpoint_ns" in cfg:
+            qs = qs.filter(checkpoint_ns=self._storage_ns(cfg["checkpoint_ns"]))
+        if cfg.get("checkpoint_id"):
+            qs = qs.filter(checkpoint_id=cfg["checkpoint_id"])
+        columns, extra = _split_filter(filter)
+        qs = qs.filter(**columns, **{f"metadata__{k}": v for k, v in extra.items()})
         if before:
-            bid = get_checkpoint_id(before)
-            if bid:
-                qs = qs.filter(checkpoint_id__lt=bid)
-        qs = qs.order_by("-created_at")
+            qs = qs.filter(self._before_q(before, thread_id))
+        qs = qs.order_by("-created_at", "-id")
         if limit:
             qs = qs[:limit]
-        for obj in qs:
-            # Deserialize each checkpoint entry
-            try:
-                raw_bytes = self.serde.dumps(obj.state) if obj.state else b"{}"
-                chk: Checkpoint = self.serde.loads(raw_bytes)
-            except Exception:
-                chk = obj.state or {}
-            md: CheckpointMetadata = obj.metadata or {}
-            pw: List[PendingWrite] = [tuple(w) for w in (obj.writes or [])]  # type: ignore[list-item]
-            yield CheckpointTuple(config={"configurable": {"thread_id": str(obj.thread_id)}}, checkpoint=chk, metadata=md, parent_config=None, pending_writes=pw)
+        # Stream rows so long histories never sit in memory as full states at once
+        chunk: List[GraphCheckpoint] = []
+        for obj in qs.iterator(chunk_size=self.list_chunk_size):
+            chunk.append(obj)
+            if len(chunk) >= self.list_chunk_size:
+                yield from self._list_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from self._list_chunk(chunk)
+
+    def _resolve_run_id(self, thread_id: str, cfg: Dict[str, Any]) -> str:
+        run_id = _cached_run_id(thread_id, cfg)
+        if run_id is None:
+            # Maintain backward compatibility with schema requiring Run FK
+            last_run = Run.objects.filter(thread_id=thread_id).order_by("-started_at").values_list("id", flat=True).first()
+            if last_run is None:
+                last_run = Run.objects.create(thread_id=thread_id, status="pending").id
+            run_id = str(last_run)
+            _remember_run(thread_id, run_id)
+        return run_id
 
-    @transaction.atomic
     def put(
         self,
         config: RunnableConfig,
@@ -97,29 +735,14 @@ class DjangoCheckpointer(BaseCheckpointSaver):
         thread_id = cfg.get("thread_id")
         if not thread_id:
             raise ValueError("thread_id is required in config.configurable")
-        thread = Thread.objects.get(id=thread_id)
-        # Maintain backward compatibility with schema requiring Run FK
-        last_run = Run.objects.filter(thread=thread).order_by("-started_at").first()
-        if last_run is None:
-            last_run = Run.objects.create(thread=thread, status="pending")
-
-        # Normalize metadata using helper
-        metadata = get_checkpoint_metadata(config, metadata)
-
-        GraphCheckpoint.objects.create(
-            thread=thread,
-            run=last_run,
-            checkpoint_ns=self.namespace,
-            checkpoint_id=str(checkpoint.get("id") or ""),
-            parent_id=str(checkpoint.get("parents", {}).get(self.namespace, "")) if isinstance(checkpoint.get("parents"), dict) else str(checkpoint.get("parent_id") or ""),
-            state=json.loads(self.serde.dumps(checkpoint).decode("utf-8")) if checkpoint else {},
-            metadata=metadata or {},
-            writes=[],
-        )
+        run_id = self._resolve_run_id(str(thread_id), cfg)
+        fields, after_commit = self._prepare_put(config, checkpoint, metadata, new_versions)
+        # A single INSERT; the FK ids are trusted rather than fetched
+        GraphCheckpoint.objects.create(thread_id=thread_id, run_id=run_id, **fields)
+        transaction.on_commit(after_commit)
         # Return config unchanged; engine tracks versions separately
         return config
 
-    @transaction.atomic
     def put_writes(
         self,
         config: RunnableConfig,
@@ -128,32 +751,73 @@ class DjangoCheckpointer(BaseCheckpointSaver):
         task_path: str = "",
     ) -> None:
         cfg = (config or {}).get("configurable", {})
-        thread_id = cfg.get("thread_id")
-        if not thread_id:
-            return
-        obj = GraphCheckpoint.objects.filter(thread_id=thread_id).order_by("-created_at").first()
-        if not obj:
+        if not cfg.get("thread_id") or not cfg.get("checkpoint_id") or not writes:
             return
-        existing: List[List[Any]] = obj.writes or []
-        # Store as 3-tuples [task_id, channel, value], JSON-serializable via serde
-        serialized: List[List[Any]] = []
-        for (ch, val) in writes:
-            try:
-                payload = json.loads(self.serde.dumps(val).decode("utf-8"))
-            except Exception:
-                # Fallback: string repr to avoid DB write failures
-                try:
-                    payload = str(val)
-                except Exception:
-                    payload = None
-            serialized.append([task_id, ch, payload])
-        merged = existing + serialized
-        obj.writes = merged
-        obj.save(update_fields=["writes"])
+        rows, after_commit = self._prepare_writes(config, writes, task_id, task_path)
+        # Append-only: regular writes are idempotent per (task_id, idx); special channels
+        # (errors, interrupts, resumes) are last-write-wins.
+        if all(ch in WRITES_IDX_MAP for ch, _ in writes):
+            GraphCheckpointWrite.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["thread", "checkpoint_ns", "checkpoint_id", "task_id", "idx"],
+                update_fields=["channel", "blob", "blob_type", "task_path"],
+            )
+        else:
+            GraphCheckpointWrite.objects.bulk_create(rows, ignore_conflicts=True)
+        transaction.on_commit(after_commit)
 
     def delete_thread(self, thread_id: str) -> None:
+        LATEST_CHECKPOINTS.invalidate_thread(thread_id)
+        _forget_runs(str(thread_id))
+        GraphCheckpointWrite.objects.filter(thread_id=thread_id).delete()
         GraphCheckpoint.objects.filter(thread_id=thread_id).delete()
 
+    @transaction.atomic
+    def fork(self, config: RunnableConfig, thread_id: str) -> RunnableConfig:
+        """Start `thread_id` from the checkpoint in `config` (of another thread) without copying state.
+
+        The fork's first checkpoint is an empty delta on top of the source checkpoint, stored
+        in the source's snapshot group, so only the supersteps run on the fork add rows.
+        Retention keeps snapshot groups that other threads still reference.
+        Returns the config of the fork's checkpoint.
+        """
+        cfg = (config or {}).get("configurable", {})
+        storage_ns = self._storage_ns(cfg.get("checkpoint_ns"))
+        src = GraphCheckpoint.objects.filter(
+            thread_id=cfg.get("thread_id"), checkpoint_ns=storage_ns, checkpoint_id=get_checkpoint_id(config)
+        ).first()
+        if src is None:
+            raise GraphCheckpoint.DoesNotExist("Checkpoint to fork from not found")
+        if src.is_snapshot and not src.snapshot_id:
+            # Legacy snapshots predate snapshot_id; anchor their group so the fork can join it
+            src.snapshot_id = src.checkpoint_id
+            src.save(update_fields=["snapshot_id"])
+        parent = self._load_payload(src)
+        checkpoint_id = str(uuid6())
+        payload = {k: v for k, v in parent.items() if k != "channel_appends"}
+        payload.update(id=checkpoint_id, ts=timezone.now().isoformat(), channel_values={})
+        blob_type, blob = self._encode_blob(payload)
+        metadata = {k: v for k, v in (src.metadata or {}).items() if k != "run_id"}
+        metadata.update(source="fork", parents={}, forked_from={"thread_id": str(src.thread_id), "checkpoint_id": src.checkpoint_id})
+        GraphCheckpoint.objects.create(
+            thread_id=thread_id,
+            run_id=self._resolve_run_id(str(thread_id), {}),
+            checkpoint_ns=storage_ns,
+            checkpoint_id=checkpoint_id,
+            parent_id=src.checkpoint_id,
+            is_snapshot=False,
+            snapshot_id=src.snapshot_id,
+            depth=src.depth + 1,
+            blob=blob,
+            blob_type=blob_type,
+            metadata=metadata,
+            source="fork",
+            step=src.step,
+            writes=[],
+        )
+        return {"configurable": {"thread_id": str(thread_id), "checkpoint_ns": cfg.get("checkpoint_ns", ""), "checkpoint_id": checkpoint_id}}
+
     # ---- async API ----
     async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
         return await sync_to_async(self.get_tuple, thread_sensitive=True)(config)
@@ -190,3 +854,342 @@ class DjangoCheckpointer(BaseCheckpointSaver):
 
     async def adelete_thread(self, thread_id: str) -> None:
         await sync_to_async(self.delete_thread, thread_sensitive=True)(thread_id)
+
+
+_CKPT_TABLE = GraphCheckpoint._meta.db_table
+_CKPT_FIELDS = [f.attname for f in GraphCheckpoint._meta.concrete_fields]
+_CKPT_COLUMNS = ", ".join(f.column for f in GraphCheckpoint._meta.concrete_fields)
+_WRITES_TABLE = GraphCheckpointWrite._meta.db_table
+_WRITES_FIELDS = [f.attname for f in GraphCheckpointWrite._meta.concrete_fields]
+_WRITES_COLUMNS = ", ".join(f.column for f in GraphCheckpointWrite._meta.concrete_fields)
+_RUNS_TABLE = Run._meta.db_table
+# Django options that are not libpq connection parameters
+_DJANGO_ONLY_OPTIONS = {"isolation_level", "server_side_binding", "assume_role", "pool"}
+
+# One pool per process, living on its own loop thread: connections cannot be shared across
+# loops, and request loops (async_to_sync, asyncio.run in Celery) close after each use, which
+# would strand a pool of open connections each time.
+_POOL_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_POOL: "Optional[asyncio.Task[Any]]" = None
+_POOL_LOCK = threading.Lock()
+
+
+def _pool_loop() -> asyncio.AbstractEventLoop:
+    global _POOL_LOOP
+    with _POOL_LOCK:
+        if _POOL_LOOP is None or _POOL_LOOP.is_closed():
+            _POOL_LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_POOL_LOOP.run_forever, name="checkpoint-pool", daemon=True).start()
+        return _POOL_LOOP
+
+
+def _pool_conninfo(db: Dict[str, Any]) -> str:
+    params = {
+        "dbname": db.get("NAME"),
+        "user": db.get("USER"),
+        "password": db.get("PASSWORD"),
+        "host": db.get("HOST"),
+        "port": db.get("PORT"),
+    }
+    params.update({k: v for k, v in (db.get("OPTIONS") or {}).items() if k not in _DJANGO_ONLY_OPTIONS})
+    return make_conninfo("", **{k: str(v) for k, v in params.items() if v not in (None, "")})
+
+
+class AsyncDjangoCheckpointer(DjangoCheckpointer):
+    """DjangoCheckpointer whose async API runs on the event loop.
+
+    On Postgres (with psycopg_pool installed) aget_tuple/alist/aput/aput_writes/adelete_thread
+    talk to the checkpoint tables through a psycopg AsyncConnectionPool instead of funnelling
+    every stream through Django's single sync thread. The pool is one per process on its own
+    loop thread; callers on any loop hand their queries to it. Rows are read back into unsaved
+    model instances so the storage format and delta/cache logic stay shared with the sync API,
+    which is unchanged. Elsewhere the async API runs the sync methods on a worker thread.
+    """
+
+    def __init__(self, namespace: str = "default", **kwargs: Any) -> None:
+        super().__init__(namespace, **kwargs)
+        db = settings.DATABASES["default"]
+        self.native = (
+            AsyncConnectionPool is not None
+            and getattr(settings, "CHECKPOINT_ASYNC_POOL_ENABLED", True)
+            and "postgresql" in db.get("ENGINE", "")
+        )
+
+    @staticmethod
+    async def _open_pool() -> Any:
+        pool = AsyncConnectionPool(
+            _pool_conninfo(settings.DATABASES["default"]),
+            min_size=int(getattr(settings, "CHECKPOINT_POOL_MIN_SIZE", 1)),
+            max_size=int(getattr(settings, "CHECKPOINT_POOL_MAX_SIZE", 10)),
+            timeout=float(getattr(settings, "CHECKPOINT_POOL_TIMEOUT", 30)),
+            open=False,
+        )
+        await pool.open()
+        return pool
+
+    async def _pool(self) -> Any:
+        """The process pool; only awaited on the pool loop, so no lock is needed."""
+        global _POOL
+        if _POOL is None:
+            # Concurrent first callers all wait on the same pool
+            _POOL = asyncio.get_running_loop().create_task(self._open_pool())
+        return await _POOL
+
+    async def _with_conn(self, fn: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Await `fn(conn)` with a pooled connection, from any event loop."""
+        async def call() -> Any:
+            pool = await self._pool()
+            async with pool.connection() as conn:
+                return await fn(conn)
+
+        loop = _pool_loop()
+        if asyncio.get_running_loop() is loop:
+            return await call()
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(call(), loop))
+
+    @staticmethod
+    def _checkpoint_from_row(row: Tuple[Any, ...]) -> GraphCheckpoint:
+        return GraphCheckpoint.from_db(None, _CKPT_FIELDS, row)
+
+    async def _aload_groups(self, conn: Any, rows: List[GraphCheckpoint]) -> Dict[str, Dict[str, GraphCheckpoint]]:
+        """Pre-load the snapshot groups of every delta in `rows` so _materialize stays off the ORM."""
+        groups: Dict[str, Dict[str, GraphCheckpoint]] = {}
+        wanted = {(r.snapshot_id, r.checkpoint_ns) for r in rows if not r.is_snapshot}
+        if not wanted:
+            return groups
+        cur = await conn.execute(
+            f"SELECT {_CKPT_COLUMNS} FROM {_CKPT_TABLE} WHERE snapshot_id = ANY(%s)",
+            ([sid for sid, _ in wanted],),
+        )
+        for row in await cur.fetchall():
+            obj = self._checkpoint_from_row(row)
+            if (obj.snapshot_id, obj.checkpoint_ns) in wanted:
+                groups.setdefault(obj.snapshot_id, {})[obj.checkpoint_id] = obj
+        return groups
+
+    async def _aload_writes(self, conn: Any, thread_id: Any, checkpoint_ns: str, checkpoint_ids: List[str]) -> Dict[str, List[PendingWrite]]:
+        out: Dict[str, List[PendingWrite]] = {cid: [] for cid in checkpoint_ids}
+        if not checkpoint_ids:
+            return out
+        cur = await conn.execute(
+            f"SELECT checkpoint_id, task_id, channel, blob, blob_type FROM {_WRITES_TABLE}"
+            " WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id = ANY(%s)"
+            " ORDER BY checkpoint_id, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_ids),
+        )
+        for cid, task_id, channel, blob, blob_type in await cur.fetchall():
+            value = self._decode_blob(blob_type, bytes(blob)) if blob is not None else None
+            out[cid].append((task_id, channel, value))
+        return out
+
+    # ---- async API ----
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        if not self.native:
+            return await sync_to_async(self.get_tuple, thread_sensitive=False)(config)
+        cfg = (config or {}).get("configurable", {})
+        thread_id = cfg.get("thread_id")
+        if not thread_id:
+            return None
+        cid = get_checkpoint_id(config)
+        storage_ns = self._storage_ns(cfg.get("checkpoint_ns"))
+        cache_key = (str(thread_id), storage_ns)
+        cached = LATEST_CHECKPOINTS.get(cache_key, cid)
+        if cached is not None:
+            return cached
+        stamp = LATEST_CHECKPOINTS.read_stamp(cache_key, create=True) if LATEST_CHECKPOINTS.enabled and not cid else None
+        sql = f"SELECT {_CKPT_COLUMNS} FROM {_CKPT_TABLE} WHERE thread_id = %s AND checkpoint_ns = %s"
+        params: List[Any] = [uuid.UUID(str(thread_id)), storage_ns]
+        if cid:
+            sql += " AND checkpoint_id = %s"
+            params.append(cid)
+
+        async def read(conn: Any) -> Any:
+            cur = await conn.execute(sql + " ORDER BY created_at DESC LIMIT 1", params)
+            row = await cur.fetchone()
+            if row is None:
+                return None
+            obj = self._checkpoint_from_row(row)
+            groups = await self._aload_groups(conn, [obj])
+            writes = await self._aload_writes(conn, obj.thread_id, obj.checkpoint_ns, [obj.checkpoint_id])
+            return obj, writes, groups
+
+        found = await self._with_conn(read)
+        if found is None:
+            return None
+        obj, writes, groups = found
+        return self._build_tuple(obj, writes[obj.checkpoint_id], groups, stamp=stamp)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        if not self.native:
+            items = await sync_to_async(lambda: [*self.list(config, filter=filter, before=before, limit=limit)], thread_sensitive=False)()
+            for x in items:
+                yield x
+            return
+        cfg = (config or {}).get("configurable", {}) if config else {}
+        thread_id = cfg.get("thread_id")
+        where: List[str] = []
+        params: List[Any] = []
+        if thread_id:
+            where.append("thread_id = %s")
+            params.append(uuid.UUID(str(thread_id)))
+        if "checkpoint_ns" in cfg:
+            where.append("checkpoint_ns = %s")
+            params.append(self._storage_ns(cfg["checkpoint_ns"]))
+        if cfg.get("checkpoint_id"):
+            where.append("checkpoint_id = %s")
+            params.append(cfg["checkpoint_id"])
+        columns, extra = _split_filter(filter)
+        for col, value in columns.items():
+            where.append(f"{col} = %s")
+            params.append(value)
+        if extra:
+            where.append("metadata @> %s")
+            params.append(Jsonb(extra))
+        key: Optional[Tuple[Any, Any]] = None
+        bid = get_checkpoint_id(before) if before else None
+        if bid:
+            anchor_sql = f"SELECT created_at, id FROM {_CKPT_TABLE} WHERE checkpoint_id = %s"
+            anchor_params: List[Any] = [bid]
+            tid = (before.get("configurable") or {}).get("thread_id") or thread_id
+            if tid:
+                anchor_sql += " AND thread_id = %s"
+                anchor_params.append(uuid.UUID(str(tid)))
+
+            async def anchor(conn: Any) -> Any:
+                return await (await conn.execute(anchor_sql + " LIMIT 1", anchor_params)).fetchone()
+
+            key = await self._with_conn(anchor)
+            if key is None:
+                # Unknown anchor: checkpoint ids are uuid6, so they still sort by creation time
+                where.append("checkpoint_id < %s")
+                params.append(bid)
+        remaining = int(limit) if limit else None
+        # Keyset pages on (created_at, id); the connection goes back to the pool between pages
+        while remaining is None or remaining > 0:
+            page = self.list_chunk_size if remaining is None else min(remaining, self.list_chunk_size)
+            page_where, page_params = list(where), list(params)
+            if key is not None:
+                page_where.append("(created_at, id) < (%s, %s)")
+                page_params.extend(key)
+            sql = f"SELECT {_CKPT_COLUMNS} FROM {_CKPT_TABLE}"
+            if page_where:
+                sql += " WHERE " + " AND ".join(page_where)
+            sql += " ORDER BY created_at DESC, id DESC LIMIT %s"
+
+            async def fetch(conn: Any) -> Any:
+                cur = await conn.execute(sql, [*page_params, page])
+                rows = [self._checkpoint_from_row(r) for r in await cur.fetchall()]
+                writes: Dict[Tuple[str, str, str], List[PendingWrite]] = {}
+                for (tid, ns), cids in self._rows_by_thread(rows).items():
+                    for cid, pws in (await self._aload_writes(conn, tid, ns, cids)).items():
+                        writes[(str(tid), ns, cid)] = pws
+                return rows, writes, await self._aload_groups(conn, rows)
+
+            rows, writes, groups = await self._with_conn(fetch)
+            for tup in self._iter_tuples(rows, writes, groups):
+                yield tup
+            if len(rows) < page:
+                return
+            key = (rows[-1].created_at, rows[-1].id)
+            if remaining is not None:
+                remaining -= len(rows)
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: Dict[str, Any],
+    ) -> RunnableConfig:
+        if not self.native:
+            return await sync_to_async(self.put, thread_sensitive=False)(config, checkpoint, metadata, new_versions)
+        cfg = (config or {}).get("configurable", {})
+        thread_id = cfg.get("thread_id")
+        if not thread_id:
+            raise ValueError("thread_id is required in config.configurable")
+        thread_id = uuid.UUID(str(thread_id))
+        fields, after_commit = self._prepare_put(config, checkpoint, metadata, new_versions)
+        row = {
+            **fields,
+            "id": uuid.uuid4(),
+            "thread_id": thread_id,
+            "metadata": Jsonb(fields["metadata"]),
+            "writes": Jsonb(fields["writes"]),
+            "state": Jsonb({}),
+            "created_at": timezone.now(),
+        }
+
+        async def insert(conn: Any) -> None:
+            run_id = _cached_run_id(str(thread_id), cfg)
+            if run_id is None:
+                # Maintain backward compatibility with schema requiring Run FK
+                cur = await conn.execute(
+                    f"SELECT id FROM {_RUNS_TABLE} WHERE thread_id = %s ORDER BY started_at DESC LIMIT 1", (thread_id,)
+                )
+                run = await cur.fetchone()
+                if run is None:
+                    run = ((await sync_to_async(Run.objects.create, thread_sensitive=False)(thread_id=thread_id, status="pending")).id,)
+                run_id = str(run[0])
+                _remember_run(str(thread_id), run_id)
+            row["run_id"] = uuid.UUID(run_id)
+            await conn.execute(
+                f"INSERT INTO {_CKPT_TABLE} ({_CKPT_COLUMNS}) VALUES ({', '.join(['%s'] * len(_CKPT_FIELDS))})",
+                [row[f] for f in _CKPT_FIELDS],
+            )
+
+        # Returning the connection to the pool committed the insert
+        await self._with_conn(insert)
+        after_commit()
+        return config
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: List[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        if not self.native:
+            return await sync_to_async(self.put_writes, thread_sensitive=False)(config, writes, task_id, task_path)
+        cfg = (config or {}).get("configurable", {})
+        if not cfg.get("thread_id") or not cfg.get("checkpoint_id") or not writes:
+            return
+        rows, after_commit = self._prepare_writes(config, writes, task_id, task_path)
+        now = timezone.now()
+        for r in rows:
+            r.thread_id = uuid.UUID(str(r.thread_id))
+            r.created_at = now
+        if all(ch in WRITES_IDX_MAP for ch, _ in writes):
+            conflict = "DO UPDATE SET channel = EXCLUDED.channel, blob = EXCLUDED.blob, blob_type = EXCLUDED.blob_type, task_path = EXCLUDED.task_path"
+        else:
+            conflict = "DO NOTHING"
+
+        async def insert(conn: Any) -> None:
+            async with conn.cursor() as cur:
+                await cur.executemany(
+                    f"INSERT INTO {_WRITES_TABLE} ({_WRITES_COLUMNS}) VALUES ({', '.join(['%s'] * len(_WRITES_FIELDS))})"
+                    f" ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx) {conflict}",
+                    [[getattr(r, f) for f in _WRITES_FIELDS] for r in rows],
+                )
+
+        await self._with_conn(insert)
+        after_commit()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        if not self.native:
+            return await sync_to_async(self.delete_thread, thread_sensitive=False)(thread_id)
+        LATEST_CHECKPOINTS.invalidate_thread(thread_id)
+        _forget_runs(str(thread_id))
+
+        async def delete(conn: Any) -> None:
+            await conn.execute(f"DELETE FROM {_WRITES_TABLE} WHERE thread_id = %s", (uuid.UUID(str(thread_id)),))
+            await conn.execute(f"DELETE FROM {_CKPT_TABLE} WHERE thread_id = %s", (uuid.UUID(str(thread_id)),))
+
+        await self._with_conn(delete)
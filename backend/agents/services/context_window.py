@@ -0,0 +1,310 @@
+from typing import Any, Dict, List, Sequence, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import hashlib
+import json
+import threading
+import logging
+
+from django.conf import settings
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+try:  # local BPE tokenizer; encodings are fetched once, then read from TIKTOKEN_CACHE_DIR
+    import tiktoken
+except Exception:  # pragma: no cover - optional
+    tiktoken = None
+
+
+logger = logging.getLogger(__name__)
+
+# Per-message framing the chat API adds around each message's content
+_MESSAGE_OVERHEAD = 4
+_SUMMARY_HEADER = "Summary of the earlier conversation (older turns are not shown verbatim):\n"
+
+_ENCODINGS: Dict[str, Any] = {}
+_ENCODINGS_LOCK = threading.Lock()
+
+
+@dataclass
+class ContextPolicy:
+    """How much history a model call may carry.
+
+    - budget: prompt token budget per call, from CONTEXT_TOKEN_BUDGETS[model] or CONTEXT_TOKEN_BUDGET.
+    - keep_turns: newest turns (a user message and everything after it) always sent verbatim.
+    - summary_max_tokens: cap on the rolling summary of older turns.
+    """
+    enabled: bool = True
+    budget: int = 32000
+    keep_turns: int = 6
+    summary_max_tokens: int = 512
+    summary_model: str = ""
+
+    @classmethod
+    def from_settings(cls, model: str) -> "ContextPolicy":
+        budgets = getattr(settings, "CONTEXT_TOKEN_BUDGETS", {}) or {}
+        return cls(
+            enabled=bool(getattr(settings, "CONTEXT_WINDOW_ENABLED", cls.enabled)),
+            budget=max(1, int(budgets.get(model, getattr(settings, "CONTEXT_TOKEN_BUDGET", cls.budget)))),
+            keep_turns=max(1, int(getattr(settings, "CONTEXT_KEEP_TURNS", cls.keep_turns))),
+            summary_max_tokens=max(1, int(getattr(settings, "CONTEXT_SUMMARY_MAX_TOKENS", cls.summary_max_tokens))),
+            summary_model=getattr(settings, "CONTEXT_SUMMARY_MODEL", "") or "",
+        )
+
+
+@dataclass
+class ContextWindow:
+    messages: List[BaseMessage]
+    # State updates for the rolling summary; empty when nothing new was summarized
+    update: Dict[str, Any] = field(default_factory=dict)
+    history_tokens: int = 0
+    sent_tokens: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.history_tokens - self.sent_tokens)
+
+
+def _encoding(model: str) -> Any:
+    """tiktoken encoding for `model`, or None (estimate) when the tokenizer is unavailable."""
+    if tiktoken is None:
+        return None
+    with _ENCODINGS_LOCK:
+        if model in _ENCODINGS:
+            return _ENCODINGS[model]
+        try:
+            try:
+                enc = tiktoken.encoding_for_model(model)
+            except KeyError:
+                enc = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # Typically no network to fetch the BPE file; do not retry on every call
+            logger.warning("context: no tokenizer for %s, estimating tokens from length (%s)", model, e)
+            enc = None
+        _ENCODINGS[model] = enc
+        return enc
+
+
+def _text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        text = content
+    else:
+        text = " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content or [])
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        text += json.dumps([{"name": tc.get("name"), "args": tc.get("args")} for tc in tool_calls], default=str)
+    return text
+
+
+class MessageTokenCache:
+    """Token counts of message texts, keyed by (model, sha1 of the text).
+
+    Every model call counts the whole history, which is the previous call's history plus a
+    few new messages; hashing a text is far cheaper than running the BPE over it, so only the
+    new messages are tokenized. Content-keyed rather than id-keyed, so a message rewritten
+    under the same id is counted afresh. In-process LRU; 0 entries disables it.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self._entries: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, enc: Any, model: str, text: str) -> int:
+        if not self.max_entries:
+            return len(enc.encode(text, disallowed_special=()))
+        key = (model, hashlib.sha1(text.encode()).hexdigest())
+        with self._lock:
+            n = self._entries.get(key)
+            if n is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return n
+            self.misses += 1
+        n = len(enc.encode(text, disallowed_special=()))
+        with self._lock:
+            self._entries[key] = n
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return n
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+# Shared by every model call in the process
+MESSAGE_TOKENS = MessageTokenCache(getattr(settings, "CONTEXT_TOKEN_CACHE_SIZE", 8192))
+
+
+def count_tokens(messages: Sequence[BaseMessage], model: str) -> int:
+    enc = _encoding(model)
+    total = 0
+    for message in messages:
+        text = _text(message)
+        # The length estimate is cheaper than the hash, so only real tokenizer counts are cached
+        total += _MESSAGE_OVERHEAD + (MESSAGE_TOKENS.count(enc, model, text) if enc is not None else len(text) // 4 + 1)
+    return total
+
+
+def _turn_start(history: Sequence[BaseMessage], turns: int) -> int:
+    """Index where the last `turns` turns begin. Turns start at user messages, so an AI tool
+    call and its tool results always fall on the same side of the cut."""
+    starts = [i for i, m in enumerate(history) if isinstance(m, HumanMessage)]
+    if len(starts) < turns:
+        return 0
+    return starts[-turns]
+
+
+def _transcript(messages: Sequence[BaseMessage], limit: int = 2000) -> str:
+    lines = []
+    for m in messages:
+        if isinstance(m, HumanMessage):
+            role = "User"
+        elif isinstance(m, ToolMessage):
+            role = f"Tool result ({getattr(m, 'name', None) or m.tool_call_id})"
+        elif isinstance(m, AIMessage):
+            role = "Assistant"
+        else:
+            role = m.type.capitalize()
+        text = _text(m)
+        lines.append(f"{role}: {text[:limit]}{'…' if len(text) > limit else ''}")
+    return "\n".join(lines)
+
+
+def _fallback_summary(previous: str, messages: Sequence[BaseMessage], max_chars: int) -> str:
+    """Model-free summary: keep what the user asked for, newest last, within `max_chars`."""
+    asks = [f"- User: {_text(m)[:200]}" for m in messages if isinstance(m, HumanMessage)]
+    summary = "\n".join(filter(None, [previous, *asks]))
+    return summary[-max_chars:]
+
+
+def _summary_prompt(previous: str, messages: Sequence[BaseMessage], policy: ContextPolicy) -> List[BaseMessage]:
+    return [HumanMessage(content=(
+        "You maintain the running summary of a conversation between a user and an assistant that uses tools.\n"
+        "Update the summary with the new messages below. Keep facts, decisions, open tasks, ids and values "
+        "returned by tools that may be needed later; drop chit-chat. Reply with the summary only, "
+        f"at most {policy.summary_max_tokens} tokens.\n\n"
+        f"Current summary:\n{previous or '(none)'}\n\nNew messages:\n{_transcript(messages)}"
+    ))]
+
+
+def _summary_llm(policy: ContextPolicy) -> Any:
+    """Model for the rolling summary, or None to use the extractive summary. The fake
+    backend only echoes, so it never writes summaries."""
+    from agents.services.llm import get_chat_model, uses_fake_backend
+
+    return None if uses_fake_backend() else get_chat_model(policy.summary_model or None, 0)
+
+
+# Callbacks detached: the summary call runs inside a model node, and under astream_events its
+# tokens would otherwise stream to the client as answer text. Not traced for the same reason.
+_SUMMARY_CONFIG = {"callbacks": [], "run_name": "context_summary", "tags": ["nostream"]}
+
+
+def summarize(previous: str, messages: Sequence[BaseMessage], policy: ContextPolicy) -> str:
+    """Fold `messages` into the rolling summary `previous`."""
+    try:
+        llm = _summary_llm(policy)
+        if llm is None:
+            return _fallback_summary(previous, messages, policy.summary_max_tokens * 4)
+        ai = llm.invoke(_summary_prompt(previous, messages, policy), _SUMMARY_CONFIG, max_tokens=policy.summary_max_tokens)
+        return _text(ai).strip()
+    except Exception:
+        logger.exception("context: summarization failed, using extractive summary")
+        return _fallback_summary(previous, messages, policy.summary_max_tokens * 4)
+
+
+async def asummarize(previous: str, messages: Sequence[BaseMessage], policy: ContextPolicy) -> str:
+    """Async summarize(), for model nodes running on the event loop."""
+    try:
+        llm = _summary_llm(policy)
+        if llm is None:
+            return _fallback_summary(previous, messages, policy.summary_max_tokens * 4)
+        ai = await llm.ainvoke(_summary_prompt(previous, messages, policy), _SUMMARY_CONFIG, max_tokens=policy.summary_max_tokens)
+        return _text(ai).strip()
+    except Exception:
+        logger.exception("context: summarization failed, using extractive summary")
+        return _fallback_summary(previous, messages, policy.summary_max_tokens * 4)
+
+
+def _with_summary(system_prompt: str, summary: str) -> List[BaseMessage]:
+    if not summary:
+        return [SystemMessage(content=system_prompt)] if system_prompt else []
+    content = f"{system_prompt}\n\n{_SUMMARY_HEADER}{summary}" if system_prompt else f"{_SUMMARY_HEADER}{summary}"
+    return [SystemMessage(content=content)]
+
+
+@dataclass
+class _ContextPlan:
+    """What build_context decided before any summarization; `fold` is non-empty when older
+    turns must be folded into the summary first."""
+    policy: ContextPolicy
+    model: str
+    system_prompt: str
+    history: List[BaseMessage]
+    summary: str
+    start: int
+    history_tokens: int
+    fold: List[BaseMessage] = field(default_factory=list)
+
+    def finish(self, summary: str) -> ContextWindow:
+        update = {"context_summary": summary, "context_summarized": self.start} if self.fold else {}
+        messages = _with_summary(self.system_prompt, summary) + self.history[self.start:]
+        sent_tokens = count_tokens(messages, self.model)
+        if self.fold and sent_tokens > self.policy.budget:
+            logger.warning("context: current turn alone needs %s tokens (budget %s for %s)", sent_tokens, self.policy.budget, self.model)
+        return ContextWindow(messages, update, self.history_tokens, sent_tokens)
+
+
+def _plan_context(system_prompt: str, history: List[BaseMessage], state: Dict[str, Any], model: str) -> _ContextPlan:
+    if history and isinstance(history[0], SystemMessage):
+        system_prompt, history = _text(history[0]), history[1:]
+    policy = ContextPolicy.from_settings(model)
+    summary = state.get("context_summary") or ""
+    done = int(state.get("context_summarized") or 0)
+    if done > len(history):
+        # State was rewritten under us (e.g. a fork); summary no longer lines up
+        summary, done = "", 0
+    system = _with_summary(system_prompt, "")
+    history_tokens = count_tokens(system + history, model)
+    plan = _ContextPlan(policy, model, system_prompt, history, summary, done, history_tokens)
+    sent_tokens = count_tokens(_with_summary(system_prompt, summary) + history[done:], model) if done or summary else history_tokens
+    if not policy.enabled or sent_tokens <= policy.budget:
+        return plan
+
+    # Reserve room for the summary, then keep as many recent turns as fit
+    base = count_tokens(system, model) + policy.summary_max_tokens + _MESSAGE_OVERHEAD
+    start = max(done, _turn_start(history, 1))
+    for turns in range(policy.keep_turns, 0, -1):
+        candidate = max(done, _turn_start(history, turns))
+        if base + count_tokens(history[candidate:], model) <= policy.budget:
+            start = candidate
+            break
+    plan.start = start
+    plan.fold = history[done:start]
+    return plan
+
+
+def build_context(system_prompt: str, history: List[BaseMessage], state: Dict[str, Any], model: str) -> ContextWindow:
+    """Messages for one model call within the token budget of `model`.
+
+    Sends the system prompt, the rolling summary and every turn not yet summarized while
+    that fits. Over budget, turns older than the newest `keep_turns` (fewer, down to the
+    current one, if still needed) are folded into the summary, which is returned as a state
+    update so later calls start from it. History in state is never rewritten.
+    """
+    plan = _plan_context(system_prompt, history, state, model)
+    return plan.finish(summarize(plan.summary, plan.fold, plan.policy) if plan.fold else plan.summary)
+
+
+async def abuild_context(system_prompt: str, history: List[BaseMessage], state: Dict[str, Any], model: str) -> ContextWindow:
+    """build_context() with the summarization call made asynchronously."""
+    plan = _plan_context(system_prompt, history, state, model)
+    return plan.finish(await asummarize(plan.summary, plan.fold, plan.policy) if plan.fold else plan.summary)
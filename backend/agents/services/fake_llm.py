@@ -0,0 +1,236 @@
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import logging
+
+from django.conf import settings
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"\S+\s*")
+_FILLER = (
+    "the agent checked this and found that everything needed for the request is in place so "
+    "it will continue with the next step and report back once the work is done"
+).split()
+
+
+def _text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content or [])
+
+
+def _fake_value(name: str, spec: Dict[str, Any], rng: random.Random) -> Any:
+    if "default" in spec and spec["default"] is not None:
+        return spec["default"]
+    if spec.get("enum"):
+        return rng.choice(spec["enum"])
+    kind = spec.get("type")
+    if kind is None and spec.get("anyOf"):
+        kind = next((s.get("type") for s in spec["anyOf"] if s.get("type") != "null"), "string")
+    if kind == "integer":
+        return rng.randint(1, 10)
+    if kind == "number":
+        return round(rng.uniform(0, 10), 2)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    if kind == "array":
+        return []
+    if kind == "object":
+        return {}
+    return f"{name}-{rng.randint(0, 999)}"
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic stand-in for ChatOpenAI, for offline runs, load tests and benchmarks.
+
+    The reply to a conversation depends only on the seed and the messages, so reruns are
+    reproducible across processes. With a script (a list of {"content", "tool_calls"}
+    entries) the Nth model call of a conversation gets entry N, counting the assistant
+    messages already present, and only tool calls to bound tools are emitted. Without one
+    it echoes the last user message with filler text, and with `tool_call_rate` > 0 calls a
+    bound tool instead with arguments generated from its schema. Replies take
+    `first_token_latency` seconds plus one token per 1/`tokens_per_second` seconds, streamed
+    word by word.
+    """
+
+    model_name: str = "fake"
+    seed: int = 0
+    first_token_latency: float = 0.0
+    tokens_per_second: float = 0.0
+    response_tokens: int = 24
+    tool_call_rate: float = 0.0
+    script: List[Dict[str, Any]] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "seed": self.seed}
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Any:
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _reply(self, messages: List[BaseMessage], tools: Sequence[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
+        transcript = json.dumps([[m.type, _text(m)] for m in messages])
+        digest = hashlib.sha256(f"{self.seed}:{self.model_name}:{transcript}".encode()).hexdigest()
+        rng = random.Random(int(digest[:16], 16))
+        functions = {t["function"]["name"]: t["function"] for t in tools if "function" in t}
+
+        if self.script:
+            entry = self.script[sum(isinstance(m, AIMessage) for m in messages) % len(self.script)]
+            calls = [tc for tc in entry.get("tool_calls") or [] if tc.get("name") in functions]
+            return entry.get("content", ""), [
+                {"name": tc["name"], "args": tc.get("args") or {}, "id": f"call_{digest[:12]}_{i}", "type": "tool_call"}
+                for i, tc in enumerate(calls)
+            ]
+
+        last = messages[-1] if messages else HumanMessage(content="")
+        if functions and not isinstance(last, ToolMessage) and rng.random() < self.tool_call_rate:
+            name = rng.choice(sorted(functions))
+            params = functions[name].get("parameters") or {}
+            props = params.get("properties") or {}
+            args = {k: _fake_value(k, props.get(k) or {}, rng) for k in params.get("required") or []}
+            return "", [{"name": name, "args": args, "id": f"call_{digest[:12]}_0", "type": "tool_call"}]
+
+        if isinstance(last, ToolMessage):
+            lead = f"{getattr(last, 'name', None) or 'The tool'} returned: {_text(last)[:80]}"
+        else:
+            lead = f"Echo: {_text(last)[:200]}"
+        words = lead.split()
+        filler = max(0, self.response_tokens - len(words))
+        start = rng.randrange(len(_FILLER))
+        words += [_FILLER[(start + i) % len(_FILLER)] for i in range(filler)]
+        return " ".join(words), []
+
+    def _usage(self, messages: List[BaseMessage], tokens: List[str]) -> Dict[str, int]:
+        input_tokens = sum(len(_text(m)) // 4 + 1 for m in messages)
+        return {"input_tokens": input_tokens, "output_tokens": len(tokens), "total_tokens": input_tokens + len(tokens)}
+
+    def _delay(self, tokens: int) -> float:
+        per_token = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        return self.first_token_latency + tokens * per_token
+
+    def _message(self, messages: List[BaseMessage], tools: Sequence[Dict[str, Any]]) -> Tuple[AIMessage, List[str]]:
+        content, tool_calls = self._reply(messages, tools)
+        tokens = _TOKEN.findall(content)
+        return AIMessage(content=content, tool_calls=tool_calls, usage_metadata=self._usage(messages, tokens)), tokens
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message, tokens = self._message(messages, kwargs.get("tools") or [])
+        time.sleep(self._delay(len(tokens)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message, tokens = self._message(messages, kwargs.get("tools") or [])
+        await asyncio.sleep(self._delay(len(tokens)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, message: AIMessage, tokens: List[str]) -> Tuple[List[ChatGenerationChunk], ChatGenerationChunk]:
+        chunks = [ChatGenerationChunk(message=AIMessageChunk(content=token)) for token in tokens]
+        last = ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            tool_call_chunks=[
+                {"name": tc["name"], "args": json.dumps(tc["args"]), "id": tc["id"], "index": i, "type": "tool_call_chunk"}
+                for i, tc in enumerate(message.tool_calls)
+            ],
+            usage_metadata=message.usage_metadata,
+        ))
+        return chunks, last
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        message, tokens = self._message(messages, kwargs.get("tools") or [])
+        chunks, last = self._chunks(message, tokens)
+        time.sleep(self.first_token_latency)
+        for chunk in chunks:
+            if self.tokens_per_second > 0:
+                time.sleep(1.0 / self.tokens_per_second)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        yield last
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        message, tokens = self._message(messages, kwargs.get("tools") or [])
+        chunks, last = self._chunks(message, tokens)
+        await asyncio.sleep(self.first_token_latency)
+        for chunk in chunks:
+            if self.tokens_per_second > 0:
+                await asyncio.sleep(1.0 / self.tokens_per_second)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        yield last
+
+
+_FAKE_MODELS: Dict[str, FakeChatModel] = {}
+_FAKE_LOCK = threading.Lock()
+
+
+def _load_script(path: str) -> List[Dict[str, Any]]:
+    if not path:
+        return []
+    with open(path) as fh:
+        script = json.load(fh)
+    if not isinstance(script, list):
+        raise ValueError(f"FAKE_LLM_SCRIPT must be a JSON list of replies: {path}")
+    return script
+
+
+def get_fake_chat_model(model: Optional[str] = None) -> FakeChatModel:
+    """Shared FakeChatModel configured from FAKE_LLM_* settings. Replies carry no state
+    between calls, so one instance serves every thread and event loop."""
+    model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    with _FAKE_LOCK:
+        llm = _FAKE_MODELS.get(model)
+        if llm is None:
+            llm = _FAKE_MODELS[model] = FakeChatModel(
+                model_name=model,
+                seed=int(getattr(settings, "FAKE_LLM_SEED", 0)),
+                first_token_latency=float(getattr(settings, "FAKE_LLM_FIRST_TOKEN_MS", 0)) / 1000,
+                tokens_per_second=float(getattr(settings, "FAKE_LLM_TOKENS_PER_SECOND", 0)),
+                response_tokens=int(getattr(settings, "FAKE_LLM_RESPONSE_TOKENS", 24)),
+                tool_call_rate=float(getattr(settings, "FAKE_LLM_TOOL_CALL_RATE", 0)),
+                script=_load_script(getattr(settings, "FAKE_LLM_SCRIPT", "")),
+            )
+            logger.info("llm: fake chat model %s (seed=%s)", model, llm.seed)
+        return llm
@@ -1,12 +1,15 @@
 
 
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+import functools
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 import os
+import threading
 
 from langgraph.graph import StateGraph
 from langgraph.graph import add_messages
-from langgraph.prebuilt import ToolNode
 from langchain_core.messages import (
     AIMessage,
     HumanMessage,
@@ -14,17 +17,25 @@ from langchain_core.messages import (
     ToolMessage,
     BaseMessage,
 )
-from langchain_openai import ChatOpenAI
 from langgraph.types import interrupt, Command
 import logging
 # module logger
 logger = logging.getLogger(__name__)
-from agents.services.checkpointer import DjangoCheckpointer
+from agents.services.checkpointer import AsyncDjangoCheckpointer
+from agents.services.context_window import abuild_context, build_context
 from agents.services.knowledge import KNOWLEDGE_TOOLS
-from typing_extensions import TypedDict, Annotated
+from agents.services.llm import PROMPT_CACHE, default_chat_model
+from agents.services.tool_cache import AGENT_TOOLS
+from agents.services.tool_executor import tool_executor_node
+from agents.services.tool_selection import ToolSelector
+from typing_extensions import TypedDict, Annotated, NotRequired
 from langgraph.prebuilt import tools_condition
+from langchain_core.runnables import RunnableLambda
 from langchain_core.tools import tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max
 from django.utils import timezone
 from chat.models import Message as _MsgModel, Run as _RunModel, Thread as _ThreadModel
 from inbox.models import InboxItem as _InboxModel
@@ -37,6 +48,9 @@ class State(TypedDict):
     We persist JSON-serializable dict messages and convert to LC BaseMessage only at model call.
     """
     messages: Annotated[List[Any], add_messages]
+    # Rolling summary of the first `context_summarized` messages, maintained by build_context
+    context_summary: NotRequired[str]
+    context_summarized: NotRequired[int]
 
 
 # ---- Tools: bind generic knowledge tools ----
@@ -66,13 +80,9 @@ def _as_lc_message(m: Any) -> BaseMessage:
 
 
 def _build_llm():
-    # Prefer real OpenAI if key is present, else fallback to local echo model.
-    api_key = os.getenv("OPENAI_API_KEY", "").strip()
-    if not api_key:
-        return _EchoLLM()
-    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-    temperature = float(os.getenv("OPENAI_TEMPERATURE", "0"))
-    return ChatOpenAI(model=model, temperature=temperature)
+    # Real OpenAI if a key is present, else the deterministic fake model (see uses_fake_backend).
+    # Shared client: reuses pooled keep-alive connections across calls
+    return default_chat_model()
 # ---- HITL tool: allow assistant to request human review or mark complete ----
 @tool("request_human", return_direct=False)
 def request_human(reason: str = "", title: str = "Needs Review") -> Dict[str, Any]:
@@ -113,11 +123,40 @@ TOOLS.append(request_human)
 
 
 
+def _model_name(llm: Any) -> str:
+    return str(getattr(llm, "model_name", "") or os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
+
+
+def _context_window(llm: Any, system_prompt: str, messages_in: List[BaseMessage], state: State) -> Any:
+    """Fit the history into the model's token budget and log what that saved."""
+    return _log_context(_model_name(llm), build_context(system_prompt, messages_in, state, _model_name(llm)), state)
+
+
+async def _acontext_window(llm: Any, system_prompt: str, messages_in: List[BaseMessage], state: State) -> Any:
+    return _log_context(_model_name(llm), await abuild_context(system_prompt, messages_in, state, _model_name(llm)), state)
+
+
+def _log_context(model: str, window: Any, state: State) -> Any:
+    logger.info(
+        "context: model=%s history_tokens=%s sent_tokens=%s tokens_saved=%s summarized=%s",
+        model, window.history_tokens, window.sent_tokens, window.tokens_saved,
+        window.update.get("context_summarized", state.get("context_summarized") or 0),
+    )
+    return window
+
+
+@functools.lru_cache(maxsize=1)
+def _default_tool_schemas() -> Tuple[Dict[str, Any], ...]:
+    """Schemas of the global TOOLS, converted once; binding the dicts per call is cheap."""
+    return tuple(_tool_schemas(TOOLS))
+
+
+def _with_tools(llm: Any, schemas: Sequence[Dict[str, Any]]) -> Any:
+    return llm.bind_tools(list(schemas)) if schemas else llm
+
+
 # ---- Node: call_model (real OpenAI chat model) ----
-def call_model(state: State) -> Dict[str, List[Dict[str, Any]]]:
-    """Call a real LLM and append its AIMessage to state.
-    If tools are later added and tool_calls are produced, routing will send us to ToolNode.
-    """
+def _call_model_messages(state: State) -> List[BaseMessage]:
     # DEBUG: inspect incoming state
     try:
         msgs = state.get("messages") or []
@@ -133,16 +172,11 @@ def call_model(state: State) -> Dict[str, List[Dict[str, Any]]]:
     # Strict guard: do not call model with empty messages; raise and let caller handle.
     if not messages_in:
         raise ValueError("Empty messages passed to model")
+    return messages_in
 
-    llm = _build_llm()
-    if TOOLS:
-        llm = llm.bind_tools(TOOLS)
-    # DEBUG: model type and prompt size
-    try:
-        logger.debug("call_model: llm=%s prompt.messages=%s", type(llm).__name__, len(messages_in))
-    except Exception:
-        logger.debug("call_model: failed to log llm info")
-    ai: AIMessage = llm.invoke(messages_in)
+
+def _call_model_output(ai: AIMessage, window: Any) -> Dict[str, Any]:
+    _record_prompt_cache(ai)
     # Persist JSON-safe dict, not LC object, to keep checkpointer serialization clean
     # Serialize AIMessage to JSON-safe dict using minimal fields (avoid raw LC objects like ToolMessage)
     out: Dict[str, Any] = {"role": "assistant", "content": getattr(ai, "content", "")}
@@ -167,13 +201,38 @@ def call_model(state: State) -> Dict[str, List[Dict[str, Any]]]:
                 args = getattr(tc, "args", None) or (tc.get("args") if isinstance(tc, dict) else None)
                 simple.append({"name": name, "args": args})
             out["tool_calls"] = simple
-    return {"messages": [out]}
+    return {"messages": [out], **window.update}
+
+
+def call_model(state: State) -> Dict[str, List[Dict[str, Any]]]:
+    """Call a real LLM and append its AIMessage to state.
+    If tools are later added and tool_calls are produced, routing will send us to the tools node.
+    """
+    messages_in = _call_model_messages(state)
+    base_llm = _build_llm()
+    window = _context_window(base_llm, "", messages_in, state)
+    llm = _with_tools(base_llm, _default_tool_schemas())
+    logger.debug("call_model: llm=%s prompt.messages=%s", type(llm).__name__, len(window.messages))
+    ai: AIMessage = llm.invoke(window.messages)
+    return _call_model_output(ai, window)
+
+
+async def acall_model(state: State) -> Dict[str, List[Dict[str, Any]]]:
+    """call_model on the event loop: under astream_events tokens stream as they are generated,
+    cancellation reaches the HTTP request, and no executor thread is held per conversation."""
+    messages_in = _call_model_messages(state)
+    base_llm = _build_llm()
+    window = await _acontext_window(base_llm, "", messages_in, state)
+    llm = _with_tools(base_llm, _default_tool_schemas())
+    logger.debug("call_model: llm=%s prompt.messages=%s", type(llm).__name__, len(window.messages))
+    ai: AIMessage = await llm.ainvoke(window.messages)
+    return _call_model_output(ai, window)
 
 
 # ---- Build a simple ReAct-like graph ----
 _builder = StateGraph(State)
-_builder.add_node(call_model)
-_builder.add_node("tools", ToolNode(TOOLS))
+_builder.add_node("call_model", RunnableLambda(call_model, acall_model, name="call_model"))
+_builder.add_node("tools", tool_executor_node(TOOLS))
 _builder.add_edge("__start__", "call_model")
 
 
@@ -188,7 +247,7 @@ def _route_model_output(state: State) -> str:
 _builder.add_conditional_edges("call_model", _route_model_output)
 _builder.add_edge("tools", "call_model")
 # Enable short-term memory via LangGraph checkpointer; state persists per thread
-graph = _builder.compile(name="Minimal ReAct Graph", checkpointer=DjangoCheckpointer())
+graph = _builder.compile(name="Minimal ReAct Graph", checkpointer=AsyncDjangoCheckpointer())
 
 
 def run_ambient(agent_id: str, payload: Dict[str, Any], correlation_id: str, user_id: Optional[str]) -> Dict[str, Any]:
@@ -264,18 +323,18 @@ def _ambient_complete_node(state: State) -> Dict[str, List[AIMessage]]:
     except Exception:
         pass
 
-    # Prepare messages and prepend system prompt
+    # Prepare messages: system prompt + rolling summary + the recent turns that fit the budget
     messages_in: List[BaseMessage] = []
     for m in state.get("messages", []) or []:
         messages_in.append(_as_lc_message(m))
-    if not messages_in or not isinstance(messages_in[0], SystemMessage):
-        messages_in = [SystemMessage(content=combined_prompt)] + messages_in
     if not messages_in:
         messages_in = [HumanMessage(content="Proceed to complete the ambient task based on prior HITL context.")]
+    base_llm = _build_llm()
+    window = _context_window(base_llm, combined_prompt, messages_in, state)
 
-    llm = _build_llm().bind_tools(all_tools) if all_tools else _build_llm()
-    ai: AIMessage = llm.invoke(messages_in)
-    return {"messages": [ai]}
+    llm = base_llm.bind_tools(all_tools) if all_tools else base_llm
+    ai: AIMessage = llm.invoke(window.messages)
+    return {"messages": [ai], **window.update}
 
 
 # Build ambient graph and compile with DB checkpointer
@@ -284,7 +343,7 @@ _ambient_builder.add_node("ambient_hitl", _ambient_hitl_node)
 _ambient_builder.add_node("ambient_complete", _ambient_complete_node)
 _ambient_builder.add_edge("__start__", "ambient_hitl")
 _ambient_builder.add_edge("ambient_hitl", "ambient_complete")
-ambient_graph = _ambient_builder.compile(name="Ambient HITL Graph", checkpointer=DjangoCheckpointer())
+ambient_graph = _ambient_builder.compile(name="Ambient HITL Graph", checkpointer=AsyncDjangoCheckpointer())
 
 
 def start_ambient(thread_id: str, run_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -451,13 +510,39 @@ def get_connected_toolkit_slugs(agent: Any) -> List[str]:
     return slugs
 
 
+_COMPOSIO: Any = None
+_COMPOSIO_LOCK = threading.Lock()
+
+
+def _composio_client() -> Any:
+    """Process-wide Composio client, built on first use (a tool cache hit never needs it).
+    Tools and executions are scoped by user_id per call, so one client serves every user."""
+    global _COMPOSIO
+    with _COMPOSIO_LOCK:
+        if _COMPOSIO is None:
+            from composio import Composio
+            from composio_langchain import LangchainProvider
+
+            _COMPOSIO = Composio(provider=LangchainProvider())
+        return _COMPOSIO
+
+
+def _wrap_composio_tools(client: Any, user_id: str, schemas: List[Dict[str, Any]]) -> List[Any]:
+    """LangChain tools for cached raw Composio schemas, through the provider's public
+    wrap_tools; calls execute as `user_id` like the tools Tools.get() returns."""
+    from composio.types import Tool as _ComposioTool
+
+    execute = functools.partial(client.tools.execute, user_id=user_id, dangerously_skip_version_check=True)
+    return list(client.provider.wrap_tools(tools=[_ComposioTool.model_validate(s) for s in schemas], execute_tool=execute))
+
+
 def build_tools_for_agent(agent: Any) -> List[Any]:
     """Fetch Composio tools for the agent's connected toolkits and return LC tools.
     Requires composio SDK and composio_langchain provider to be installed/configured.
     """
     try:
-        from composio import Composio
-        from composio_langchain import LangchainProvider
+        import composio  # noqa: F401
+        import composio_langchain  # noqa: F401
     except Exception:
         logger.debug("Composio or composio_langchain not installed; skipping agent tool binding")
         return []
@@ -467,17 +552,37 @@ def build_tools_for_agent(agent: Any) -> List[Any]:
         return []
 
     try:
-        composio = Composio(provider=LangchainProvider())
         uid = str(getattr(agent, "user_id", "default"))
-        logger.debug("agent_tools: fetching tools user_id=%s toolkits=%s", uid, slugs)
-        tools = composio.tools.get(user_id=uid, toolkits=slugs)
-        logger.debug("agent_tools: fetched %s tools", len(tools) if hasattr(tools, "__len__") else "?")
+
+        def _fetch() -> List[Dict[str, Any]]:
+            logger.debug("agent_tools: fetching tools user_id=%s toolkits=%s", uid, slugs)
+            return [t.model_dump(mode="json") for t in _composio_client().tools.get_raw_composio_tools(toolkits=slugs)]
+
+        def _wrap(schemas: List[Dict[str, Any]]) -> List[Any]:
+            return _wrap_composio_tools(_composio_client(), uid, schemas)
+
+        # Sorted by name: the tool order is part of the prompt prefix the provider caches
+        tools = sorted(AGENT_TOOLS.get(uid, slugs, _fetch, _wrap), key=lambda t: getattr(t, "name", ""))
+        logger.debug("agent_tools: bound %s tools", len(tools))
         return tools  # These are LC-compatible tools
     except Exception:
         logger.exception("build_tools_for_agent: failed to fetch tools for %s", slugs)
         return []
 
 
+def _tool_schemas(tools: List[Any]) -> List[Dict[str, Any]]:
+    """OpenAI tool schemas sorted by name with keys sorted, so the tools block of the prompt
+    is byte-stable whatever order the toolkits returned the tools in."""
+    schemas = [json.loads(json.dumps(convert_to_openai_tool(t), sort_keys=True)) for t in tools]
+    return sorted(schemas, key=lambda s: s["function"]["name"])
+
+
+def _record_prompt_cache(ai: Any) -> None:
+    share = PROMPT_CACHE.record(ai)
+    if share is not None:
+        logger.info("prompt_cache: cached_share=%.2f overall=%.2f", share, PROMPT_CACHE.share)
+
+
 def build_graph_with_agent_tools(agent: Any, channel: str = "chat") -> Any:
     """Return a compiled LangGraph where the model is bound with the agent's tools.
     channel: "chat" or "ambient" controls which prompt/tools policy to use.
@@ -493,55 +598,181 @@ def build_graph_with_agent_tools(agent: Any, channel: str = "chat") -> Any:
         from agents.services.tools import list_chat_tools  # local import avoids circular
         all_tools = list_chat_tools(agent, agent_tools, include_job_tools=True)
 
+    # Knowledge, job and HITL tools are always bound; Composio tools are retrieved per turn
+    composio_names = {getattr(t, "name", None) for t in agent_tools}
+    selector = ToolSelector(all_tools, pinned=[t.name for t in all_tools if t.name not in composio_names])
+
     # Build a graph like the minimal ReAct one, but binding tools list
     builder = StateGraph(State)
+
+    @functools.lru_cache(maxsize=None)
+    def _prompt_prefix() -> Tuple[str, Tuple[Dict[str, Any], ...]]:
+        """System prompt and tool schemas, computed on the first call and reused by every
+        later one. The compiled graph is cached per (agent version, connections fingerprint),
+        so that is also the key of this memo; a byte-identical prefix lets the provider's
+        prompt cache serve it."""
+        if (channel or "chat").lower() == "ambient":
+            from agents.services.prompts.ambient import build_ambient_system_prompt  # type: ignore
+            combined_prompt = build_ambient_system_prompt(agent)
+        else:
+            from agents.services.prompts.chat import build_chat_system_prompt  # local import avoids circular
+            combined_prompt = build_chat_system_prompt(agent)
+        schemas = tuple(_tool_schemas(all_tools))
+        # Single concise line about prompt/tools, once per prefix
+        try:
+            prompt_preview = (combined_prompt or "")[:120].replace("\n", " ")
+            tool_names = [getattr(t, "name", None) or getattr(t, "__name__", None) or str(t) for t in all_tools]
+            logger.info("agent_graph(channel=%s): agent=%s tools=%s prompt_preview=\"%s\"", (channel or "chat"), str(getattr(agent, "id", "")), tool_names, prompt_preview)
+        except Exception:
+            pass
+        return combined_prompt, schemas
+
+    async def _aprompt_prefix() -> Tuple[str, Tuple[Dict[str, Any], ...]]:
+        if _prompt_prefix.cache_info().currsize:
+            return _prompt_prefix()
+        # The first build queries ConnectedIntegration; keep the ORM off the event loop
+        return await sync_to_async(_prompt_prefix, thread_sensitive=False)()
+
+    def _agent_messages(state: State) -> List[BaseMessage]:
+        messages_in: List[BaseMessage] = []
+        for m in state.get("messages", []) or []:
+            messages_in.append(_as_lc_message(m))
+        if not messages_in:
+            raise ValueError("Empty messages passed to model")
+        return messages_in
+
+    def _selected(schemas: Sequence[Dict[str, Any]], names: List[str]) -> Sequence[Dict[str, Any]]:
+        if len(names) == len(schemas):
+            return schemas
+        keep = set(names)
+        logger.info("tool_selection: agent=%s bound %s/%s tools", str(getattr(agent, "id", "")), len(keep), len(schemas))
+        return tuple(s for s in schemas if s["function"]["name"] in keep)
+
+    def _agent_output(ai: AIMessage, window: Any) -> Dict[str, Any]:
+        _record_prompt_cache(ai)
+        return {"messages": [{"role": "assistant", "content": getattr(ai, "content", ""), "tool_calls": getattr(ai, "tool_calls", None)}], **window.update}
+
     def _call_model_with_tools(state: State) -> Dict[str, List[Dict[str, Any]]]:
         try:
-            messages_in: List[BaseMessage] = []
-            for m in state.get("messages", []) or []:
-                messages_in.append(_as_lc_message(m))
-            # Prepend channel-specific system prompt
-            if (channel or "chat").lower() == "ambient":
-                from agents.services.prompts.ambient import build_ambient_system_prompt  # type: ignore
-                combined_prompt = build_ambient_system_prompt(agent)
-            else:
-                from agents.services.prompts.chat import build_chat_system_prompt  # local import avoids circular
-                combined_prompt = build_chat_system_prompt(agent)
-            # Only prepend if not already present at the start
-            if not messages_in or not isinstance(messages_in[0], SystemMessage):
-                messages_in = [SystemMessage(content=combined_prompt)] + messages_in
-            if not messages_in:
-                raise ValueError("Empty messages passed to model")
-            # Use full conversation history as-is (no trimming)
-            # Single concise debug line about prompt/tools
-            try:
-                prompt_preview = (combined_prompt or "")[:120].replace("\n", " ")
-                tool_names = []
-                for t in all_tools:
-                    try:
-                        tool_names.append(getattr(t, "name", None) or getattr(t, "__name__", None) or str(t))
-                    except Exception:
-                        tool_names.append("<tool>")
-                logger.info("agent_graph(channel=%s): agent=%s tools=%s prompt_preview=\"%s\"", (channel or "chat"), str(getattr(agent, "id", "")), tool_names, prompt_preview)
-            except Exception:
-                pass
-            llm = _build_llm().bind_tools(all_tools) if all_tools else _build_llm()
-            ai: AIMessage = llm.invoke(messages_in)
-            out = {"messages": [{"role": "assistant", "content": getattr(ai, "content", ""), "tool_calls": getattr(ai, "tool_calls", None)}]}
-            # Quiet success
-            return out
+            messages_in = _agent_messages(state)
+            combined_prompt, schemas = _prompt_prefix()
+            base_llm = _build_llm()
+            # System prompt + rolling summary + the recent turns that fit the token budget
+            window = _context_window(base_llm, combined_prompt, messages_in, state)
+            schemas = _selected(schemas, selector.select(messages_in))
+            ai: AIMessage = _with_tools(base_llm, schemas).invoke(window.messages)
+            return _agent_output(ai, window)
         except Exception as e:
             logger.exception("agent_tools: model invoke failed: %s", e)
             # Surface a minimal error message back into the stream path
-            return {"messages": [{"role": "assistant", "content": f"[error] {e}"}]} 
+            return {"messages": [{"role": "assistant", "content": f"[error] {e}"}]}
 
-    builder.add_node(_call_model_with_tools)
-    builder.add_node("tools", ToolNode(all_tools))
+    async def _acall_model_with_tools(state: State) -> Dict[str, List[Dict[str, Any]]]:
+        # Same as above on the event loop; cancellation (CancelledError) is not caught
+        try:
+            messages_in = _agent_messages(state)
+            combined_prompt, schemas = await _aprompt_prefix()
+            base_llm = _build_llm()
+            window = await _acontext_window(base_llm, combined_prompt, messages_in, state)
+            schemas = _selected(schemas, await selector.aselect(messages_in))
+            ai: AIMessage = await _with_tools(base_llm, schemas).ainvoke(window.messages)
+            return _agent_output(ai, window)
+        except Exception as e:
+            logger.exception("agent_tools: model invoke failed: %s", e)
+            return {"messages": [{"role": "assistant", "content": f"[error] {e}"}]}
+
+    builder.add_node("_call_model_with_tools", RunnableLambda(_call_model_with_tools, _acall_model_with_tools, name="_call_model_with_tools"))
+    builder.add_node("tools", tool_executor_node(all_tools))
     # When addressing nodes in edges, use the node name string, not the function object
     builder.add_edge("__start__", "_call_model_with_tools")
     builder.add_conditional_edges("_call_model_with_tools", _route_model_output)
     builder.add_edge("tools", "_call_model_with_tools")
-    return builder.compile(name="Agent Graph", checkpointer=DjangoCheckpointer())
+    return builder.compile(name="Agent Graph", checkpointer=AsyncDjangoCheckpointer())
+
+
+# ---- Compiled agent graphs, cached per agent version ----
+# Keyed by (agent id, agent.updated_at, channel, connections fingerprint): saving the agent or
+# touching the user's connections changes the key, so stale graphs stop being hit even across
+# workers. The invalidate hook only reclaims them early.
+_AgentGraphKey = Tuple[str, str, str, str]
+_AGENT_GRAPHS: "OrderedDict[_AgentGraphKey, Tuple[str, Any]]" = OrderedDict()
+_AGENT_GRAPHS_LOCK = threading.Lock()
+_AGENT_GRAPH_BUILDS: Dict[_AgentGraphKey, threading.Lock] = {}
+
+
+def _connections_fingerprint(user_id: Any) -> str:
+    """Cheap summary of the user's ConnectedIntegration rows; changes on any create, update or delete."""
+    from connections.models import ConnectedIntegration
+
+    agg = ConnectedIntegration.objects.filter(user_id=str(user_id)).aggregate(n=Count("id"), latest=Max("updated_at"))
+    return f"{agg['n']}:{agg['latest'].isoformat() if agg['latest'] else ''}"
+
+
+def _agent_graph_key(agent: Any, channel: str) -> _AgentGraphKey:
+    updated = getattr(agent, "updated_at", None)
+    return (
+        str(agent.id),
+        updated.isoformat() if updated else "",
+        (channel or "chat").lower(),
+        _connections_fingerprint(agent.user_id),
+    )
+
+
+def _remember_agent_graph(key: _AgentGraphKey, user_id: str, compiled: Any, max_size: int) -> None:
+    with _AGENT_GRAPHS_LOCK:
+        _AGENT_GRAPHS[key] = (user_id, compiled)
+        _AGENT_GRAPHS.move_to_end(key)
+        while len(_AGENT_GRAPHS) > max_size:
+            _AGENT_GRAPHS.popitem(last=False)
+
+
+def _cached_agent_graph(key: _AgentGraphKey) -> Optional[Any]:
+    with _AGENT_GRAPHS_LOCK:
+        entry = _AGENT_GRAPHS.get(key)
+        if entry is None:
+            return None
+        _AGENT_GRAPHS.move_to_end(key)
+        return entry[1]
+
+
+def get_agent_graph(agent: Any, channel: str = "chat") -> Any:
+    """Compiled graph for `agent`, built once per agent version and reused across messages.
+    Queries the database for the connections fingerprint, so call it from sync code.
+    """
+    max_size = int(getattr(settings, "AGENT_GRAPH_CACHE_SIZE", 128))
+    if max_size <= 0:
+        return build_graph_with_agent_tools(agent, channel=channel)
+    key = _agent_graph_key(agent, channel)
+    compiled = _cached_agent_graph(key)
+    if compiled is not None:
+        return compiled
+    with _AGENT_GRAPHS_LOCK:
+        build_lock = _AGENT_GRAPH_BUILDS.setdefault(key, threading.Lock())
+    # Concurrent first messages wait for one build instead of each refetching Composio tools
+    with build_lock:
+        compiled = _cached_agent_graph(key)
+        if compiled is None:
+            compiled = build_graph_with_agent_tools(agent, channel=channel)
+            _remember_agent_graph(key, str(agent.user_id), compiled, max_size)
+    with _AGENT_GRAPHS_LOCK:
+        _AGENT_GRAPH_BUILDS.pop(key, None)
+    return compiled
+
+
+def invalidate_agent_graphs(agent_id: Any = None, user_id: Any = None) -> int:
+    """Drop cached graphs of one agent and/or of every agent owned by `user_id`
+    (no arguments clears everything). Returns how many were dropped.
+    """
+    with _AGENT_GRAPHS_LOCK:
+        stale = [
+            key for key, (owner, _) in _AGENT_GRAPHS.items()
+            if (agent_id is None and user_id is None)
+            or (agent_id is not None and key[0] == str(agent_id))
+            or (user_id is not None and owner == str(user_id))
+        ]
+        for key in stale:
+            del _AGENT_GRAPHS[key]
+    return len(stale)
 
 
 def build_job_tools() -> List[Any]:
@@ -551,7 +782,10 @@ def build_job_tools() -> List[Any]:
     from agents.models import Job as _JobModel
     from chat.models import Thread as _ThreadModel
     from langchain_core.tools import tool
+    from agents.services.tool_result_cache import cached_tool
 
+    # Discovery tools are called repeatedly while drafting a job; serve repeats from memory
+    @cached_tool(ttl=60)
     @tool("toolkits_connected", return_direct=False)
     def toolkits_connected(user_id: str) -> Dict[str, Any]:
         """List toolkit slugs the user has connected accounts for. Args: user_id (UUID string)."""
@@ -562,6 +796,7 @@ def build_job_tools() -> List[Any]:
         except Exception as e:
             return {"error": str(e)}
 
+    @cached_tool(ttl=600)
     @tool("list_triggers", return_direct=False)
     def list_triggers(toolkit_slug: str) -> Dict[str, Any]:
         """List triggers for a toolkit. Args: toolkit_slug (string)."""
@@ -637,7 +872,7 @@ async def stream_interactive_async_with_agent(thread_id: str, text: str, user_id
             yield ev
         return
 
-    agent_graph = build_graph_with_agent_tools(agent)
+    agent_graph = await sync_to_async(get_agent_graph, thread_sensitive=False)(agent)
     input_state: State = {"messages": [{"role": "user", "content": text}]}
     config = {"configurable": {"thread_id": thread_id, "user_id": user_id}}
     # Quiet start; keep logs minimal
@@ -9,6 +9,8 @@ from langchain_openai import OpenAIEmbeddings
 from pydantic import BaseModel, Field
 from langchain_core.tools import tool
 
+from agents.services.tool_result_cache import cached_tool
+
 try:
     from pypdf import PdfReader  # lightweight PDF text extraction
 except Exception:  # pragma: no cover
@@ -77,11 +79,17 @@ def _rpc_match_documents(client: Client, embedding: List[float], k: int, filter_
     return data if isinstance(data, list) else []
 
 
+def _agent_context() -> Dict[str, Any]:
+    # The knowledge tools fall back to the current agent when no agent_id is passed
+    return {"agent_id": get_current_agent_id()}
+
+
 class KnowledgeCountInput(BaseModel):
     agent_id: Optional[str] = Field(description="Restrict to this agent's documents", default=None)
     tag: Optional[str] = Field(description="Restrict to a specific tag", default=None)
 
 
+@cached_tool(ttl=60, context=_agent_context)
 @tool("knowledge-count", args_schema=KnowledgeCountInput)
 def knowledge_count(agent_id: Optional[str] = None, tag: Optional[str] = None) -> List[Dict[str, Any]]:
     """Count knowledge documents with optional agent_id and tag filter (Supabase)."""
@@ -98,6 +106,7 @@ class KnowledgeSearchInput(BaseModel):
     tag: Optional[str] = Field(description="Restrict to a specific tag", default=None)
 
 
+@cached_tool(ttl=120, context=_agent_context)
 @tool("knowledge-search", args_schema=KnowledgeSearchInput)
 def knowledge_search(query: str, k: int = 4, agent_id: Optional[str] = None, tag: Optional[str] = None) -> List[Dict[str, Any]]:
     """Vector search across knowledge documents with optional agent/tag filters (Supabase + LangChain store)."""
@@ -0,0 +1,157 @@
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import threading
+import logging
+import os
+
+import httpx
+from django.conf import settings
+from langchain_openai import ChatOpenAI
+
+try:  # HTTP/2 needs the optional h2 package (httpx[http2])
+    import h2  # noqa: F401
+except Exception:  # pragma: no cover - optional
+    h2 = None
+
+
+logger = logging.getLogger(__name__)
+
+# Process-wide ChatOpenAI instances and the httpx pools behind them, so model calls reuse
+# keep-alive connections instead of paying connection setup and TLS handshakes per call.
+# The sync pool is shared by every thread. An async pool only works on the event loop it was
+# opened on (Celery tasks run a fresh loop each time), so async pools and the models wired to
+# them are kept per running loop and dropped once that loop closes.
+_ModelKey = Tuple[str, float, str, Optional[asyncio.AbstractEventLoop]]
+_MODELS: Dict[_ModelKey, ChatOpenAI] = {}
+_SYNC_HTTP: Dict[str, httpx.Client] = {}
+_ASYNC_HTTP: Dict[Tuple[Optional[asyncio.AbstractEventLoop], str], httpx.AsyncClient] = {}
+_LOCK = threading.Lock()
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        float(getattr(settings, "LLM_HTTP_TIMEOUT", 60)),
+        connect=float(getattr(settings, "LLM_HTTP_CONNECT_TIMEOUT", 10)),
+    )
+
+
+def _http_options() -> Dict[str, Any]:
+    return {
+        "timeout": _timeout(),
+        "limits": httpx.Limits(
+            max_connections=int(getattr(settings, "LLM_HTTP_MAX_CONNECTIONS", 100)),
+            max_keepalive_connections=int(getattr(settings, "LLM_HTTP_MAX_KEEPALIVE", 20)),
+            keepalive_expiry=float(getattr(settings, "LLM_HTTP_KEEPALIVE_EXPIRY", 60)),
+        ),
+        "http2": bool(getattr(settings, "LLM_HTTP2", True)) and h2 is not None,
+    }
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _prune_closed_loops() -> None:
+    for key in [k for k in _MODELS if k[3] is not None and k[3].is_closed()]:
+        del _MODELS[key]
+    # The transports died with their loop; nothing left to close gracefully
+    for key in [k for k in _ASYNC_HTTP if k[0] is not None and k[0].is_closed()]:
+        del _ASYNC_HTTP[key]
+
+
+def get_chat_model(model: Optional[str] = None, temperature: Optional[float] = None, base_url: Optional[str] = None) -> ChatOpenAI:
+    """Shared ChatOpenAI for (model, temperature, base_url); safe to use from any thread.
+    Defaults come from OPENAI_MODEL / OPENAI_TEMPERATURE / OPENAI_BASE_URL.
+    With LLM_BACKEND=fake every caller gets the deterministic FakeChatModel instead.
+    """
+    if getattr(settings, "LLM_BACKEND", "openai") == "fake":
+        from agents.services.fake_llm import get_fake_chat_model
+
+        return get_fake_chat_model(model)
+    model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    temperature = float(os.getenv("OPENAI_TEMPERATURE", "0") if temperature is None else temperature)
+    base_url = base_url if base_url is not None else getattr(settings, "OPENAI_BASE_URL", "")
+    loop = _running_loop()
+    key = (model, temperature, base_url, loop)
+    with _LOCK:
+        llm = _MODELS.get(key)
+        if llm is not None:
+            return llm
+        _prune_closed_loops()
+        sync_http = _SYNC_HTTP.get(base_url)
+        if sync_http is None:
+            sync_http = _SYNC_HTTP[base_url] = httpx.Client(**_http_options())
+        async_http = _ASYNC_HTTP.get((loop, base_url))
+        if async_http is None:
+            async_http = _ASYNC_HTTP[(loop, base_url)] = httpx.AsyncClient(**_http_options())
+        llm = ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            base_url=base_url or None,
+            timeout=_timeout(),
+            http_client=sync_http,
+            http_async_client=async_http,
+            # Custom clients turn off ChatOpenAI's default usage reporting on the OpenAI API
+            stream_usage=True if not base_url else None,
+        )
+        _MODELS[key] = llm
+        logger.debug("llm: new client model=%s temperature=%s base_url=%s", model, temperature, base_url or "default")
+        return llm
+
+
+def uses_fake_backend() -> bool:
+    """True when model calls go to FakeChatModel: LLM_BACKEND=fake, or no OPENAI_API_KEY."""
+    return getattr(settings, "LLM_BACKEND", "openai") == "fake" or not os.getenv("OPENAI_API_KEY", "").strip()
+
+
+def default_chat_model(model: Optional[str] = None, temperature: Optional[float] = None) -> Any:
+    """get_chat_model(), or the fake model when uses_fake_backend()."""
+    if uses_fake_backend():
+        from agents.services.fake_llm import get_fake_chat_model
+
+        return get_fake_chat_model(model)
+    return get_chat_model(model, temperature)
+
+
+class PromptCacheStats:
+    """Share of prompt tokens the provider served from its prefix cache (usage `cache_read`)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, message: Any) -> Optional[float]:
+        """Count one model response; returns its cached-prefix share, or None without usage data."""
+        usage = getattr(message, "usage_metadata", None) or {}
+        input_tokens = int(usage.get("input_tokens") or 0)
+        if not input_tokens:
+            return None
+        cached = int((usage.get("input_token_details") or {}).get("cache_read") or 0)
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.cached_tokens += cached
+        return cached / input_tokens
+
+    @property
+    def share(self) -> float:
+        with self._lock:
+            return self.cached_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "input_tokens": self.input_tokens,
+                "cached_tokens": self.cached_tokens,
+                "cached_share": round(self.cached_tokens / self.input_tokens, 4) if self.input_tokens else 0.0,
+            }
+
+
+# Process-wide; fed by the agent model nodes
+PROMPT_CACHE = PromptCacheStats()
@@ -6,7 +6,7 @@ import os
 from ..domain.contracts import AgentContext
 
 from pydantic import BaseModel
-from langchain_openai import ChatOpenAI
+from agents.services.llm import get_chat_model
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 
@@ -20,7 +20,7 @@ class ToolkitPlanner:
 
     def __init__(self, model: Optional[str] = None):
         self.model_name = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-        self.llm = ChatOpenAI(model=self.model_name, temperature=0)
+        self.llm = get_chat_model(self.model_name, 0)
         self.parser = JsonOutputParser(pydantic_object=_PlannedToolkits)
 
     def plan(self, goal: str, ctx: Optional[AgentContext] = None) -> Iterable[dict]:
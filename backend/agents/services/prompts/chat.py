@@ -58,7 +58,8 @@ def build_chat_system_prompt(agent: Any) -> str:
     accounts_by_toolkit: dict[str, list[str]] = {}
     try:
         from connections.models import ConnectedIntegration  # local import to avoid circular
-        qs = ConnectedIntegration.objects.filter(user_id=uid)
+        # Fixed order keeps the prompt byte-identical across turns (provider prefix caching)
+        qs = ConnectedIntegration.objects.filter(user_id=uid).order_by("toolkit_slug", "connected_account_id")
         for ci in qs:
             tk = str(getattr(ci, "toolkit_slug", "") or "").strip()
             ca = str(getattr(ci, "connected_account_id", "") or "").strip()
@@ -76,7 +77,7 @@ def build_chat_system_prompt(agent: Any) -> str:
     try:
         import json as _json
         toolkits_line = f"\nCONNECTED_TOOLKITS={','.join([s.upper() for s in toolkit_slugs])}" if toolkit_slugs else ""
-        accounts_line = f"\nCONNECTED_ACCOUNTS={_json.dumps(accounts_by_toolkit)}" if accounts_by_toolkit else ""
+        accounts_line = f"\nCONNECTED_ACCOUNTS={_json.dumps(accounts_by_toolkit, sort_keys=True)}" if accounts_by_toolkit else ""
     except Exception:
         toolkits_line = ""
         accounts_line = ""
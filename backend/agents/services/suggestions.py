@@ -3,7 +3,7 @@ from typing import Any, Dict, List, Optional
 import os
 
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
+from agents.services.llm import get_chat_model
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 
@@ -27,8 +27,8 @@ class _Suggestions(BaseModel):
 class SuggestionGenerator:
     def __init__(self, model: Optional[str] = None):
         self.model_name = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-        # ChatOpenAI uses OPENAI_API_KEY from env
-        self.llm = ChatOpenAI(model=self.model_name, temperature=0)
+        # Shared ChatOpenAI (OPENAI_API_KEY from env) with pooled connections
+        self.llm = get_chat_model(self.model_name, 0)
         self.parser = JsonOutputParser(pydantic_object=_Suggestions)
 
     def generate(
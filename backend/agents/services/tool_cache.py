@@ -0,0 +1,193 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+import threading
+import time
+import uuid
+import logging
+from django.conf import settings
+from django.core.cache import cache as _shared_cache
+
+
+logger = logging.getLogger(__name__)
+
+_ToolsKey = Tuple[str, Tuple[str, ...]]
+
+
+@dataclass
+class _ToolsEntry:
+    stamp: str
+    expires_at: float
+    tools: List[Any]
+
+
+class ComposioToolCache:
+    """Two-level TTL cache of Composio tool bindings keyed by (user_id, sorted toolkit slugs).
+
+    - In-process LRU of the wrapped LangChain tools, reused as-is across turns.
+    - Raw tool schemas (JSON) in the shared Django cache, so a cold worker skips the API call.
+
+    Each user has a version stamp in the shared cache that is part of the shared key and
+    remembered by local entries; `invalidate_user` rotates it whenever the user's
+    connections change, which misses both levels on every worker. Misses are single-flight:
+    per key within the process, and across processes via a short `cache.add` lock while
+    the schemas are fetched.
+    """
+
+    STAMP_TTL = 7 * 24 * 3600
+    FETCH_LOCK_TTL = 30
+    FETCH_WAIT = 5.0
+
+    def __init__(self, max_entries: int, ttl: int) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = max(0, int(ttl))
+        self._entries: "OrderedDict[_ToolsKey, _ToolsEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[_ToolsKey, threading.Lock] = {}
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    @staticmethod
+    def key(user_id: Any, slugs: Iterable[str]) -> _ToolsKey:
+        return str(user_id), tuple(sorted({str(s).upper() for s in slugs if s}))
+
+    @staticmethod
+    def _stamp_key(user_id: str) -> str:
+        return f"composio:tools:stamp:{user_id}"
+
+    @staticmethod
+    def _schemas_key(key: _ToolsKey, stamp: str) -> str:
+        digest = hashlib.sha1(",".join(key[1]).encode()).hexdigest()
+        return f"composio:tools:{key[0]}:{stamp}:{digest}"
+
+    def _read_stamp(self, user_id: str) -> Optional[str]:
+        try:
+            _shared_cache.add(self._stamp_key(user_id), uuid.uuid4().hex, self.STAMP_TTL)
+            return _shared_cache.get(self._stamp_key(user_id))
+        except Exception:
+            logger.debug("composio tool cache: stamp read failed", exc_info=True)
+            return None
+
+    def _cached(self, key: _ToolsKey, stamp: str) -> Optional[List[Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.stamp != stamp or entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return list(entry.tools)
+
+    def _remember(self, key: _ToolsKey, stamp: str, tools: List[Any]) -> None:
+        with self._lock:
+            self._entries[key] = _ToolsEntry(stamp=stamp, expires_at=time.monotonic() + self.ttl, tools=list(tools))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _shared_schemas(self, key: _ToolsKey, stamp: str, fetch: Callable[[], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Raw schemas from the shared tier, fetching them (once across workers) on a miss."""
+        schemas_key = self._schemas_key(key, stamp)
+        lock_key = f"{schemas_key}:lock"
+        try:
+            schemas = _shared_cache.get(schemas_key)
+            if schemas is not None:
+                self.shared_hits += 1
+                return schemas
+            owner = _shared_cache.add(lock_key, 1, self.FETCH_LOCK_TTL)
+            if not owner:
+                # Another worker is fetching the same schemas: wait briefly for its result
+                deadline = time.monotonic() + self.FETCH_WAIT
+                while time.monotonic() < deadline:
+                    time.sleep(0.1)
+                    schemas = _shared_cache.get(schemas_key)
+                    if schemas is not None:
+                        self.shared_hits += 1
+                        return schemas
+        except Exception:
+            logger.debug("composio tool cache: shared tier unavailable", exc_info=True)
+            return fetch()
+        try:
+            schemas = fetch()
+            _shared_cache.set(schemas_key, schemas, self.ttl)
+            return schemas
+        finally:
+            if owner:
+                _shared_cache.delete(lock_key)
+
+    def get(
+        self,
+        user_id: Any,
+        slugs: Iterable[str],
+        fetch: Callable[[], List[Dict[str, Any]]],
+        wrap: Callable[[List[Dict[str, Any]]], List[Any]],
+    ) -> List[Any]:
+        """Tools for (user_id, slugs). `fetch` returns raw schemas from the API and `wrap`
+        turns them into LangChain tools; both only run on a miss."""
+        key = self.key(user_id, slugs)
+        if not self.enabled:
+            return wrap(fetch())
+        stamp = self._read_stamp(key[0])
+        if stamp is None:
+            return wrap(fetch())
+        tools = self._cached(key, stamp)
+        if tools is not None:
+            self.hits += 1
+            return tools
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+        try:
+            with loading:
+                tools = self._cached(key, stamp)
+                if tools is not None:
+                    self.hits += 1
+                    return tools
+                self.misses += 1
+                tools = wrap(self._shared_schemas(key, stamp, fetch))
+                self._remember(key, stamp, tools)
+                return list(tools)
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+
+    def invalidate_user(self, user_id: Any) -> None:
+        """Forget every binding of `user_id` here and, through the stamp, on other workers."""
+        user_id = str(user_id)
+        try:
+            _shared_cache.set(self._stamp_key(user_id), uuid.uuid4().hex, self.STAMP_TTL)
+        except Exception:
+            logger.debug("composio tool cache: stamp write failed", exc_info=True)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+
+def _cache_from_settings() -> ComposioToolCache:
+    return ComposioToolCache(
+        getattr(settings, "COMPOSIO_TOOLS_CACHE_SIZE", 256),
+        getattr(settings, "COMPOSIO_TOOLS_CACHE_TTL", 600),
+    )
+
+
+# Shared by every agent graph built in the process
+AGENT_TOOLS = _cache_from_settings()
@@ -0,0 +1,296 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+import asyncio
+import bisect
+import json
+import threading
+import time
+import logging
+
+from django.conf import settings
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langgraph.errors import GraphBubbleUp
+from langgraph.prebuilt.tool_node import INVALID_TOOL_NAME_ERROR_TEMPLATE, TOOL_CALL_ERROR_TEMPLATE
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ToolExecutorPolicy:
+    """Limits for one tools step.
+
+    - max_workers: threads shared by all sync tool calls in the process.
+    - tool_timeout: seconds one call may take (per-tool overrides in TOOL_TIMEOUTS).
+    - turn_timeout: seconds for all calls of one model message together.
+    """
+    max_workers: int = 8
+    tool_timeout: float = 30.0
+    turn_timeout: float = 90.0
+    overrides: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_settings(cls) -> "ToolExecutorPolicy":
+        return cls(
+            max_workers=max(1, int(getattr(settings, "TOOL_EXECUTOR_MAX_WORKERS", cls.max_workers))),
+            tool_timeout=float(getattr(settings, "TOOL_TIMEOUT_SECONDS", cls.tool_timeout)),
+            turn_timeout=float(getattr(settings, "TOOL_TURN_TIMEOUT_SECONDS", cls.turn_timeout)),
+            overrides=dict(getattr(settings, "TOOL_TIMEOUTS", {}) or {}),
+        )
+
+    def timeout_for(self, name: str) -> float:
+        return float(self.overrides.get(name, self.tool_timeout))
+
+
+class ToolLatencyHistogram:
+    """Per-tool latency histograms (cumulative buckets, Prometheus style) plus outcome counts."""
+
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tools: Dict[str, Dict[str, Any]] = {}
+
+    def observe(self, name: str, seconds: float, outcome: str) -> None:
+        with self._lock:
+            entry = self._tools.setdefault(name, {
+                "count": 0, "sum": 0.0, "buckets": [0] * (len(self.BUCKETS) + 1), "ok": 0, "error": 0, "timeout": 0,
+            })
+            entry["count"] += 1
+            entry["sum"] += seconds
+            entry["buckets"][bisect.bisect_left(self.BUCKETS, seconds)] += 1
+            entry[outcome] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            out: Dict[str, Dict[str, Any]] = {}
+            for name, entry in self._tools.items():
+                running, buckets = 0, {}
+                for le, n in zip([*map(str, self.BUCKETS), "+Inf"], entry["buckets"]):
+                    running += n
+                    buckets[le] = running
+                out[name] = {**{k: entry[k] for k in ("count", "ok", "error", "timeout")}, "sum": round(entry["sum"], 4), "buckets": buckets}
+            return out
+
+
+# Process-wide; fed by every tool executor node
+TOOL_LATENCY = ToolLatencyHistogram()
+
+_POOL: Optional[ContextThreadPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _pool(policy: ToolExecutorPolicy) -> ContextThreadPoolExecutor:
+    """Bounded pool for sync tools. Context is copied into each call, so callbacks
+    (astream_events) and interrupt() still see the run they belong to."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ContextThreadPoolExecutor(max_workers=policy.max_workers, thread_name_prefix="agent-tools")
+        return _POOL
+
+
+def _tool_calls(state: Any) -> List[Dict[str, Any]]:
+    messages = state.get("messages", []) if isinstance(state, dict) else getattr(state, "messages", [])
+    last = messages[-1] if messages else None
+    if not isinstance(last, AIMessage):
+        raise ValueError("Tool executor expects the last message to be an AIMessage with tool calls")
+    return list(last.tool_calls or [])
+
+
+def _timeout_message(call: Dict[str, Any], seconds: float, turn: bool, started: bool = True) -> ToolMessage:
+    if started:
+        # A sync call keeps running after its deadline; a Composio action may still land
+        message = (
+            f"{call['name']} did not finish within {round(seconds, 1)}s and its result is unknown: it may still "
+            "complete and its side effects may already have happened. Do not call it again with the same "
+            "arguments unless you have checked that it did not take effect."
+        )
+    else:
+        message = f"{call['name']} was not started before the turn deadline, so it had no effect. It is safe to call it again."
+    error = {
+        "error": "timeout",
+        "tool": call["name"],
+        "timeout_seconds": round(seconds, 3),
+        "scope": "turn" if turn else "tool",
+        "started": started,
+        "message": message,
+    }
+    return ToolMessage(content=json.dumps(error), name=call["name"], tool_call_id=call["id"], status="error")
+
+
+def _error_message(call: Dict[str, Any], error: BaseException) -> ToolMessage:
+    return ToolMessage(
+        content=TOOL_CALL_ERROR_TEMPLATE.format(error=repr(error)), name=call["name"], tool_call_id=call["id"], status="error"
+    )
+
+
+def _as_message(call: Dict[str, Any], result: Any) -> ToolMessage:
+    if isinstance(result, ToolMessage):
+        return result
+    # Tools returning plain values (not declared with a tool_call input) still get a message
+    content = result if isinstance(result, str) else json.dumps(result, default=str)
+    return ToolMessage(content=content, name=call["name"], tool_call_id=call["id"])
+
+
+# How often run() re-checks deadlines while some calls still wait for a pool worker
+_QUEUE_POLL = 0.05
+
+
+class _Slot:
+    """When one tool call was picked up by a pool worker (time.monotonic), or None while queued."""
+
+    __slots__ = ("started",)
+
+    def __init__(self) -> None:
+        self.started: Optional[float] = None
+
+    def start(self) -> float:
+        self.started = time.monotonic()
+        return self.started
+
+    def run(self, on_start: Any, fn: Any, *args: Any) -> Any:
+        self.start()
+        on_start()
+        return fn(*args)
+
+    def deadline(self, tool_timeout: float, turn_deadline: float) -> float:
+        """The per-tool timeout counts from pickup; a queued call is bound by the turn only."""
+        return turn_deadline if self.started is None else min(self.started + tool_timeout, turn_deadline)
+
+
+class ToolExecutor:
+    """Runs the tool calls of the last AIMessage concurrently with per-tool and per-turn
+    deadlines. The per-tool deadline counts from when a pool worker picks the call up, so
+    calls queued behind a full pool are bound only by the turn deadline. A call that misses
+    its deadline gets a structured timeout ToolMessage: a queued one is cancelled and never
+    runs; a running sync call cannot be interrupted, so its thread finishes in the background,
+    the result is dropped, and the message warns the model not to retry it blindly.
+    """
+
+    def __init__(self, tools: Sequence[Any], policy: Optional[ToolExecutorPolicy] = None) -> None:
+        self.tools_by_name: Dict[str, Any] = {t.name: t for t in tools}
+        self.policy = policy or ToolExecutorPolicy.from_settings()
+
+    def _unknown(self, call: Dict[str, Any]) -> Optional[ToolMessage]:
+        if call["name"] in self.tools_by_name:
+            return None
+        content = INVALID_TOOL_NAME_ERROR_TEMPLATE.format(
+            requested_tool=call["name"], available_tools=", ".join(self.tools_by_name)
+        )
+        return ToolMessage(content=content, name=call["name"], tool_call_id=call["id"], status="error")
+
+    def _invoke(self, call: Dict[str, Any], config: RunnableConfig, slot: _Slot) -> Tuple[ToolMessage, float]:
+        started = slot.start()
+        tool = self.tools_by_name[call["name"]]
+        try:
+            if getattr(tool, "func", None) is None and getattr(tool, "coroutine", None) is not None:
+                # Async-only tool on the sync path: run it on this worker thread's own loop
+                result = _as_message(call, asyncio.run(tool.ainvoke({**call, "type": "tool_call"}, config)))
+            else:
+                result = _as_message(call, tool.invoke({**call, "type": "tool_call"}, config))
+        except GraphBubbleUp:
+            raise
+        except Exception as e:
+            result = _error_message(call, e)
+        return result, time.monotonic() - started
+
+    def _observe(self, call: Dict[str, Any], message: ToolMessage, seconds: float, outcome: Optional[str] = None) -> ToolMessage:
+        outcome = outcome or ("error" if getattr(message, "status", "success") == "error" else "ok")
+        TOOL_LATENCY.observe(call["name"], seconds, outcome)
+        if outcome == "timeout":
+            logger.warning("tools: %s timed out after %.2fs (call %s)", call["name"], seconds, call["id"])
+        return message
+
+    def run(self, state: Any, config: RunnableConfig) -> Dict[str, List[ToolMessage]]:
+        calls = _tool_calls(state)
+        turn_deadline = time.monotonic() + self.policy.turn_timeout
+        pool = _pool(self.policy)
+        slots: List[Optional[_Slot]] = [None if self._unknown(call) else _Slot() for call in calls]
+        futures: Dict[Future, int] = {
+            pool.submit(self._invoke, call, config, slot): i for i, (call, slot) in enumerate(zip(calls, slots)) if slot
+        }
+        out: List[Optional[ToolMessage]] = [self._unknown(call) for call in calls]
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            for future in list(pending):
+                i = futures[future]
+                call, slot = calls[i], slots[i]
+                if future.done():
+                    pending.discard(future)
+                    message, seconds = future.result()
+                    out[i] = self._observe(call, message, seconds)
+                    continue
+                deadline = slot.deadline(self.policy.timeout_for(call["name"]), turn_deadline)
+                if now < deadline:
+                    continue
+                pending.discard(future)
+                # Cancelling works only while the call is still queued behind other tools
+                if future.cancel():
+                    seconds = self.policy.turn_timeout
+                    out[i] = self._observe(call, _timeout_message(call, seconds, True, False), seconds, "timeout")
+                elif future.done():
+                    message, seconds = future.result()
+                    out[i] = self._observe(call, message, seconds)
+                else:
+                    seconds = now - (slot.started or now)
+                    out[i] = self._observe(call, _timeout_message(call, seconds, deadline == turn_deadline), seconds, "timeout")
+            if pending:
+                # A queued call gets its own deadline once it starts: poll while any is queued
+                wake = min(slots[futures[f]].deadline(self.policy.timeout_for(calls[futures[f]]["name"]), turn_deadline) for f in pending)
+                if any(slots[futures[f]].started is None for f in pending):
+                    wake = min(wake, time.monotonic() + _QUEUE_POLL)
+                wait(pending, timeout=max(0.0, wake - time.monotonic()), return_when=FIRST_COMPLETED)
+        return {"messages": out}
+
+    async def _arun_one(self, call: Dict[str, Any], config: RunnableConfig, turn_deadline: float) -> ToolMessage:
+        unknown = self._unknown(call)
+        if unknown is not None:
+            return unknown
+        tool_timeout = self.policy.timeout_for(call["name"])
+        tool = self.tools_by_name[call["name"]]
+        slot = _Slot()
+        if getattr(tool, "coroutine", None) is not None:
+            slot.start()
+            work = asyncio.ensure_future(tool.ainvoke({**call, "type": "tool_call"}, config))
+        else:
+            # Sync tool (most Composio tools): bounded pool, not the loop's default executor.
+            # Its deadline starts when a worker picks it up, not while it waits in the queue.
+            loop = asyncio.get_running_loop()
+            picked_up = asyncio.Event()
+            future = _pool(self.policy).submit(slot.run, lambda: loop.call_soon_threadsafe(picked_up.set), tool.invoke, {**call, "type": "tool_call"}, config)
+            work = asyncio.wrap_future(future)
+            waiter = asyncio.ensure_future(picked_up.wait())
+            await asyncio.wait({work, waiter}, timeout=max(0.0, turn_deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            if slot.started is None and future.cancel():
+                return self._observe(call, _timeout_message(call, self.policy.turn_timeout, True, False), self.policy.turn_timeout, "timeout")
+            while slot.started is None:  # picked up just as the turn deadline passed
+                await asyncio.sleep(0)
+        deadline = slot.deadline(tool_timeout, turn_deadline)
+        try:
+            message = _as_message(call, await asyncio.wait_for(work, timeout=max(0.0, deadline - time.monotonic())))
+        except asyncio.TimeoutError:
+            seconds = time.monotonic() - slot.started
+            return self._observe(call, _timeout_message(call, seconds, deadline == turn_deadline), seconds, "timeout")
+        except GraphBubbleUp:
+            raise
+        except Exception as e:
+            message = _error_message(call, e)
+        return self._observe(call, message, time.monotonic() - slot.started)
+
+    async def arun(self, state: Any, config: RunnableConfig) -> Dict[str, List[ToolMessage]]:
+        calls = _tool_calls(state)
+        turn_deadline = time.monotonic() + self.policy.turn_timeout
+        messages = await asyncio.gather(*(self._arun_one(call, config, turn_deadline) for call in calls))
+        return {"messages": list(messages)}
+
+
+def tool_executor_node(tools: Iterable[Any], name: str = "tools") -> RunnableLambda:
+    """Graph node replacing ToolNode: concurrent, deadline-bound tool execution."""
+    executor = ToolExecutor(list(tools))
+    return RunnableLambda(executor.run, executor.arun, name=name)
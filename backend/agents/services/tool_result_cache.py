@@ -0,0 +1,131 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+import copy
+import json
+import threading
+import time
+import logging
+
+from django.conf import settings
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, StructuredTool
+
+
+logger = logging.getLogger(__name__)
+
+_MISS = object()
+
+
+class ToolResultCache:
+    """Size-bounded TTL LRU of tool results keyed by (tool name, canonical args, user scope)."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Tuple[str, str, str]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return _MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        # Callers (and the model) may mutate what they get back
+        return copy.deepcopy(value)
+
+    def put(self, key: Tuple[str, str, str], value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: Any) -> None:
+        scope = str(user_id)
+        with self._lock:
+            for key in [k for k in self._entries if k[2] == scope]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+# Shared by every cached tool in the process
+TOOL_RESULTS = ToolResultCache(getattr(settings, "TOOL_RESULT_CACHE_SIZE", 1024))
+
+
+def _user_scope(config: Optional[RunnableConfig]) -> str:
+    cfg = (config or {}).get("configurable", {}) or {}
+    if cfg.get("user_id"):
+        return str(cfg["user_id"])
+    # No user on the run (e.g. internal graphs): never share results across threads
+    return f"thread:{cfg.get('thread_id') or ''}"
+
+
+def _canonical_args(tool: BaseTool, kwargs: Dict[str, Any]) -> str:
+    """Arguments with schema defaults filled in, so `k` omitted and `k=4` share an entry."""
+    schema = tool.args_schema
+    try:
+        if isinstance(schema, type) and hasattr(schema, "model_validate"):
+            kwargs = schema.model_validate(kwargs).model_dump()
+    except Exception:
+        pass
+    return json.dumps(kwargs, sort_keys=True, default=str)
+
+
+def _cacheable(value: Any) -> bool:
+    # Tools here report failures as {"error": ...} instead of raising; do not pin those
+    return not (isinstance(value, dict) and "error" in value)
+
+
+def cached_tool(ttl: float = 60.0, context: Optional[Callable[[], Dict[str, Any]]] = None) -> Callable[[BaseTool], BaseTool]:
+    """Opt a tool into result caching for `ttl` seconds, per user:
+
+        @cached_tool(ttl=300)
+        @tool("list_triggers")
+        def list_triggers(toolkit_slug: str) -> Dict[str, Any]: ...
+
+    `context` returns the implicit inputs a tool reads besides its arguments (e.g. the
+    current agent); they are part of the key, so callers that differ in them never share
+    an entry. Only the tool's function is wrapped, so a hit still runs through
+    BaseTool.invoke and emits the usual on_tool_start/on_tool_end events.
+    """
+    def decorate(tool: BaseTool) -> BaseTool:
+        if not isinstance(tool, StructuredTool) or tool.func is None:
+            raise TypeError(f"cached_tool needs a sync StructuredTool, got {type(tool).__name__}")
+        func = tool.func
+
+        def cached_func(config: RunnableConfig, **kwargs: Any) -> Any:
+            if not TOOL_RESULTS.enabled:
+                return func(**kwargs)
+            args = _canonical_args(tool, kwargs)
+            if context is not None:
+                args += "|" + json.dumps(context(), sort_keys=True, default=str)
+            key = (tool.name, args, _user_scope(config))
+            value = TOOL_RESULTS.get(key)
+            if value is not _MISS:
+                logger.debug("tool cache: hit %s", tool.name)
+                return value
+            value = func(**kwargs)
+            if _cacheable(value):
+                TOOL_RESULTS.put(key, value, ttl)
+            return value
+
+        return tool.model_copy(update={"func": cached_func})
+
+    return decorate
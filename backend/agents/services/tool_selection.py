@@ -0,0 +1,400 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+import math
+import os
+import re
+import threading
+import zlib
+import logging
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache as _shared_cache
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9]+")
+_IDENTIFIER = re.compile(r"[a-z0-9_]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can could do for from has have i in is it its me my of on or please "
+    "should so that the their them then there this to us was we what when where which who will with "
+    "would you your".split()
+)
+
+
+@dataclass
+class ToolSelectionPolicy:
+    """Which tools a model call is offered.
+
+    - top_k: retrieved tools bound per turn, on top of the pinned ones.
+    - min_tools: at or below this many candidates every tool is bound and nothing is retrieved.
+      Changing the bound tools invalidates the provider's prompt cache from the tools block on,
+      so selection only pays off for toolsets large enough to outweigh that.
+    - context_messages: messages before the latest user message that go into the query.
+    - min_recall: an embedder whose measured recall on the offline eval is below this is not
+      used, and every tool is bound. Embedders without a measured figure are trusted.
+    """
+    enabled: bool = True
+    top_k: int = 12
+    min_tools: int = 64
+    context_messages: int = 4
+    embedding_model: str = ""
+    min_recall: float = 0.95
+
+    @classmethod
+    def from_settings(cls) -> "ToolSelectionPolicy":
+        return cls(
+            enabled=bool(getattr(settings, "TOOL_SELECTION_ENABLED", cls.enabled)),
+            top_k=max(1, int(getattr(settings, "TOOL_SELECTION_TOP_K", cls.top_k))),
+            min_tools=max(0, int(getattr(settings, "TOOL_SELECTION_MIN_TOOLS", cls.min_tools))),
+            context_messages=max(0, int(getattr(settings, "TOOL_SELECTION_CONTEXT_MESSAGES", cls.context_messages))),
+            embedding_model=getattr(settings, "TOOL_SELECTION_EMBEDDING_MODEL", "") or "",
+            min_recall=float(getattr(settings, "TOOL_SELECTION_MIN_RECALL", cls.min_recall)),
+        )
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class LexicalEmbedder:
+    """Hashed bag of words. Needs no network or API key, so it is the fallback embedder and
+    what the offline eval uses by default; vectors are cheap and never cached."""
+
+    name = "lexical"
+    cacheable = False
+    # `manage.py eval_tool_selection` at the default top_k; asserted in agents/tests.py
+    recall = 0.917
+
+    def __init__(self, dim: int = 2048) -> None:
+        self.dim = dim
+
+    @staticmethod
+    def _terms(text: str) -> List[str]:
+        # snake_case / CamelCase tool names split into words
+        text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text).replace("_", " ").replace("-", " ").lower()
+        terms = []
+        for word in _WORD.findall(text):
+            if word in _STOPWORDS:
+                continue
+            for suffix in ("ing", "es", "ed", "s"):
+                if len(word) > len(suffix) + 2 and word.endswith(suffix):
+                    word = word[: -len(suffix)]
+                    break
+            terms.append(word)
+        return terms
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        counts: Dict[str, int] = {}
+        for term in self._terms(text):
+            counts[term] = counts.get(term, 0) + 1
+        for term, n in counts.items():
+            vector[zlib.crc32(term.encode()) % self.dim] += 1.0 + math.log(n)
+        return vector
+
+    def embed_documents(self, texts: Sequence[str]) -> np.ndarray:
+        return np.stack([self._embed(t) for t in texts]) if texts else np.zeros((0, self.dim), dtype=np.float32)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self._embed(text)
+
+    async def aembed_query(self, text: str) -> np.ndarray:
+        return self._embed(text)
+
+
+class OpenAIToolEmbedder:
+    """OpenAI embeddings (EMBEDDING_MODEL unless TOOL_SELECTION_EMBEDDING_MODEL is set)."""
+
+    cacheable = True
+    # Not measured offline; `eval_tool_selection --embedder openai` reports it
+    recall = None
+
+    def __init__(self, model: str) -> None:
+        from langchain_openai import OpenAIEmbeddings
+
+        self.name = f"openai:{model}"
+        self._client = OpenAIEmbeddings(model=model)
+
+    def embed_documents(self, texts: Sequence[str]) -> np.ndarray:
+        return np.asarray(self._client.embed_documents(list(texts)), dtype=np.float32)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return np.asarray(self._client.embed_query(text), dtype=np.float32)
+
+    async def aembed_query(self, text: str) -> np.ndarray:
+        return np.asarray(await self._client.aembed_query(text), dtype=np.float32)
+
+
+def default_embedder(policy: ToolSelectionPolicy) -> Any:
+    from agents.services.llm import uses_fake_backend
+
+    if uses_fake_backend():
+        return LexicalEmbedder()
+    return OpenAIToolEmbedder(policy.embedding_model or os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"))
+
+
+class ToolEmbeddingCache:
+    """Tool description embeddings keyed by (embedder, sha1 of the description text).
+
+    A toolkit version that changes a tool's name, description or parameters changes its
+    text and so its key; unchanged tools are embedded once per embedder. In-process LRU
+    plus the shared Django cache, so a cold worker does not re-embed known tools.
+    """
+
+    SHARED_TTL = 30 * 24 * 3600
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _shared_key(key: Tuple[str, str]) -> str:
+        return f"tools:embedding:{key[0]}:{key[1]}"
+
+    def embed(self, embedder: Any, texts: Sequence[str]) -> np.ndarray:
+        if not getattr(embedder, "cacheable", False) or not self.max_entries:
+            return embedder.embed_documents(texts)
+        keys = [(embedder.name, hashlib.sha1(t.encode()).hexdigest()) for t in texts]
+        found: Dict[Tuple[str, str], np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+            self.hits += len(found)
+        missing = [k for k in dict.fromkeys(keys) if k not in found]
+        if missing:
+            try:
+                shared = _shared_cache.get_many([self._shared_key(k) for k in missing])
+            except Exception:
+                logger.debug("tool embeddings: shared tier unavailable", exc_info=True)
+                shared = {}
+            for key in missing:
+                vector = shared.get(self._shared_key(key))
+                if vector is not None:
+                    found[key] = vector
+                    self.shared_hits += 1
+            todo = [k for k in missing if k not in found]
+            if todo:
+                self.misses += len(todo)
+                text_of = dict(zip(keys, texts))
+                vectors = embedder.embed_documents([text_of[k] for k in todo])
+                fresh = dict(zip(todo, vectors))
+                found.update(fresh)
+                try:
+                    _shared_cache.set_many({self._shared_key(k): v for k, v in fresh.items()}, self.SHARED_TTL)
+                except Exception:
+                    logger.debug("tool embeddings: shared write failed", exc_info=True)
+            with self._lock:
+                for key in missing:
+                    self._entries[key] = found[key]
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return np.stack([found[k] for k in keys])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "shared_hits": self.shared_hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+# Shared by every agent graph in the process
+TOOL_EMBEDDINGS = ToolEmbeddingCache(getattr(settings, "TOOL_EMBEDDING_CACHE_SIZE", 4096))
+
+
+def tool_text(tool: Any) -> str:
+    """What a tool is retrieved by: its name, description and parameter names."""
+    name = getattr(tool, "name", "") or ""
+    description = getattr(tool, "description", "") or ""
+    args = getattr(tool, "args", None) or {}
+    params = " ".join(f"{k} {(v or {}).get('description', '')}" if isinstance(v, dict) else str(k) for k, v in args.items())
+    return f"{name.replace('_', ' ')}\n{description[:1000]}\n{params[:500]}".strip()
+
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content
+    if not isinstance(content, str):
+        content = " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content or [])
+    if isinstance(message, ToolMessage):
+        # Results can be huge JSON; the tool name says more than its payload
+        content = f"{getattr(message, 'name', '') or ''} {content[:200]}"
+    names = " ".join(tc.get("name", "") for tc in getattr(message, "tool_calls", None) or [])
+    return f"{content[:1000]} {names}".strip()
+
+
+def _last_human(messages: Sequence[BaseMessage]) -> int:
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return i
+    return -1
+
+
+class ToolSelectionStats:
+    """How many tools model calls were offered versus how many were bound."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.offered = 0
+        self.bound = 0
+
+    def record(self, offered: int, bound: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.offered += offered
+            self.bound += bound
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "offered": self.offered,
+                "bound": self.bound,
+                "bound_share": round(self.bound / self.offered, 4) if self.offered else 0.0,
+            }
+
+
+# Process-wide; fed by every agent graph
+TOOL_SELECTION = ToolSelectionStats()
+
+
+class ToolSelector:
+    """Picks the tools bound to a model call: every pinned tool plus the `top_k` candidates
+    closest to the latest user message and the messages just before it.
+
+    The query only looks at the conversation up to the latest user message, so every call
+    of one turn's tool loop binds the same tools (and keeps the prompt prefix cacheable);
+    tools called earlier in the conversation, or named in it up to the latest user message,
+    are always kept. A new turn may pick different tools, which costs one uncached prompt;
+    below `min_tools` candidates the selector is inactive and the full, name-sorted tool
+    list stays in the prefix. Candidate embeddings are
+    computed on first use. If embedding fails, or the embedder's recall is below the
+    policy's `min_recall`, every tool is bound.
+    """
+
+    QUERY_MEMO = 64
+
+    def __init__(
+        self,
+        tools: Iterable[Any],
+        pinned: Iterable[str] = (),
+        policy: Optional[ToolSelectionPolicy] = None,
+        embedder: Any = None,
+    ) -> None:
+        self.policy = policy or ToolSelectionPolicy.from_settings()
+        self.names: List[str] = [getattr(t, "name", "") for t in tools]
+        pinned = set(pinned)
+        self.pinned = [n for n in self.names if n in pinned]
+        self._candidates = [t for t in tools if getattr(t, "name", "") not in pinned]
+        self._by_lower = {getattr(t, "name", "").lower(): t.name for t in self._candidates}
+        self._embedder = embedder
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self._memo: "OrderedDict[str, List[str]]" = OrderedDict()
+
+    @property
+    def active(self) -> bool:
+        if not self.policy.enabled or len(self._candidates) <= max(self.policy.min_tools, self.policy.top_k):
+            return False
+        recall = getattr(self._get_embedder(), "recall", None)
+        return recall is None or recall >= self.policy.min_recall
+
+    def _get_embedder(self) -> Any:
+        if self._embedder is None:
+            self._embedder = default_embedder(self.policy)
+        return self._embedder
+
+    def _ensure_index(self) -> np.ndarray:
+        with self._lock:
+            if self._matrix is None:
+                self._get_embedder()
+                texts = [tool_text(t) for t in self._candidates]
+                self._matrix = _normalize(TOOL_EMBEDDINGS.embed(self._embedder, texts))
+            return self._matrix
+
+    def query_text(self, messages: Sequence[BaseMessage]) -> str:
+        last = _last_human(messages)
+        if last < 0:
+            return ""
+        context = [m for m in messages[max(0, last - self.policy.context_messages):last] if not isinstance(m, ToolMessage)]
+        # The user's request counts double against the context before it
+        return "\n".join([_message_text(messages[last])] * 2 + [_message_text(m) for m in context])
+
+    def _named(self, messages: Sequence[BaseMessage]) -> set:
+        """Candidates called anywhere in the conversation or named up to the latest user message."""
+        called = {tc.get("name") for m in messages if isinstance(m, AIMessage) for tc in m.tool_calls or []}
+        text = "\n".join(_message_text(m) for m in messages[:_last_human(messages) + 1] if not isinstance(m, ToolMessage))
+        mentioned = {self._by_lower[w] for w in _IDENTIFIER.findall(text.lower()) if w in self._by_lower}
+        return called | mentioned
+
+    def _rank(self, query: np.ndarray) -> List[str]:
+        matrix = self._ensure_index()
+        scores = matrix @ _normalize(np.asarray(query, dtype=np.float32))
+        top = np.argsort(-scores, kind="stable")[: self.policy.top_k]
+        return [self._candidates[i].name for i in top if scores[i] > 0]
+
+    def _finish(self, query: str, retrieved: List[str], messages: Sequence[BaseMessage]) -> List[str]:
+        with self._lock:
+            self._memo[query] = retrieved
+            self._memo.move_to_end(query)
+            while len(self._memo) > self.QUERY_MEMO:
+                self._memo.popitem(last=False)
+        keep = set(self.pinned) | set(retrieved) | self._named(messages)
+        # Original order, so the same selection always renders the same tools block
+        selected = [n for n in self.names if n in keep]
+        TOOL_SELECTION.record(len(self.names), len(selected))
+        return selected
+
+    def _memoized(self, query: str) -> Optional[List[str]]:
+        with self._lock:
+            return self._memo.get(query)
+
+    def select(self, messages: Sequence[BaseMessage]) -> List[str]:
+        """Names of the tools to bind for a call on `messages`, in the original tool order."""
+        if not self.active:
+            return list(self.names)
+        query = self.query_text(messages)
+        retrieved = self._memoized(query)
+        if retrieved is None:
+            try:
+                retrieved = self._rank(self._embedder_for_query().embed_query(query))
+            except Exception:
+                logger.exception("tool selection: embedding failed, binding all %s tools", len(self.names))
+                return list(self.names)
+        return self._finish(query, retrieved, messages)
+
+    async def aselect(self, messages: Sequence[BaseMessage]) -> List[str]:
+        """select() for the event loop; the one-time index build runs off the loop."""
+        if not self.active:
+            return list(self.names)
+        query = self.query_text(messages)
+        retrieved = self._memoized(query)
+        if retrieved is None:
+            try:
+                if self._matrix is None:
+                    from asgiref.sync import sync_to_async
+
+                    await sync_to_async(self._ensure_index, thread_sensitive=False)()
+                retrieved = self._rank(await self._embedder_for_query().aembed_query(query))
+            except Exception:
+                logger.exception("tool selection: embedding failed, binding all %s tools", len(self.names))
+                return list(self.names)
+        return self._finish(query, retrieved, messages)
+
+    def _embedder_for_query(self) -> Any:
+        self._ensure_index()
+        return self._get_embedder()
@@ -47,7 +47,7 @@ def ambient_run_task(agent_id: str, payload: Dict[str, Any], correlation_id: str
     # 2) Drive ambient execution using agent-bound graph with seeded context
     import json as _json
     # Build agent-aware graph with ambient prompt/tools policy, but same HITL/checkpointer plumbing
-    agent_graph = graph_factory.build_graph_with_agent_tools(agent, channel="ambient")
+    agent_graph = graph_factory.get_agent_graph(agent, channel="ambient")
     # Load job for description/context by parsing from correlation_id pattern: "job-<uuid>-<...>"
     job = None
     if isinstance(correlation_id, str) and correlation_id.startswith("job-"):
@@ -83,10 +83,9 @@ def ambient_run_task(agent_id: str, payload: Dict[str, Any], correlation_id: str
     seed_text = _json.dumps(seed_obj, ensure_ascii=False)
     # Persist the seed user message so the full context is visible in the thread
     with transaction.atomic():
-        seq = Message.objects.filter(thread=thread).count()
-        Message.objects.create(thread=thread, role="user", content=seed_text, sequence=seq)
+        seed = Message.objects.append(thread, role="user", content=seed_text)
         try:
-            logger.info("ambient_run_task: saved seed user message seq=%s preview=%s", seq, seed_text[:120].replace("\n", " "))
+            logger.info("ambient_run_task: saved seed user message seq=%s preview=%s", seed.sequence, seed_text[:120].replace("\n", " "))
         except Exception:
             pass
 
@@ -128,8 +127,7 @@ def ambient_run_task(agent_id: str, payload: Dict[str, Any], correlation_id: str
         # Fallback: produce an error message and mark as failed
         error_text = f"Graph execution failed: {e}"
         with transaction.atomic():
-            seq = Message.objects.filter(thread=thread).count()
-            Message.objects.create(thread=thread, role="assistant", content=f"[error] {error_text}", sequence=seq)
+            Message.objects.append(thread, role="assistant", content=f"[error] {error_text}")
             run.status = "failed"
             run.completed_at = timezone.now()
             run.finished_at = run.completed_at
@@ -152,8 +150,7 @@ def ambient_run_task(agent_id: str, payload: Dict[str, Any], correlation_id: str
     if not (assistant_text or "").strip():
         assistant_text = ""
     with transaction.atomic():
-        seq = Message.objects.filter(thread=thread).count()
-        Message.objects.create(thread=thread, role="assistant", content=str(assistant_text), sequence=seq)
+        Message.objects.append(thread, role="assistant", content=str(assistant_text))
 
     # 4) If graph requested human review, respect waiting_human and do not mark as completed
     try:
@@ -167,8 +164,7 @@ def ambient_run_task(agent_id: str, payload: Dict[str, Any], correlation_id: str
     # 5) Create informational inbox item for success
 
     with transaction.atomic():
-        seq = Message.objects.filter(thread=thread).count()
-        Message.objects.create(thread=thread, role="assistant", content=assistant_text, sequence=seq)
+        Message.objects.append(thread, role="assistant", content=assistant_text)
         run.status = "succeeded"
         run.completed_at = timezone.now()
         run.finished_at = run.completed_at
@@ -232,3 +228,18 @@ def enqueue_scheduled_jobs():
         except Exception:
             # Best-effort: continue processing other jobs
             continue
+
+
+@shared_task
+def compact_graph_checkpoints():
+    """Apply the checkpoint retention policy (see agents.services.checkpoint_retention).
+    Deletes in bounded batches and reports rows/bytes reclaimed for this run.
+    """
+    from agents.services.checkpoint_retention import compact_checkpoints
+
+    report = compact_checkpoints()
+    logger.info(
+        "compact_graph_checkpoints: threads=%s rows_deleted=%s bytes_reclaimed=%s batches=%s truncated=%s",
+        report.threads_scanned, report.rows_deleted, report.bytes_reclaimed, report.batches, report.truncated,
+    )
+    return report.as_dict()
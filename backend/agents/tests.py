@@ -1,3 +1,906 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import List
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langchain_core.tools import tool
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+
+from agents.services import context_window, graph_factory, knowledge, llm, tool_executor
+from agents.services.tool_result_cache import TOOL_RESULTS, cached_tool
+from agents.services.checkpoint_retention import RetentionPolicy, compact_checkpoints
+from agents.services import checkpointer as checkpointer_module
+from agents.services.checkpointer import AsyncDjangoCheckpointer, DjangoCheckpointer, LatestCheckpointCache, _pool_conninfo
+from agents.services.fake_llm import FakeChatModel, _load_script
+from agents.services.tool_selection import LexicalEmbedder, ToolSelectionPolicy, ToolSelector, default_embedder
+from chat.models import GraphCheckpoint, GraphCheckpointWrite, Run, Thread
+
+
+class CheckpointerPutQueryCountTests(TestCase):
+    def setUp(self):
+        self.thread = Thread.objects.create(user_id=uuid.uuid4())
+        self.run = Run.objects.create(thread=self.thread, status="running")
+        self.saver = DjangoCheckpointer()
+        self.checkpoint = empty_checkpoint()
+        self.version = 0
+
+    def _config(self, **extra):
+        return {"configurable": {"thread_id": str(self.thread.id), "checkpoint_id": self.checkpoint["id"], **extra}}
+
+    def _step(self, config, step, messages):
+        """put() the next checkpoint of the turn, as the pregel loop does after each superstep."""
+        self.version += 1
+        self.checkpoint = {
+            **self.checkpoint,
+            "id": str(uuid6(clock_seq=step)),
+            "channel_values": {"messages": list(messages)},
+            "channel_versions": {"messages": self.version},
+        }
+        self.saver.put(config, self.checkpoint, {"source": "loop", "step": step}, {"messages": self.version})
+
+    def test_multi_tool_turn_puts_are_single_inserts(self):
+        tool_calls = [
+            {"id": "call_1", "name": "search", "args": {"q": "a"}},
+            {"id": "call_2", "name": "search", "args": {"q": "b"}},
+        ]
+        turn = [HumanMessage("find a and b")]
+        # input, model (two tool calls), tools, model answer: one INSERT per checkpoint and per task write
+        with self.assertNumQueries(8):
+            self._step(self._config(run_id=str(self.run.id)), -1, [])
+            self._step(self._config(run_id=str(self.run.id)), 0, turn)
+            turn.append(AIMessage("", tool_calls=tool_calls))
+            self.saver.put_writes(self._config(), [("messages", turn[-1:])], "model")
+            self._step(self._config(run_id=str(self.run.id)), 1, turn)
+            for call in tool_calls:
+                result = ToolMessage("ok", tool_call_id=call["id"])
+                self.saver.put_writes(self._config(), [("messages", [result])], call["id"])
+                turn.append(result)
+            self._step(self._config(run_id=str(self.run.id)), 2, turn)
+            self.saver.put_writes(self._config(), [("messages", [AIMessage("done")])], "model-2")
+        self.assertEqual(GraphCheckpoint.objects.filter(thread=self.thread, run=self.run).count(), 4)
+
+    def test_run_is_resolved_once_per_thread_without_run_id(self):
+        with self.assertNumQueries(2):
+            self._step(self._config(), -1, [])
+        with self.assertNumQueries(1):
+            self._step(self._config(), 0, [HumanMessage("hi")])
+        self.assertEqual(set(GraphCheckpoint.objects.filter(thread=self.thread).values_list("run_id", flat=True)), {self.run.id})
+
+
+
+
+class CheckpointerRoundTripTests(TestCase):
+    def setUp(self):
+        self.thread = Thread.objects.create(user_id=uuid.uuid4())
+        self.run = Run.objects.create(thread=self.thread, status="running")
+        self.saver = DjangoCheckpointer(delta=True, snapshot_interval=3)
+
+    def _chain(self, saver, thread_id, count, start=None, parent_id=""):
+        """put() `count` checkpoints after `start` (a checkpoint), one message per step; returns them oldest first."""
+        checkpoint = start or empty_checkpoint()
+        out = []
+        for step in range(count):
+            version = len(out) + (checkpoint["channel_versions"].get("messages") or 0) + 1
+            messages = list(checkpoint["channel_values"].get("messages") or []) + [HumanMessage(f"m{version}", id=f"m{version}")]
+            checkpoint = {
+                **checkpoint,
+                "id": str(uuid6(clock_seq=step)),
+                "channel_values": {"messages": messages, "step": step},
+                "channel_versions": {"messages": version, "step": version},
+            }
+            config = {"configurable": {"thread_id": str(thread_id), "checkpoint_ns": "", "checkpoint_id": parent_id, "run_id": str(self.run.id)}}
+            with self.captureOnCommitCallbacks(execute=True):
+                saver.put(config, checkpoint, {"source": "loop", "step": step, "tag": "even" if step % 2 == 0 else "odd"}, {"messages": version, "step": version})
+            parent_id = checkpoint["id"]
+            out.append(checkpoint)
+        return out
+
+    def _config(self, checkpoint_id=None, thread_id=None):
+        return {"configurable": {"thread_id": str(thread_id or self.thread.id), "checkpoint_ns": "", **({"checkpoint_id": checkpoint_id} if checkpoint_id else {})}}
+
+    def test_delta_and_snapshot_rows_round_trip(self):
+        chain = self._chain(self.saver, self.thread.id, 5)
+        rows = list(GraphCheckpoint.objects.filter(thread=self.thread).order_by("created_at").values_list("is_snapshot", "depth"))
+        self.assertEqual(rows, [(True, 0), (False, 1), (False, 2), (True, 0), (False, 1)])
+
+        latest = self.saver.get_tuple(self._config())
+        self.assertEqual(latest.config["configurable"]["checkpoint_id"], chain[-1]["id"])
+        self.assertEqual(latest.checkpoint["channel_values"], chain[-1]["channel_values"])
+        self.assertEqual(latest.parent_config["configurable"]["checkpoint_id"], chain[-2]["id"])
+        for checkpoint in chain:
+            tup = self.saver.get_tuple(self._config(checkpoint["id"]))
+            self.assertEqual(tup.checkpoint["channel_values"], checkpoint["channel_values"])
+            self.assertEqual(tup.checkpoint["channel_versions"], checkpoint["channel_versions"])
+
+        listed = list(self.saver.list(self._config()))
+        self.assertEqual([t.config["configurable"]["checkpoint_id"] for t in listed], [c["id"] for c in reversed(chain)])
+        self.assertEqual([t.checkpoint["channel_values"] for t in listed], [c["channel_values"] for c in reversed(chain)])
+
+    def test_compressed_snapshot_round_trips(self):
+        saver = DjangoCheckpointer(delta=False, compress_threshold=1)
+        chain = self._chain(saver, self.thread.id, 2)
+        self.assertTrue(all(t.endswith("+zstd") for t in GraphCheckpoint.objects.filter(thread=self.thread).values_list("blob_type", flat=True)))
+        self.assertEqual(saver.get_tuple(self._config()).checkpoint["channel_values"], chain[-1]["channel_values"])
+
+    def test_legacy_json_row_is_read(self):
+        checkpoint = {**empty_checkpoint(), "id": str(uuid6()), "channel_values": {"topic": "legacy"}, "channel_versions": {"topic": 1}}
+        GraphCheckpoint.objects.create(
+            thread=self.thread, run=self.run, checkpoint_id=checkpoint["id"],
+            state=checkpoint, writes=[["task-1", "topic", "pending"]], metadata={"source": "loop", "step": 0},
+        )
+        tup = self.saver.get_tuple(self._config())
+        self.assertEqual(tup.checkpoint["channel_values"], {"topic": "legacy"})
+        self.assertEqual(tup.pending_writes, [("task-1", "topic", "pending")])
+        self.assertIsNone(tup.parent_config)
+        self.assertEqual(len(list(self.saver.list(self._config()))), 1)
+
+    def test_put_writes_are_replayed(self):
+        chain = self._chain(self.saver, self.thread.id, 2)
+        config = self._config(chain[-1]["id"])
+        answer = AIMessage("done", id="a1")
+        self.saver.put_writes(config, [("messages", [answer]), ("step", 9)], "task-a")
+        # Regular writes are idempotent per (task, idx): a retry keeps the first value
+        self.saver.put_writes(config, [("messages", [AIMessage("retry")])], "task-a")
+        self.saver.put_writes(config, [("__interrupt__", "first")], "task-b")
+        self.saver.put_writes(config, [("__interrupt__", "second")], "task-b")
+        # Writes for an older checkpoint stay with it
+        self.saver.put_writes(self._config(chain[0]["id"]), [("messages", [HumanMessage("old")])], "task-c")
+
+        writes = self.saver.get_tuple(self._config()).pending_writes
+        self.assertEqual(writes, [("task-a", "messages", [answer]), ("task-a", "step", 9), ("task-b", "__interrupt__", "second")])
+        self.assertEqual(self.saver.get_tuple(self._config(chain[0]["id"])).pending_writes[0][0], "task-c")
+        listed = {t.config["configurable"]["checkpoint_id"]: t.pending_writes for t in self.saver.list(self._config())}
+        self.assertEqual(listed[chain[-1]["id"]], writes)
+
+    def test_list_before_pages_without_gaps(self):
+        chain = self._chain(self.saver, self.thread.id, 7)
+        seen, before = [], None
+        while True:
+            page = list(self.saver.list(self._config(), before=before, limit=3))
+            if not page:
+                break
+            seen += [t.config["configurable"]["checkpoint_id"] for t in page]
+            before = page[-1].config
+        self.assertEqual(seen, [c["id"] for c in reversed(chain)])
+        # Unknown anchors fall back to checkpoint id order
+        self.assertEqual(len(list(self.saver.list(self._config(), before=self._config(str(uuid6()))))), 7)
+
+    def test_list_filters(self):
+        chain = self._chain(self.saver, self.thread.id, 4)
+        other = Thread.objects.create(user_id=uuid.uuid4())
+        self._chain(self.saver, other.id, 2)
+
+        def ids(config, **kwargs):
+            return [t.config["configurable"]["checkpoint_id"] for t in self.saver.list(config, **kwargs)]
+
+        self.assertEqual(ids(self._config(), filter={"step": 2}), [chain[2]["id"]])
+        self.assertEqual(ids(self._config(), filter={"source": "loop", "tag": "odd"}), [chain[3]["id"], chain[1]["id"]])
+        self.assertEqual(len(ids(self._config(), filter={"run_id": str(self.run.id)})), 4)
+        self.assertEqual(ids(self._config(), filter={"source": "input"}), [])
+        self.assertEqual(len(ids(None, filter={"step": 0})), 2)
+
+    def test_fork_replays_from_parent_thread(self):
+        chain = self._chain(self.saver, self.thread.id, 4)
+        fork_thread = Thread.objects.create(user_id=self.thread.user_id)
+        fork_config = self.saver.fork(self._config(chain[1]["id"]), str(fork_thread.id))
+
+        forked = self.saver.get_tuple(self._config(thread_id=fork_thread.id))
+        self.assertEqual(forked.config["configurable"]["checkpoint_id"], fork_config["configurable"]["checkpoint_id"])
+        self.assertEqual(forked.checkpoint["channel_values"], chain[1]["channel_values"])
+        self.assertEqual(forked.parent_config["configurable"], {"thread_id": str(self.thread.id), "checkpoint_ns": "", "checkpoint_id": chain[1]["id"]})
+        self.assertEqual(forked.metadata["source"], "fork")
+
+        # The fork grows independently; its source thread is untouched
+        grown = self._chain(self.saver, fork_thread.id, 1, start=forked.checkpoint, parent_id=fork_config["configurable"]["checkpoint_id"])
+        self.assertEqual(self.saver.get_tuple(self._config(thread_id=fork_thread.id)).checkpoint["channel_values"], grown[-1]["channel_values"])
+        self.assertEqual(self.saver.get_tuple(self._config()).checkpoint["channel_values"], chain[-1]["channel_values"])
+
+    def test_async_api_matches_sync(self):
+        chain = self._chain(self.saver, self.thread.id, 3)
+
+        async def read():
+            tup = await self.saver.aget_tuple(self._config())
+            listed = [t async for t in self.saver.alist(self._config(), limit=2)]
+            return tup, listed
+
+        tup, listed = async_to_sync(read)()
+        self.assertEqual(tup.checkpoint["channel_values"], chain[-1]["channel_values"])
+        self.assertEqual([t.config["configurable"]["checkpoint_id"] for t in listed], [chain[2]["id"], chain[1]["id"]])
+
+    def test_latest_checkpoint_cache_serves_puts_and_honours_foreign_stamps(self):
+        with mock.patch.object(checkpointer_module, "LATEST_CHECKPOINTS", LatestCheckpointCache(1 << 20)) as latest:
+            chain = self._chain(self.saver, self.thread.id, 2)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.saver.put_writes(self._config(chain[-1]["id"]), [("step", 5)], "task-a")
+            with self.assertNumQueries(0):
+                tup = self.saver.get_tuple(self._config())
+            self.assertEqual(tup.checkpoint["channel_values"], chain[-1]["channel_values"])
+            self.assertEqual(tup.pending_writes, [("task-a", "step", 5)])
+            # Callers get a copy they may mutate
+            tup.checkpoint["channel_values"]["messages"].append(AIMessage("scribble"))
+            self.assertEqual(self.saver.get_tuple(self._config()).checkpoint["channel_values"], chain[-1]["channel_values"])
+
+            # Another worker wrote to this thread: its stamp rotation turns the next read into a miss
+            cache.set(LatestCheckpointCache._stamp_key((str(self.thread.id), "default")), "other-worker")
+            misses = latest.misses
+            # Checkpoint row, its writes and its delta group
+            with self.assertNumQueries(3):
+                self.assertEqual(self.saver.get_tuple(self._config()).pending_writes, [("task-a", "step", 5)])
+            self.assertEqual(latest.misses, misses + 1)
+            with self.assertNumQueries(0):
+                self.saver.get_tuple(self._config())
+
+    def test_cache_hit_matches_cold_read(self):
+        with mock.patch.object(checkpointer_module, "LATEST_CHECKPOINTS", LatestCheckpointCache(1 << 20)) as latest:
+            chain = self._chain(self.saver, self.thread.id, 3)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.saver.put_writes(self._config(chain[-1]["id"]), [("messages", [AIMessage("hi", id="w1")])], "task-a")
+            with self.assertNumQueries(0):
+                hit = self.saver.get_tuple(self._config())
+            latest.invalidate_thread(str(self.thread.id))
+            cold = self.saver.get_tuple(self._config())
+        self.assertEqual(hit.parent_config["configurable"]["checkpoint_id"], chain[-2]["id"])
+        self.assertEqual(hit, cold)
+
+    def test_pool_conninfo_drops_django_only_options(self):
+        conninfo = _pool_conninfo({
+            "NAME": "app", "USER": "svc", "PASSWORD": "", "HOST": "db", "PORT": 5432,
+            "OPTIONS": {"sslmode": "require", "isolation_level": 1, "pool": True},
+        })
+        self.assertEqual(dict(part.split("=", 1) for part in conninfo.split()), {"dbname": "app", "user": "svc", "host": "db", "port": "5432", "sslmode": "require"})
+
+
+
+class _FakePool:
+    """Stands in for psycopg_pool.AsyncConnectionPool; every query finds nothing."""
+
+    opened: List["_FakePool"] = []
+
+    def __init__(self, conninfo, **kwargs):
+        self.loop = None
+
+    async def open(self):
+        self.loop = asyncio.get_running_loop()
+        _FakePool.opened.append(self)
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        # Connections are bound to the loop the pool was opened on
+        assert asyncio.get_running_loop() is self.loop
+        cursor = mock.AsyncMock()
+        cursor.fetchone.return_value = None
+        yield mock.Mock(execute=mock.AsyncMock(return_value=cursor))
+
+
+class AsyncCheckpointerPoolTests(SimpleTestCase):
+    def test_one_pool_outlives_short_lived_loops(self):
+        _FakePool.opened = []
+        saver = AsyncDjangoCheckpointer()
+        saver.native = True
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+        with mock.patch.object(checkpointer_module, "AsyncConnectionPool", _FakePool), \
+                mock.patch.object(checkpointer_module, "_pool_conninfo", return_value="dbname=bench"), \
+                mock.patch.object(checkpointer_module, "_POOL", None):
+            for _ in range(4):
+                # Each request loop (async_to_sync, asyncio.run in Celery) closes after use
+                self.assertIsNone(asyncio.run(saver.aget_tuple(config)))
+        self.assertEqual(len(_FakePool.opened), 1)
+        self.assertFalse(_FakePool.opened[0].loop.is_closed())
+
+
+class CheckpointRetentionTests(TestCase):
+    def setUp(self):
+        self.thread = Thread.objects.create(user_id=uuid.uuid4())
+        self.run = Run.objects.create(thread=self.thread, status="succeeded")
+        self.created = timezone.now() - timedelta(hours=1)
+
+    def _chain(self, spec):
+        """Create checkpoints oldest first; spec items are "S" (snapshot) or "D" (delta of the last snapshot)."""
+        ids, snapshot = [], ""
+        for kind in spec:
+            cid = f"ckpt-{len(ids):03d}"
+            if kind == "S":
+                snapshot = ""
+            self.created += timedelta(seconds=1)
+            row = GraphCheckpoint.objects.create(
+                thread=self.thread, run=self.run, checkpoint_id=cid, parent_id=ids[-1] if ids else "",
+                is_snapshot=kind == "S", snapshot_id=snapshot,
+            )
+            GraphCheckpoint.objects.filter(pk=row.pk).update(created_at=self.created)
+            if kind == "S":
+                snapshot = cid
+            ids.append(cid)
+        return ids
+
+    def _remaining(self, thread):
+        return list(GraphCheckpoint.objects.filter(thread=thread).order_by("created_at").values_list("checkpoint_id", flat=True))
+
+    def test_keeps_latest_snapshots(self):
+        ids = self._chain("SSSSS")
+        report = compact_checkpoints(RetentionPolicy(keep_last=2, ambient_max_age_days=0))
+        self.assertEqual(self._remaining(self.thread), ids[-2:])
+        self.assertEqual(report.rows_deleted, 3)
+
+    def test_keeps_snapshot_needed_by_kept_deltas(self):
+        ids = self._chain("SDDSDDD")
+        compact_checkpoints(RetentionPolicy(keep_last=2, ambient_max_age_days=0))
+        # The newest two are deltas; their whole group back to the snapshot survives
+        self.assertEqual(self._remaining(self.thread), ids[3:])
+
+    def test_keeps_groups_referenced_by_a_fork(self):
+        ids = self._chain("SDDSD")
+        fork = Thread.objects.create(user_id=self.thread.user_id)
+        fork_run = Run.objects.create(thread=fork, status="succeeded")
+        GraphCheckpoint.objects.create(
+            thread=fork, run=fork_run, checkpoint_id="fork-000", parent_id=ids[1],
+            is_snapshot=False, snapshot_id=ids[0],
+        )
+        compact_checkpoints(RetentionPolicy(keep_last=1, ambient_max_age_days=0))
+        self.assertEqual(self._remaining(self.thread), ids)
+        self.assertEqual(self._remaining(fork), ["fork-000"])
+
+    def test_keeps_run_checkpoint(self):
+        ids = self._chain("SSSS")
+        Run.objects.filter(pk=self.run.pk).update(checkpoint_id=ids[0])
+        compact_checkpoints(RetentionPolicy(keep_last=1, ambient_max_age_days=0))
+        self.assertEqual(self._remaining(self.thread), [ids[0], ids[-1]])
+
+
+def _turns(n, size=400):
+    history = []
+    for i in range(n):
+        history += [HumanMessage(f"question {i} " + "q" * size), AIMessage(f"answer {i} " + "a" * size)]
+    return history
+
+
+class ContextWindowTests(SimpleTestCase):
+    def test_under_budget_sends_history_verbatim(self):
+        history = _turns(3)
+        window = context_window.build_context("system", history, {}, "gpt-4o-mini")
+        self.assertEqual(window.messages[1:], history)
+        self.assertEqual(window.update, {})
+        self.assertEqual(window.tokens_saved, 0)
+
+    @mock.patch.object(context_window, "_summary_llm", return_value=None)
+    def test_over_budget_keeps_recent_turns_and_folds_the_rest(self, _):
+        history = _turns(8)
+        with self.settings(CONTEXT_TOKEN_BUDGET=1200, CONTEXT_KEEP_TURNS=3, CONTEXT_SUMMARY_MAX_TOKENS=100):
+            window = context_window.build_context("system", history, {}, "gpt-4o-mini")
+        self.assertEqual(window.messages[1:], history[-6:])
+        self.assertIsInstance(window.messages[0], SystemMessage)
+        self.assertIn("question 4", window.messages[0].content)
+        self.assertNotIn("question 5", window.messages[0].content)
+        self.assertEqual(window.update["context_summarized"], 10)
+        self.assertLess(window.sent_tokens, window.history_tokens)
+
+    @mock.patch.object(context_window, "_summary_llm", return_value=None)
+    def test_summary_is_only_extended_once_the_budget_is_exceeded_again(self, _):
+        history = _turns(8)
+        with self.settings(CONTEXT_TOKEN_BUDGET=1200, CONTEXT_KEEP_TURNS=3, CONTEXT_SUMMARY_MAX_TOKENS=100):
+            first = context_window.build_context("system", history, {}, "gpt-4o-mini")
+            state = dict(first.update)
+            # One more short turn still fits: reuse the summary, fold nothing
+            more = history + [HumanMessage("short"), AIMessage("ok")]
+            second = context_window.build_context("system", more, state, "gpt-4o-mini")
+            self.assertEqual(second.update, {})
+            self.assertEqual(second.messages[1:], more[10:])
+            # A long one does not: the summary grows from where it stopped
+            more += _turns(2)
+            third = context_window.build_context("system", more, state, "gpt-4o-mini")
+        self.assertGreater(third.update["context_summarized"], 10)
+        self.assertIn("question 7", third.update["context_summary"])
+
+    def test_token_counts_only_tokenize_new_messages(self):
+        class Encoding:
+            def __init__(self):
+                self.encoded = []
+
+            def encode(self, text, disallowed_special=()):
+                self.encoded.append(text)
+                return text.split()
+
+        enc = Encoding()
+        history = _turns(4)
+        with mock.patch.object(context_window, "_encoding", return_value=enc), \
+                mock.patch.object(context_window, "MESSAGE_TOKENS", context_window.MessageTokenCache(64)) as cache:
+            first = context_window.count_tokens(history, "gpt-4o-mini")
+            self.assertEqual(len(enc.encoded), len(history))
+            history += [HumanMessage("one more question"), AIMessage("", tool_calls=[{"id": "c1", "name": "search", "args": {"q": "x"}}])]
+            enc.encoded.clear()
+            second = context_window.count_tokens(history, "gpt-4o-mini")
+            self.assertEqual(len(enc.encoded), 2)
+            # Same text under another model is counted with that model's tokenizer
+            context_window.count_tokens(history[:1], "gpt-4o")
+            self.assertEqual(len(enc.encoded), 3)
+            self.assertEqual(cache.stats(), {"hits": 8, "misses": 11, "entries": 11})
+        with mock.patch.object(context_window, "_encoding", return_value=enc), \
+                mock.patch.object(context_window, "MESSAGE_TOKENS", context_window.MessageTokenCache(0)):
+            self.assertEqual(context_window.count_tokens(history[:8], "gpt-4o-mini"), first)
+            self.assertEqual(context_window.count_tokens(history, "gpt-4o-mini"), second)
+
+    def test_fake_backend_never_calls_a_model_for_the_summary(self):
+        with self.settings(LLM_BACKEND="fake"), mock.patch.dict("os.environ", {"OPENAI_API_KEY": "sk-test"}):
+            self.assertIsNone(context_window._summary_llm(context_window.ContextPolicy()))
+
+    def test_summary_tokens_do_not_reach_the_event_stream(self):
+        summarizer = FakeChatModel(script=[{"content": "SUMMARY TEXT"}])
+        history = _turns(8)
+
+        async def node(state):
+            window = await context_window.abuild_context("system", history, {}, "gpt-4o-mini")
+            return window.update
+
+        def sync_node(state):
+            return context_window.build_context("system", history, {}, "gpt-4o-mini").update
+
+        async def events(runnable):
+            return [ev async for ev in runnable.astream_events({}, version="v2")]
+
+        with mock.patch.object(context_window, "_summary_llm", return_value=summarizer), \
+                self.settings(CONTEXT_TOKEN_BUDGET=1200, CONTEXT_KEEP_TURNS=3, CONTEXT_SUMMARY_MAX_TOKENS=100):
+            for runnable in (RunnableLambda(sync_node), RunnableLambda(sync_node, node)):
+                evs = asyncio.run(events(runnable))
+                self.assertEqual([ev for ev in evs if ev["event"].startswith("on_chat_model")], [])
+                self.assertEqual(evs[-1]["data"]["output"]["context_summary"], "SUMMARY TEXT")
+
+
+class ToolExecutorTests(SimpleTestCase):
+    def setUp(self):
+        self.ran = []
+        self.lock = threading.Lock()
+
+        @tool
+        def slow(seconds: float, label: str = "") -> str:
+            """Sleep for `seconds`."""
+            time.sleep(seconds)
+            with self.lock:
+                self.ran.append(label)
+            return f"slept {seconds}"
+
+        self.tool = slow
+        self.pool = ContextThreadPoolExecutor(max_workers=2)
+        patcher = mock.patch.object(tool_executor, "_POOL", self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.pool.shutdown, wait=True)
+
+    def _state(self, *durations):
+        calls = [{"name": "slow", "args": {"seconds": d, "label": str(i)}, "id": f"call_{i}", "type": "tool_call"} for i, d in enumerate(durations)]
+        return {"messages": [AIMessage("", tool_calls=calls)]}
+
+    def _executor(self, tool_timeout, turn_timeout):
+        return tool_executor.ToolExecutor([self.tool], tool_executor.ToolExecutorPolicy(max_workers=2, tool_timeout=tool_timeout, turn_timeout=turn_timeout))
+
+    def _both(self, executor, state):
+        yield executor.run(state, {})["messages"]
+        yield asyncio.run(executor.arun(state, {}))["messages"]
+
+    def test_queued_calls_get_their_full_timeout_once_started(self):
+        # Four 0.3s calls on two workers: the last two start at 0.3s and end at 0.6s,
+        # past a 0.5s timeout counted from the start of the turn
+        executor = self._executor(tool_timeout=0.5, turn_timeout=5)
+        for messages in self._both(executor, self._state(0.3, 0.3, 0.3, 0.3)):
+            self.assertEqual([m.status for m in messages], ["success"] * 4)
+            self.assertEqual([m.tool_call_id for m in messages], [f"call_{i}" for i in range(4)])
+
+    def test_running_call_times_out_without_inviting_a_retry(self):
+        executor = self._executor(tool_timeout=0.1, turn_timeout=5)
+        for messages in self._both(executor, self._state(0.4)):
+            error = json.loads(messages[0].content)
+            self.assertEqual((messages[0].status, error["scope"], error["started"]), ("error", "tool", True))
+            self.assertIn("may still complete", error["message"])
+            self.assertIn("Do not call it again", error["message"])
+
+    def test_queued_call_past_the_turn_deadline_is_cancelled(self):
+        executor = self._executor(tool_timeout=5, turn_timeout=0.2)
+        for messages in self._both(executor, self._state(0.5, 0.5, 0.1)):
+            errors = [json.loads(m.content) for m in messages]
+            self.assertEqual([e["scope"] for e in errors], ["turn"] * 3)
+            self.assertEqual([e["started"] for e in errors], [True, True, False])
+            time.sleep(0.6)
+        # The queued call never ran, in either mode
+        self.assertEqual(sorted(self.ran), ["0", "0", "1", "1"])
+
+
+_COMPOSIO_SCHEMA = {
+    "slug": "GMAIL_SEND_EMAIL",
+    "name": "Send email",
+    "description": "Send an email.",
+    "input_parameters": {
+        "type": "object",
+        "properties": {"to": {"type": "string", "description": "Recipient"}},
+        "required": ["to"],
+    },
+    "output_parameters": {},
+    "toolkit": {"slug": "gmail", "name": "Gmail", "logo": ""},
+    "version": "1",
+    "available_versions": ["1"],
+    "scopes": [],
+    "tags": [],
+    "no_auth": False,
+    "is_deprecated": False,
+    "deprecated": {"available_versions": ["1"], "displayName": "Send email", "version": "1", "toolkit": {"logo": ""}, "is_deprecated": False},
+}
+
+
+class ComposioToolBindingTests(SimpleTestCase):
+    """Cached schemas are wrapped through the SDK's public provider API; these fail if an
+    upgrade changes it."""
+
+    def _client(self, executed):
+        from composio.types import Tool
+        from composio_langchain import LangchainProvider
+
+        def execute(slug, arguments, **kwargs):
+            executed.append((slug, arguments, kwargs["user_id"]))
+            return {"successful": True, "data": {"id": "m1"}, "error": None}
+
+        fetch = mock.Mock(return_value=[Tool.model_validate(_COMPOSIO_SCHEMA)])
+        return SimpleNamespace(provider=LangchainProvider(), tools=SimpleNamespace(execute=execute, get_raw_composio_tools=fetch))
+
+    def test_wrapped_tool_executes_as_the_user(self):
+        executed = []
+        tools = graph_factory._wrap_composio_tools(self._client(executed), "user-1", [_COMPOSIO_SCHEMA])
+        self.assertEqual([t.name for t in tools], ["GMAIL_SEND_EMAIL"])
+        tools[0].invoke({"to": "a@example.com"})
+        self.assertEqual(executed, [("GMAIL_SEND_EMAIL", {"to": "a@example.com"}, "user-1")])
+
+    def test_sdk_client_exposes_the_methods_used(self):
+        from composio import Composio
+        from composio_langchain import LangchainProvider
+
+        client = Composio(api_key="test", provider=LangchainProvider())
+        for attr in ("execute", "get_raw_composio_tools"):
+            self.assertTrue(callable(getattr(client.tools, attr, None)), attr)
+        self.assertTrue(callable(getattr(client.provider, "wrap_tools", None)))
+
+    def test_cache_hit_does_not_touch_the_client(self):
+        client = self._client([])
+        agent = SimpleNamespace(user_id=uuid.uuid4())
+        with mock.patch.object(graph_factory, "_composio_client", return_value=client) as get_client, \
+                mock.patch.object(graph_factory, "get_connected_toolkit_slugs", return_value=["GMAIL"]):
+            first = graph_factory.build_tools_for_agent(agent)
+            calls = get_client.call_count
+            second = graph_factory.build_tools_for_agent(agent)
+        self.assertEqual([t.name for t in first], ["GMAIL_SEND_EMAIL"])
+        self.assertIs(first[0], second[0])
+        self.assertEqual(get_client.call_count, calls)
+        client.tools.get_raw_composio_tools.assert_called_once_with(toolkits=["GMAIL"])
+
+
+class ToolResultCacheScopeTests(SimpleTestCase):
+    def setUp(self):
+        TOOL_RESULTS.clear()
+        self.addCleanup(TOOL_RESULTS.clear)
+        self.addCleanup(knowledge.set_current_agent_id, knowledge.get_current_agent_id())
+        self.config = {"configurable": {"user_id": "user-1"}}
+
+    def test_implicit_context_is_part_of_the_key(self):
+        calls = []
+
+        @cached_tool(ttl=60, context=knowledge._agent_context)
+        @tool("agent-docs")
+        def agent_docs(query: str) -> List[str]:
+            """Documents of the current agent."""
+            calls.append(knowledge.get_current_agent_id())
+            return [f"{knowledge.get_current_agent_id()}:{query}"]
+
+        knowledge.set_current_agent_id("agent-a")
+        self.assertEqual(agent_docs.invoke({"query": "q"}, self.config), ["agent-a:q"])
+        self.assertEqual(agent_docs.invoke({"query": "q"}, self.config), ["agent-a:q"])
+        knowledge.set_current_agent_id("agent-b")
+        self.assertEqual(agent_docs.invoke({"query": "q"}, self.config), ["agent-b:q"])
+        self.assertEqual(calls, ["agent-a", "agent-b"])
+
+    def test_knowledge_tools_are_scoped_by_agent(self):
+        for name, args in (("knowledge-count", {}), ("knowledge-search", {"query": "q"})):
+            tool_ = next(t for t in knowledge.KNOWLEDGE_TOOLS if t.name == name)
+            before = TOOL_RESULTS.stats()["misses"]
+            for agent_id in ("agent-a", "agent-b", "agent-a"):
+                knowledge.set_current_agent_id(agent_id)
+                tool_.invoke(args, self.config)
+            self.assertEqual(TOOL_RESULTS.stats()["misses"] - before, 2, name)
+
+
+class ToolSelectionPrefixTests(SimpleTestCase):
+    def setUp(self):
+        topics = ["calendar event", "email message", "github issue", "slack channel", "drive file", "sheet row"]
+        self.tools = [
+            SimpleNamespace(name=f"{topic.replace(' ', '_')}_{verb}", description=f"{verb.title()} a {topic}.", args={})
+            for topic in topics
+            for verb in ("create", "delete", "list", "update", "get")
+        ]
+
+    def test_tool_schemas_are_sorted_by_name(self):
+        @tool
+        def zeta(q: str) -> str:
+            """Last tool."""
+            return q
+
+        @tool
+        def alpha(q: str) -> str:
+            """First tool."""
+            return q
+
+        schemas = graph_factory._tool_schemas([zeta, alpha])
+        self.assertEqual([s["function"]["name"] for s in schemas], ["alpha", "zeta"])
+        self.assertEqual(json.dumps(schemas), json.dumps(graph_factory._tool_schemas([alpha, zeta])))
+
+    def test_default_threshold_keeps_every_tool_bound(self):
+        selector = ToolSelector(self.tools, policy=ToolSelectionPolicy(), embedder=LexicalEmbedder())
+        self.assertFalse(selector.active)
+        self.assertEqual(selector.select([HumanMessage("create a github issue")]), [t.name for t in self.tools])
+
+    def test_selection_is_fixed_for_a_turn(self):
+        selector = ToolSelector(self.tools, policy=ToolSelectionPolicy(top_k=3, min_tools=10, min_recall=0), embedder=LexicalEmbedder())
+        turn = [HumanMessage("create a github issue")]
+        first = selector.select(turn)
+        self.assertIn("github_issue_create", first)
+        self.assertLess(len(first), len(self.tools))
+        turn += [
+            AIMessage("", tool_calls=[{"id": "c1", "name": "github_issue_create", "args": {}}]),
+            ToolMessage("created", tool_call_id="c1", name="github_issue_create"),
+        ]
+        self.assertEqual(selector.select(turn), first)
+
+    def test_embedder_below_recall_floor_binds_every_tool(self):
+        selector = ToolSelector(self.tools, policy=ToolSelectionPolicy(top_k=3, min_tools=10), embedder=LexicalEmbedder())
+        self.assertFalse(selector.active)
+        self.assertEqual(selector.select([HumanMessage("create a github issue")]), [t.name for t in self.tools])
+        floor = ToolSelectionPolicy(top_k=3, min_tools=10, min_recall=LexicalEmbedder.recall)
+        self.assertTrue(ToolSelector(self.tools, policy=floor, embedder=LexicalEmbedder()).active)
+
+    def test_tools_named_or_called_in_the_conversation_are_kept(self):
+        selector = ToolSelector(self.tools, policy=ToolSelectionPolicy(top_k=3, min_tools=10, min_recall=0), embedder=LexicalEmbedder())
+        messages = [
+            HumanMessage("find the budget spreadsheet"),
+            AIMessage("", tool_calls=[{"id": "c1", "name": "drive_file_list", "args": {}}]),
+            ToolMessage("[]", tool_call_id="c1", name="drive_file_list"),
+            AIMessage("Nothing found."),
+            HumanMessage("create a github issue about it, then use SLACK_CHANNEL_UPDATE"),
+        ]
+        selected = selector.select(messages)
+        self.assertIn("github_issue_create", selected)
+        self.assertIn("drive_file_list", selected)
+        self.assertIn("slack_channel_update", selected)
+
+    def test_lexical_recall_on_the_eval_dataset(self):
+        from agents.management.commands.eval_tool_selection import DATASET, _tool
+
+        data = json.loads(DATASET.read_text())
+        specs = [*data["pinned"], *(t for tools in data["toolkits"].values() for t in tools)]
+        policy = ToolSelectionPolicy(min_tools=0, min_recall=0)
+        selector = ToolSelector([_tool(s) for s in specs], pinned=[s["name"] for s in data["pinned"]], policy=policy, embedder=LexicalEmbedder())
+        recalls = []
+        for case in data["cases"]:
+            messages = [HumanMessage(m["content"]) if m["role"] == "user" else AIMessage(m["content"]) for m in case.get("context", [])]
+            selected = set(selector.select([*messages, HumanMessage(case["query"])]))
+            recalls.append(len(set(case["expected"]) & selected) / len(case["expected"]))
+        # The figure the recall floor is compared against; update both if selection improves
+        self.assertEqual(round(sum(recalls) / len(recalls), 3), LexicalEmbedder.recall)
+
+    def test_fake_backend_embeds_lexically(self):
+        with mock.patch.dict("os.environ", {"OPENAI_API_KEY": "sk-test"}), self.settings(LLM_BACKEND="fake"):
+            self.assertIsInstance(default_embedder(ToolSelectionPolicy()), LexicalEmbedder)
+
+
+@tool
+def fake_search(query: str, limit: int = 5) -> str:
+    """Search the workspace."""
+    return query
+
+
+@tool
+def fake_notify(channel: str, urgent: bool) -> str:
+    """Send a notification."""
+    return channel
+
+
+class FakeChatModelTests(SimpleTestCase):
+    messages = [SystemMessage("be brief"), HumanMessage("find the quarterly report")]
+
+    def test_replies_depend_only_on_seed_and_messages(self):
+        reply = FakeChatModel(seed=1).invoke(self.messages)
+        self.assertEqual(FakeChatModel(seed=1).invoke(self.messages).content, reply.content)
+        self.assertTrue(reply.content.startswith("Echo: find the quarterly report"))
+        self.assertNotEqual(FakeChatModel(seed=2).invoke(self.messages).content, reply.content)
+        self.assertNotEqual(FakeChatModel(seed=1).invoke(self.messages + [AIMessage("ok"), HumanMessage("again")]).content, reply.content)
+
+    def test_script_calls_only_bound_tools_with_stable_ids(self):
+        script = [
+            {"content": "", "tool_calls": [{"name": "fake_search", "args": {"query": "q"}}, {"name": "unbound", "args": {}}]},
+            {"content": "all done"},
+        ]
+        llm = FakeChatModel(script=script).bind_tools([fake_search])
+        first = llm.invoke(self.messages)
+        self.assertEqual([(tc["name"], tc["args"]) for tc in first.tool_calls], [("fake_search", {"query": "q"})])
+        self.assertEqual(llm.invoke(self.messages).tool_calls[0]["id"], first.tool_calls[0]["id"])
+        # The next scripted entry answers once the assistant has spoken
+        followup = self.messages + [first, ToolMessage("found", tool_call_id=first.tool_calls[0]["id"])]
+        self.assertEqual(llm.invoke(followup).content, "all done")
+
+    def test_tool_call_rate_generates_required_args(self):
+        llm = FakeChatModel(tool_call_rate=1).bind_tools([fake_search, fake_notify])
+        calls = llm.invoke(self.messages).tool_calls
+        self.assertEqual(len(calls), 1)
+        required = {"fake_search": {"query"}, "fake_notify": {"channel", "urgent"}}[calls[0]["name"]]
+        self.assertEqual(set(calls[0]["args"]), required)
+        # Never calls a tool straight after a tool result
+        followup = self.messages + [AIMessage("", tool_calls=calls), ToolMessage("ok", tool_call_id=calls[0]["id"])]
+        self.assertEqual(llm.invoke(followup).tool_calls, [])
+
+    def _assert_rebuilds(self, llm, chunks):
+        whole = llm.invoke(self.messages)
+        if whole.content:
+            self.assertGreater(len(chunks), len(whole.content.split()) - 1)
+        merged = chunks[0]
+        for chunk in chunks[1:]:
+            merged += chunk
+        self.assertEqual(merged.content, whole.content)
+        self.assertEqual(merged.tool_calls, whole.tool_calls)
+        self.assertEqual(merged.usage_metadata, whole.usage_metadata)
+
+    def test_stream_and_astream_rebuild_the_generated_message(self):
+        for rate in (0, 1):
+            llm = FakeChatModel(tool_call_rate=rate, seed=3).bind_tools([fake_search])
+            self._assert_rebuilds(llm, list(llm.stream(self.messages)))
+
+            async def collect():
+                return [chunk async for chunk in llm.astream(self.messages)]
+
+            self._assert_rebuilds(llm, asyncio.run(collect()))
+
+    def test_script_file_must_be_a_list(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as fh:
+            json.dump({"content": "hi"}, fh)
+        self.addCleanup(os.unlink, fh.name)
+        with self.assertRaises(ValueError):
+            _load_script(fh.name)
+
+
+class AgentGraphCacheTests(TestCase):
+    def setUp(self):
+        from agents.models import Agent
+
+        self.agent = Agent.objects.create(user_id=uuid.uuid4(), name="cached")
+        graph_factory.invalidate_agent_graphs()
+        self.addCleanup(graph_factory.invalidate_agent_graphs)
+        patcher = mock.patch.object(graph_factory, "build_graph_with_agent_tools", side_effect=lambda agent, channel="chat": object())
+        self.build = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _connect(self, slug="GMAIL"):
+        from connections.models import ConnectedIntegration
+
+        return ConnectedIntegration.objects.create(
+            user_id=str(self.agent.user_id), toolkit_slug=slug, connected_account_id=f"ca_{uuid.uuid4().hex}",
+            auth_config_id="ac_1", status="ACTIVE",
+        )
+
+    def test_same_version_reuses_the_graph(self):
+        first = graph_factory.get_agent_graph(self.agent)
+        self.assertIs(graph_factory.get_agent_graph(self.agent), first)
+        self.assertIsNot(graph_factory.get_agent_graph(self.agent, channel="ambient"), first)
+        self.assertEqual(self.build.call_count, 2)
+
+    def test_saving_the_agent_rebuilds(self):
+        first = graph_factory.get_agent_graph(self.agent)
+        self.agent.system_prompt = "new prompt"
+        self.agent.save()
+        self.assertIsNot(graph_factory.get_agent_graph(self.agent), first)
+
+    def test_connection_changes_rebuild(self):
+        gmail = self._connect()
+        graphs = [graph_factory.get_agent_graph(self.agent)]
+        slack = self._connect("SLACK")
+        graphs.append(graph_factory.get_agent_graph(self.agent))
+        slack.status = "EXPIRED"
+        slack.save()
+        graphs.append(graph_factory.get_agent_graph(self.agent))
+        gmail.delete()
+        graphs.append(graph_factory.get_agent_graph(self.agent))
+        self.assertEqual(len({id(g) for g in graphs}), 4)
+        self.assertIs(graph_factory.get_agent_graph(self.agent), graphs[-1])
+        # Removing the last connection is a change too
+        slack.delete()
+        self.assertIsNot(graph_factory.get_agent_graph(self.agent), graphs[-1])
+
+    def test_invalidate_by_agent_and_user(self):
+        first = graph_factory.get_agent_graph(self.agent)
+        self.assertEqual(graph_factory.invalidate_agent_graphs(user_id=uuid.uuid4()), 0)
+        self.assertEqual(graph_factory.invalidate_agent_graphs(user_id=self.agent.user_id), 1)
+        second = graph_factory.get_agent_graph(self.agent)
+        self.assertIsNot(second, first)
+        self.assertEqual(graph_factory.invalidate_agent_graphs(agent_id=self.agent.id), 1)
+        self.assertIsNot(graph_factory.get_agent_graph(self.agent), second)
+
+    def test_cache_size_zero_always_builds(self):
+        with self.settings(AGENT_GRAPH_CACHE_SIZE=0):
+            self.assertIsNot(graph_factory.get_agent_graph(self.agent), graph_factory.get_agent_graph(self.agent))
+
+
+@override_settings(LLM_BACKEND="openai", OPENAI_BASE_URL="")
+@mock.patch.dict("os.environ", {"OPENAI_API_KEY": "sk-test"})
+@mock.patch.dict(llm._ASYNC_HTTP, clear=True)
+@mock.patch.dict(llm._SYNC_HTTP, clear=True)
+@mock.patch.dict(llm._MODELS, clear=True)
+class PooledChatModelTests(SimpleTestCase):
+    def test_same_parameters_share_a_client(self):
+        a = llm.get_chat_model("gpt-4o-mini", 0)
+        self.assertIs(llm.get_chat_model("gpt-4o-mini", 0.0), a)
+        self.assertIs(llm.get_chat_model("gpt-4o-mini", 0, base_url=""), a)
+
+    def test_different_parameters_get_their_own_client(self):
+        a = llm.get_chat_model("gpt-4o-mini", 0)
+        others = [llm.get_chat_model("gpt-4o", 0), llm.get_chat_model("gpt-4o-mini", 0.7), llm.get_chat_model("gpt-4o-mini", 0, base_url="http://proxy.local/v1")]
+        self.assertEqual(len({id(m) for m in [a, *others]}), 4)
+        # Models on one endpoint share its connection pool; another endpoint gets its own
+        self.assertIs(others[0].http_client, a.http_client)
+        self.assertIsNot(others[2].http_client, a.http_client)
+
+    def test_async_clients_are_per_event_loop(self):
+        async def get():
+            return llm.get_chat_model("gpt-4o-mini", 0), llm.get_chat_model("gpt-4o-mini", 0)
+
+        first, again = asyncio.run(get())
+        self.assertIs(first, again)
+        second, _ = asyncio.run(get())
+        self.assertIsNot(second, first)
+        self.assertIsNot(second.http_async_client, first.http_async_client)
+        self.assertIs(second.http_client, first.http_client)
+        # The closed loop's model and async pool were dropped when the second was created
+        self.assertEqual(sum(1 for key in llm._MODELS if key[3] is not None), 1)
+
+
+class AgentGraphAsyncStreamTests(TransactionTestCase):
+    def setUp(self):
+        from agents.models import Agent
+
+        self.agent = Agent.objects.create(user_id=uuid.uuid4(), name="streaming")
+        self.thread = Thread.objects.create(user_id=self.agent.user_id)
+        self.run = Run.objects.create(thread=self.thread, status="running")
+        self.llm = FakeChatModel(tokens_per_second=200, response_tokens=8)
+        for patcher in (
+            mock.patch.object(graph_factory, "_build_llm", return_value=self.llm),
+            mock.patch.object(graph_factory, "build_tools_for_agent", return_value=[]),
+            # Any fallback to the sync path (RunnableLambda's executor, or the model's sync API) fails the test
+            mock.patch.object(FakeChatModel, "_generate", side_effect=AssertionError("sync _generate")),
+            mock.patch.object(FakeChatModel, "_stream", side_effect=AssertionError("sync _stream")),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_astream_yields_tokens_from_the_async_node(self):
+        compiled = await sync_to_async(graph_factory.build_graph_with_agent_tools)(self.agent)
+        config = {"configurable": {"thread_id": str(self.thread.id), "run_id": str(self.run.id), "user_id": str(self.agent.user_id)}}
+        events = []
+        async for mode, payload in compiled.astream({"messages": [{"role": "user", "content": "stream please"}]}, config=config, stream_mode=["messages", "updates"]):
+            events.append((mode, payload, time.monotonic()))
+
+        chunks = [(payload[0], at) for mode, payload, at in events if mode == "messages" and payload[0].content]
+        final = [(p, at) for mode, p, at in events if mode == "updates" and "_call_model_with_tools" in p]
+        self.assertEqual(len(final), 1)
+        reply, final_at = final[0]
+        content = reply["_call_model_with_tools"]["messages"][0]["content"]
+        self.assertNotIn("[error]", content)
+        self.assertGreater(len(chunks), 3)
+        self.assertTrue(all(at <= final_at for _, at in chunks))
+        self.assertEqual("".join(msg.content for msg, _ in chunks), content)
+        # Chunks arrived as the model produced them, not in one burst at the end
+        self.assertGreater(chunks[-1][1] - chunks[0][1], (len(chunks) - 2) / self.llm.tokens_per_second)
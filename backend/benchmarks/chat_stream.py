@@ -0,0 +1,331 @@
+"""End-to-end benchmark of POST chat/interactive/stream.
+
+Drives N concurrent sessions (one user, agent and thread each) through the streaming chat
+endpoint with the fake LLM backend and fake Composio tools, and reports per turn:
+time to first byte, streamed tokens per second, end-to-end latency (p50/p95/p99) and Django
+DB queries per turn. Results are written as JSON so runs can be compared across commits.
+
+    cd backend
+    python -m benchmarks.chat_stream --sessions 16 --turns 3 --out bench.json
+
+By default the ASGI app (djapp.asgi) is called in-process on a fresh SQLite database (see
+benchmarks/settings.py; set BENCH_DATABASE_URL for a local Postgres). With --url the same
+sessions are sent over HTTP to a running server, e.g. `uvicorn djapp.asgi:application`
+started with DJANGO_SETTINGS_MODULE=benchmarks.settings and the same BENCH_DATABASE_URL as
+the benchmark; DB queries are then not counted.
+Queries made outside the Django ORM (the psycopg checkpoint pool) are never counted.
+SQLite serializes writers and may report "database is locked" under many sessions; use
+Postgres for high concurrency.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from dataclasses import asdict, dataclass
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+PATH = "/api/chat/interactive/stream"
+
+
+@dataclass
+class TurnResult:
+    session: int
+    turn: int
+    status: int = 0
+    ttfb: Optional[float] = None
+    latency: float = 0.0
+    tokens: int = 0
+    tool_events: int = 0
+    chunks: int = 0
+    bytes: int = 0
+    tokens_per_sec: Optional[float] = None
+    error: str = ""
+
+
+class _Body:
+    """Collects one streamed response and when its bytes arrived."""
+
+    def __init__(self, started: float) -> None:
+        self.started = started
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+        self.parts: List[bytes] = []
+
+    def feed(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        now = time.perf_counter()
+        if self.first is None:
+            self.first = now
+        self.last = now
+        self.parts.append(chunk)
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent chat sessions")
+    parser.add_argument("--turns", type=int, default=3, help="Sequential turns per session")
+    parser.add_argument("--tools", type=int, default=40, help="Fake Composio tools bound to each agent")
+    parser.add_argument("--tool-latency-ms", type=float, default=50.0)
+    parser.add_argument("--tool-call-rate", type=float, default=0.5, help="Share of model calls that call a tool")
+    parser.add_argument("--first-token-ms", type=float, default=200.0, help="Fake LLM time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="Fake LLM token rate (0 = instant)")
+    parser.add_argument("--response-tokens", type=int, default=48)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", default="", help="Base URL of a running server instead of in-process ASGI")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds before a turn counts as failed")
+    parser.add_argument("--out", default="", help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def _configure(args: argparse.Namespace) -> None:
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_SEED"] = str(args.seed)
+    os.environ["FAKE_LLM_FIRST_TOKEN_MS"] = str(args.first_token_ms)
+    os.environ["FAKE_LLM_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+    os.environ["FAKE_LLM_RESPONSE_TOKENS"] = str(args.response_tokens)
+    os.environ["FAKE_LLM_TOOL_CALL_RATE"] = str(args.tool_call_rate)
+
+
+def _fake_composio_tools(count: int, latency: float) -> List[Any]:
+    from langchain_core.tools import StructuredTool
+
+    apps = ("GITHUB", "GMAIL", "SLACK", "NOTION", "LINEAR")
+    actions = ("LIST_ITEMS", "GET_ITEM", "CREATE_ITEM", "UPDATE_ITEM", "SEARCH", "DELETE_ITEM", "COMMENT", "SHARE")
+
+    def make(name: str) -> Any:
+        def run(query: str) -> Dict[str, Any]:
+            time.sleep(latency)
+            return {"tool": name, "query": query, "items": [{"id": i, "title": f"{name.lower()} result {i}"} for i in range(3)]}
+
+        return StructuredTool.from_function(run, name=name, description=f"{name.replace('_', ' ').title()} (benchmark stub).")
+
+    names = [f"{app}_{action}" for action, app in itertools.product(actions, apps)][:count]
+    return [make(n) for n in sorted(names)]
+
+
+class _QueryCounter:
+    """Counts ORM queries on every connection, whichever thread opened it."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self) -> None:
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+
+        def attach(sender, connection, **kwargs):
+            if self not in connection.execute_wrappers:
+                connection.execute_wrappers.append(self)
+
+        connection_created.connect(attach, weak=False)
+        for conn in connections.all():
+            attach(None, conn)
+
+
+def _setup_sessions(count: int) -> List[Dict[str, str]]:
+    from agents.models import Agent
+    from chat.models import Thread
+
+    sessions = []
+    for i in range(count):
+        user_id = uuid.uuid4()
+        agent = Agent.objects.create(user_id=user_id, name=f"bench-{i}", toolkits=[{"slug": "BENCH"}])
+        thread = Thread.objects.create(user_id=user_id, agent=agent, title=f"bench {i}")
+        sessions.append({"user_id": str(user_id), "thread_id": str(thread.id)})
+    return sessions
+
+
+async def _asgi_post(app: Any, body: bytes, feed: Callable[[bytes], None]) -> int:
+    """POST `body` to the ASGI app directly, feeding response body chunks as they are sent."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": PATH, "raw_path": PATH.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"localhost"), (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+    }
+    finished = asyncio.Event()
+    request_sent = False
+    status = 0
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            feed(message.get("body", b""))
+            if not message.get("more_body"):
+                finished.set()
+
+    await app(scope, receive, send)
+    return status
+
+
+def _http_post(client: Any, url: str) -> Callable[[bytes, Callable[[bytes], None]], Awaitable[int]]:
+    async def post(body: bytes, feed: Callable[[bytes], None]) -> int:
+        async with client.stream("POST", url, content=body, headers={"content-type": "application/json"}) as response:
+            async for chunk in response.aiter_raw():
+                feed(chunk)
+            return response.status_code
+
+    return post
+
+
+def _finish(result: TurnResult, body: _Body, ended: float) -> TurnResult:
+    text = b"".join(body.parts).decode("utf-8", "replace")
+    lines = text.splitlines(keepends=True)
+    events = [ln for ln in lines if ln.startswith('{"event"')]
+    result.tool_events = len(events)
+    result.tokens = len("".join(ln for ln in lines if not ln.startswith('{"event"')).split())
+    result.bytes = len(text.encode())
+    result.chunks = len(body.parts)
+    result.latency = ended - body.started
+    if body.first is not None:
+        result.ttfb = body.first - body.started
+        # A response delivered in one piece was buffered, not streamed: no token rate
+        streaming = (body.last or body.first) - body.first
+        result.tokens_per_sec = round(result.tokens / streaming, 2) if result.chunks > 1 and streaming > 0 else None
+    if "[error]" in text and not result.error:
+        result.error = text[text.index("[error]"):][:200].strip()
+    return result
+
+
+async def _session(index: int, session: Dict[str, str], turns: int, post: Callable, timeout: float, results: List[TurnResult]) -> None:
+    for turn in range(turns):
+        payload = {"text": f"Session {index} turn {turn}: summarize open items and post an update", **session}
+        result = TurnResult(session=index, turn=turn)
+        body = _Body(time.perf_counter())
+        try:
+            result.status = await asyncio.wait_for(post(json.dumps(payload).encode(), body.feed), timeout)
+            if result.status != 200:
+                result.error = f"HTTP {result.status}"
+        except asyncio.TimeoutError:
+            result.error = f"timeout after {timeout}s"
+        except Exception as e:
+            result.error = repr(e)
+        results.append(_finish(result, body, time.perf_counter()))
+
+
+def _distribution(values: List[float], scale: float = 1.0) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    values = sorted(v * scale for v in values)
+    cuts = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else values * 99
+    return {
+        "min": round(values[0], 2), "mean": round(statistics.mean(values), 2),
+        "p50": round(cuts[49], 2), "p95": round(cuts[94], 2), "p99": round(cuts[98], 2), "max": round(values[-1], 2),
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+
+def _report(args: argparse.Namespace, results: List[TurnResult], wall: float, queries: Optional[int]) -> Dict[str, Any]:
+    from django.conf import settings
+
+    ok = [r for r in results if not r.error]
+    return {
+        "benchmark": "chat_interactive_stream",
+        "revision": _git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "database": settings.DATABASES["default"]["ENGINE"].rsplit(".", 1)[-1],
+        "transport": "http" if args.url else "asgi",
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "summary": {
+            "turns": len(results),
+            "errors": len(results) - len(ok),
+            "wall_seconds": round(wall, 3),
+            "turns_per_second": round(len(ok) / wall, 3) if wall else None,
+            "ttfb_ms": _distribution([r.ttfb for r in ok if r.ttfb is not None], 1000),
+            "latency_ms": _distribution([r.latency for r in ok], 1000),
+            "tokens_per_sec": _distribution([r.tokens_per_sec for r in ok if r.tokens_per_sec]),
+            "db_queries_per_turn": round(queries / len(results), 1) if queries is not None and results else None,
+            "chunks_per_turn": round(statistics.mean(r.chunks for r in ok), 1) if ok else None,
+            "tool_events_per_turn": round(statistics.mean(r.tool_events for r in ok), 2) if ok else None,
+        },
+        "errors": sorted({r.error for r in results if r.error})[:20],
+        "turns": [asdict(r) for r in results],
+    }
+
+
+async def _run(args: argparse.Namespace, sessions: List[Dict[str, str]], results: List[TurnResult]) -> None:
+    if args.url:
+        import httpx
+
+        async with httpx.AsyncClient(timeout=args.timeout) as client:
+            post = _http_post(client, args.url.rstrip("/") + PATH)
+            await asyncio.gather(*(_session(i, s, args.turns, post, args.timeout, results) for i, s in enumerate(sessions)))
+        return
+    from djapp.asgi import application
+
+    async def post(body: bytes, feed: Callable[[bytes], None]) -> int:
+        return await _asgi_post(application, body, feed)
+
+    await asyncio.gather(*(_session(i, s, args.turns, post, args.timeout, results) for i, s in enumerate(sessions)))
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = _parse_args(argv)
+    if args.url and not os.getenv("BENCH_DATABASE_URL"):
+        raise SystemExit("--url needs BENCH_DATABASE_URL, shared with the server, so both see the benchmark users")
+    _configure(args)
+    import django
+
+    django.setup()
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+    from agents.services import graph_factory
+
+    tools = _fake_composio_tools(args.tools, args.tool_latency_ms / 1000)
+    graph_factory.build_tools_for_agent = lambda agent: list(tools)
+    sessions = _setup_sessions(args.sessions)
+
+    counter = None if args.url else _QueryCounter()
+    if counter is not None:
+        counter.install()
+    results: List[TurnResult] = []
+    started = time.perf_counter()
+    asyncio.run(_run(args, sessions, results))
+    report = _report(args, results, time.perf_counter() - started, counter.count if counter else None)
+
+    out = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(out + "\n")
+        print(json.dumps(report["summary"], indent=2), file=sys.stderr)
+    else:
+        print(out)
+    return report
+
+
+if __name__ == "__main__":
+    main()
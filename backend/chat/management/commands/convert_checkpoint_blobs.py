@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from agents.services.checkpointer import DjangoCheckpointer
+from chat.models import GraphCheckpoint
+
+
+class Command(BaseCommand):
+    help = "Re-encode legacy JSON checkpoint rows into binary blobs, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--limit", type=int, default=0, help="Stop after this many rows (0 = all)")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        limit = options["limit"]
+        saver = DjangoCheckpointer()
+        converted = failed = 0
+        last_pk = None
+        while True:
+            qs = GraphCheckpoint.objects.filter(blob__isnull=True).order_by("pk")
+            if last_pk is not None:
+                qs = qs.filter(pk__gt=last_pk)
+            batch = list(qs.only("pk", "state")[:batch_size])
+            if not batch:
+                break
+            for obj in batch:
+                last_pk = obj.pk
+                try:
+                    obj.blob_type, obj.blob = saver._encode_blob(saver._decode_state(obj.state))
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"checkpoint {obj.pk}: {e}")
+                    continue
+                obj.state = {}
+                converted += 1
+            GraphCheckpoint.objects.bulk_update([o for o in batch if o.blob is not None], ["blob", "blob_type", "state"])
+            self.stdout.write(f"converted={converted} failed={failed}")
+            if limit and converted + failed >= limit:
+                break
+        self.stdout.write(self.style.SUCCESS(f"Done: converted={converted} failed={failed}"))
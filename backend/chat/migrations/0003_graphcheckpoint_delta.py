@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-18 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_thread_is_ambient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='graphcheckpoint',
+            name='depth',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='graphcheckpoint',
+            name='is_snapshot',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='graphcheckpoint',
+            name='snapshot_id',
+            field=models.CharField(blank=True, default='', max_length=128),
+        ),
+        migrations.AddIndex(
+            model_name='graphcheckpoint',
+            index=models.Index(fields=['snapshot_id'], name='graph_ckpt_snapshot_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-18 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_graphcheckpoint_delta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='graphcheckpoint',
+            name='blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='graphcheckpoint',
+            name='blob_type',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
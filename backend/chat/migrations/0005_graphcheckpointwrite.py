@@ -0,0 +1,38 @@
+# Generated by Django 4.2.23 on 2026-10-18 02:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_graphcheckpoint_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GraphCheckpointWrite',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('checkpoint_ns', models.CharField(blank=True, default='default', max_length=128)),
+                ('checkpoint_id', models.CharField(max_length=128)),
+                ('task_id', models.CharField(max_length=128)),
+                ('task_path', models.CharField(blank=True, default='', max_length=255)),
+                ('idx', models.IntegerField()),
+                ('channel', models.CharField(max_length=128)),
+                ('blob_type', models.CharField(blank=True, default='', max_length=32)),
+                ('blob', models.BinaryField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoint_writes', to='chat.thread')),
+            ],
+            options={
+                'db_table': 'chat_graph_checkpoint_writes',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='graphcheckpointwrite',
+            constraint=models.UniqueConstraint(fields=('thread', 'checkpoint_ns', 'checkpoint_id', 'task_id', 'idx'), name='graph_ckpt_write_uniq'),
+        ),
+    ]
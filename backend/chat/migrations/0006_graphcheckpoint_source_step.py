@@ -0,0 +1,39 @@
+# Generated by Django 4.2.23 on 2026-10-18 02:46
+
+from django.db import migrations, models
+from django.db.models import IntegerField, Value
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast, Coalesce
+
+
+def backfill_source_step(apps, schema_editor):
+    GraphCheckpoint = apps.get_model('chat', 'GraphCheckpoint')
+    GraphCheckpoint.objects.filter(step__isnull=True).update(
+        source=Coalesce(KeyTextTransform('source', 'metadata'), Value('')),
+        step=Cast(KeyTextTransform('step', 'metadata'), IntegerField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0005_graphcheckpointwrite'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='graphcheckpoint',
+            name='source',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='graphcheckpoint',
+            name='step',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='graphcheckpoint',
+            index=models.Index(fields=['thread', 'source', 'step'], name='graph_ckpt_source_step_idx'),
+        ),
+        migrations.RunPython(backfill_source_step, migrations.RunPython.noop),
+    ]
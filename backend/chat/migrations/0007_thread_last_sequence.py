@@ -0,0 +1,54 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:23
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_last_sequence(apps, schema_editor):
+    Thread = apps.get_model('chat', 'Thread')
+    Message = apps.get_model('chat', 'Message')
+    # Concurrent count-based writers left duplicate sequences; renumber those threads 1..n
+    # in display order so the unique constraint can be added.
+    duplicated = (
+        Message.objects.values('thread_id')
+        .annotate(n=Count('id'), distinct_seqs=Count('sequence', distinct=True))
+        .filter(n__gt=models.F('distinct_seqs'))
+        .values_list('thread_id', flat=True)
+    )
+    for thread_id in list(duplicated):
+        msgs = list(Message.objects.filter(thread_id=thread_id).order_by('sequence', 'created_at', 'id'))
+        for i, m in enumerate(msgs, start=1):
+            m.sequence = i
+        Message.objects.bulk_update(msgs, ['sequence'], batch_size=500)
+    Thread.objects.update(last_sequence=Coalesce(Subquery(
+        Message.objects.filter(thread_id=OuterRef('pk'))
+        .values('thread_id')
+        .annotate(m=Max('sequence'))
+        .values('m')[:1]
+    ), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0006_graphcheckpoint_source_step'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='last_sequence',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_last_sequence, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='message',
+            constraint=models.UniqueConstraint(fields=('thread', 'sequence'), name='chat_msg_thread_seq_uniq'),
+        ),
+        # The constraint's index serves the same lookups
+        migrations.RemoveIndex(
+            model_name='message',
+            name='chat_msg_thread_seq_idx',
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:27
+
+from django.db import migrations, models
+from django.db.models import F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def backfill_updated_at(apps, schema_editor):
+    Thread = apps.get_model('chat', 'Thread')
+    Message = apps.get_model('chat', 'Message')
+    # Appending messages did not touch updated_at before; the session list now orders by it
+    last_message_at = Subquery(
+        Message.objects.filter(thread_id=OuterRef('pk'))
+        .values('thread_id')
+        .annotate(m=Max('created_at'))
+        .values('m')[:1]
+    )
+    Thread.objects.update(updated_at=Greatest(F('updated_at'), Coalesce(last_message_at, F('updated_at'))))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0007_thread_last_sequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['user_id', 'is_ambient', 'updated_at'], name='chat_thread_user_recent_idx'),
+        ),
+        # The new index's user_id prefix serves the same lookups
+        migrations.RemoveIndex(
+            model_name='thread',
+            name='chat_thread_user_idx',
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
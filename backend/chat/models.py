@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import F
+from django.utils import timezone
 import uuid
 
 
@@ -11,13 +13,16 @@ class Thread(models.Model):
     # True when the thread was created by an ambient job/run and should not
     # appear in the main chat history sidebar by default.
     is_ambient = models.BooleanField(default=False)
+    # Highest Message.sequence handed out in this thread (see MessageManager.append)
+    last_sequence = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'chat_threads'
         indexes = [
-            models.Index(fields=["user_id"], name="chat_thread_user_idx"),
+            # Sidebar: a user's threads by recent activity (also serves user_id lookups)
+            models.Index(fields=["user_id", "is_ambient", "updated_at"], name="chat_thread_user_recent_idx"),
         ]
 
 
@@ -32,10 +37,23 @@ class GraphCheckpoint(models.Model):
     checkpoint_ns = models.CharField(max_length=128, blank=True, default="default")
     checkpoint_id = models.CharField(max_length=128)
     parent_id = models.CharField(max_length=128, blank=True, default="")
+    # Delta storage: snapshots hold the full state; deltas hold only channels changed
+    # since parent_id and are rebuilt from snapshot_id (the group's full snapshot).
+    is_snapshot = models.BooleanField(default=True)
+    snapshot_id = models.CharField(max_length=128, blank=True, default="")
+    depth = models.IntegerField(default=0)
     # Opaque JSON blobs
     writes = models.JSONField(default=list)
+    # Legacy JSON-encoded checkpoint; new rows use blob/blob_type instead
     state = models.JSONField(default=dict)
+    # Serde typed bytes of the checkpoint; blob_type is the serde type tag, suffixed
+    # with "+zstd" when the bytes are compressed.
+    blob = models.BinaryField(null=True, blank=True)
+    blob_type = models.CharField(max_length=32, blank=True, default="")
     metadata = models.JSONField(default=dict)
+    # Copied out of metadata so list() filters can use indexes
+    source = models.CharField(max_length=32, blank=True, default="")
+    step = models.IntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -44,9 +62,66 @@ class GraphCheckpoint(models.Model):
             models.Index(fields=["thread", "created_at"], name="graph_ckpt_thread_idx"),
             models.Index(fields=["run", "created_at"], name="graph_ckpt_run_idx"),
             models.Index(fields=["checkpoint_id"], name="graph_ckpt_id_idx"),
+            models.Index(fields=["snapshot_id"], name="graph_ckpt_snapshot_idx"),
+            models.Index(fields=["thread", "source", "step"], name="graph_ckpt_source_step_idx"),
         ]
 
 
+class GraphCheckpointWrite(models.Model):
+    """Pending write produced by a task against a checkpoint (append-only).
+    Keyed by checkpoint identity rather than a FK: writes may land before the
+    checkpoint row itself is committed.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name='checkpoint_writes')
+    checkpoint_ns = models.CharField(max_length=128, blank=True, default="default")
+    checkpoint_id = models.CharField(max_length=128)
+    task_id = models.CharField(max_length=128)
+    task_path = models.CharField(max_length=255, blank=True, default="")
+    idx = models.IntegerField()
+    channel = models.CharField(max_length=128)
+    blob_type = models.CharField(max_length=32, blank=True, default="")
+    blob = models.BinaryField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'chat_graph_checkpoint_writes'
+        constraints = [
+            models.UniqueConstraint(
+                fields=["thread", "checkpoint_ns", "checkpoint_id", "task_id", "idx"],
+                name="graph_ckpt_write_uniq",
+            ),
+        ]
+
+
+def next_sequence(thread_id) -> int:
+    """Allocate the next message sequence of a thread with one row-locking UPDATE, so
+    concurrent writers never share a number. Must run inside the inserting transaction.
+    Also bumps updated_at, which orders the session list by recent activity."""
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Thread._meta.db_table} SET last_sequence = last_sequence + 1, updated_at = now() "
+                "WHERE id = %s RETURNING last_sequence",
+                [thread_id],
+            )
+            row = cursor.fetchone()
+    else:
+        updated = Thread.objects.filter(id=thread_id).update(last_sequence=F("last_sequence") + 1, updated_at=timezone.now())
+        row = Thread.objects.filter(id=thread_id).values_list("last_sequence").first() if updated else None
+    if row is None:
+        raise Thread.DoesNotExist(f"Thread {thread_id} does not exist")
+    return row[0]
+
+
+class MessageManager(models.Manager):
+    def append(self, thread, **fields) -> "Message":
+        """Create a message at the end of `thread` (a Thread or its id)."""
+        thread_id = getattr(thread, "pk", thread)
+        with transaction.atomic():
+            return self.create(thread_id=thread_id, sequence=next_sequence(thread_id), **fields)
+
+
 class Message(models.Model):
     ROLE_CHOICES = (
         ("user", "user"),
@@ -66,10 +141,12 @@ class Message(models.Model):
     sequence = models.IntegerField(default=0)  # ordering within thread
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = MessageManager()
+
     class Meta:
         db_table = 'chat_messages'
-        indexes = [
-            models.Index(fields=["thread", "sequence"], name="chat_msg_thread_seq_idx"),
+        constraints = [
+            models.UniqueConstraint(fields=["thread", "sequence"], name="chat_msg_thread_seq_uniq"),
         ]
 
 
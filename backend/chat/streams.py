@@ -0,0 +1,345 @@
+"""Resumable chat streams: typed events, buffered per run, served as Server-Sent Events.
+
+A run started with `start_stream` executes as a task on a process-wide event loop of its
+own (not the request's, which WSGI tears down with the response) and appends its events to
+a bounded per-run buffer; clients read the buffer, so a dropped connection does not stop the
+run, and a reconnect with Last-Event-ID resumes where it left off.
+
+Event types: delta {text}, tool_start {name, run_id, input}, tool_end {name, run_id, output,
+status}, run_status {status}, error {message}, done {}. Event ids increase by one per event
+within a stream.
+"""
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+import asyncio
+import json
+import threading
+import time
+import logging
+
+from django.conf import settings
+from django.core import signing
+
+try:  # Redis buffer lets a reconnect land on any worker
+    import redis.asyncio as aioredis
+except Exception:  # pragma: no cover - optional
+    aioredis = None
+
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = ("delta", "tool_start", "tool_end", "run_status", "error", "done")
+
+# (id, event, data)
+StreamEvent = Tuple[int, str, Dict[str, Any]]
+
+
+@dataclass
+class _MemoryStream:
+    owner: str
+    events: "deque[StreamEvent]"
+    next_id: int = 1
+    done: bool = False
+    finished_at: float = 0.0
+    waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = field(default_factory=list)
+
+
+class MemoryStreamBuffer:
+    """Per-process buffer: the newest `max_events` events of up to `max_streams` runs.
+    Finished runs are kept for `retention` seconds. Reconnects must reach the same worker."""
+
+    def __init__(self, max_events: int, max_streams: int, retention: float) -> None:
+        self.max_events = max(1, int(max_events))
+        self.max_streams = max(1, int(max_streams))
+        self.retention = float(retention)
+        self._streams: "OrderedDict[str, _MemoryStream]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for sid in [s for s, st in self._streams.items() if st.done and now - st.finished_at > self.retention]:
+            del self._streams[sid]
+        while len(self._streams) > self.max_streams:
+            # Oldest finished run first; a live one only if every run is live
+            sid = next((s for s, st in self._streams.items() if st.done), next(iter(self._streams)))
+            del self._streams[sid]
+
+    def _wake(self, stream: _MemoryStream) -> None:
+        waiters, stream.waiters = stream.waiters, []
+        for loop, fut in waiters:
+            loop.call_soon_threadsafe(lambda f=fut: f.done() or f.set_result(None))
+
+    async def create(self, stream_id: str, owner: str) -> None:
+        with self._lock:
+            self._streams[stream_id] = _MemoryStream(owner=owner, events=deque(maxlen=self.max_events))
+            self._evict()
+
+    async def owner(self, stream_id: str) -> Optional[str]:
+        with self._lock:
+            stream = self._streams.get(stream_id)
+            return stream.owner if stream else None
+
+    async def append(self, stream_id: str, event: str, data: Dict[str, Any]) -> int:
+        with self._lock:
+            stream = self._streams.get(stream_id)
+            if stream is None:
+                return 0
+            event_id = stream.next_id
+            stream.next_id += 1
+            stream.events.append((event_id, event, data))
+            self._wake(stream)
+            return event_id
+
+    async def finish(self, stream_id: str) -> None:
+        with self._lock:
+            stream = self._streams.get(stream_id)
+            if stream is not None:
+                stream.done, stream.finished_at = True, time.monotonic()
+                self._wake(stream)
+
+    async def read(self, stream_id: str, after: int, timeout: float) -> Tuple[List[StreamEvent], bool, bool]:
+        """Events with id > `after`, waiting up to `timeout` for one. Returns (events,
+        finished, dropped); dropped means events after `after` fell out of the buffer."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            stream = self._streams.get(stream_id)
+            if stream is None:
+                return [], True, False
+            events = [e for e in stream.events if e[0] > after]
+            if events or stream.done:
+                return events, stream.done, bool(events) and events[0][0] > after + 1
+            fut = loop.create_future()
+            stream.waiters.append((loop, fut))
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._lock:
+            events = [e for e in stream.events if e[0] > after]
+            return events, stream.done, bool(events) and events[0][0] > after + 1
+
+
+class RedisStreamBuffer:
+    """Buffer in Redis: a capped list of events plus a meta hash per run, so any worker can
+    replay a run; workers that do not run it follow new events by polling."""
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, url: str, max_events: int, retention: float) -> None:
+        self.url = url
+        self.max_events = max(1, int(max_events))
+        self.retention = int(retention)
+        # redis.asyncio clients are bound to the loop that opened them
+        self._clients: Dict[asyncio.AbstractEventLoop, Any] = {}
+        self._lock = threading.Lock()
+
+    def _client(self) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for stale in [lp for lp in self._clients if lp.is_closed()]:
+                del self._clients[stale]
+            client = self._clients.get(loop)
+            if client is None:
+                client = self._clients[loop] = aioredis.from_url(self.url)
+            return client
+
+    @staticmethod
+    def _keys(stream_id: str) -> Tuple[str, str]:
+        return f"chat:stream:{stream_id}:events", f"chat:stream:{stream_id}:meta"
+
+    async def create(self, stream_id: str, owner: str) -> None:
+        events_key, meta_key = self._keys(stream_id)
+        async with self._client().pipeline(transaction=True) as pipe:
+            pipe.delete(events_key)
+            pipe.hset(meta_key, mapping={"owner": owner, "next": 0, "done": 0})
+            # Live runs are kept for an hour at most; finish() shortens that to `retention`
+            pipe.expire(meta_key, 3600)
+            await pipe.execute()
+
+    async def owner(self, stream_id: str) -> Optional[str]:
+        value = await self._client().hget(self._keys(stream_id)[1], "owner")
+        return value.decode() if value is not None else None
+
+    async def append(self, stream_id: str, event: str, data: Dict[str, Any]) -> int:
+        events_key, meta_key = self._keys(stream_id)
+        client = self._client()
+        event_id = int(await client.hincrby(meta_key, "next", 1))
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.rpush(events_key, json.dumps([event_id, event, data], default=str))
+            pipe.ltrim(events_key, -self.max_events, -1)
+            pipe.expire(events_key, 3600)
+            await pipe.execute()
+        return event_id
+
+    async def finish(self, stream_id: str) -> None:
+        async with self._client().pipeline(transaction=True) as pipe:
+            for key in self._keys(stream_id):
+                pipe.expire(key, self.retention)
+            pipe.hset(self._keys(stream_id)[1], "done", 1)
+            await pipe.execute()
+
+    async def read(self, stream_id: str, after: int, timeout: float) -> Tuple[List[StreamEvent], bool, bool]:
+        events_key, meta_key = self._keys(stream_id)
+        client = self._client()
+        deadline = time.monotonic() + timeout
+        while True:
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.lrange(events_key, 0, -1)
+                pipe.hget(meta_key, "done")
+                raw, done = await pipe.execute()
+            finished = done is None or done == b"1"
+            events = [tuple(e) for e in map(json.loads, raw) if e[0] > after]
+            if events or finished or time.monotonic() >= deadline:
+                return events, finished, bool(events) and events[0][0] > after + 1
+            await asyncio.sleep(self.POLL_INTERVAL)
+
+
+def _buffer_from_settings() -> Any:
+    max_events = getattr(settings, "CHAT_STREAM_BUFFER_EVENTS", 2000)
+    retention = getattr(settings, "CHAT_STREAM_RETENTION_SECONDS", 600)
+    if getattr(settings, "CHAT_STREAM_BUFFER", "memory") == "redis" and aioredis is not None and getattr(settings, "REDIS_URL", ""):
+        return RedisStreamBuffer(settings.REDIS_URL, max_events, retention)
+    return MemoryStreamBuffer(max_events, getattr(settings, "CHAT_STREAM_MAX_STREAMS", 1000), retention)
+
+
+# Shared by every stream in the process
+STREAMS = _buffer_from_settings()
+
+# Strong references: the loop only keeps weak ones to running tasks
+_RUNS: Set[asyncio.Task] = set()
+_RUN_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_RUN_LOOP_LOCK = threading.Lock()
+
+
+def _run_loop() -> asyncio.AbstractEventLoop:
+    """Event loop, on a daemon thread, that every stream run in the process executes on."""
+    global _RUN_LOOP
+    with _RUN_LOOP_LOCK:
+        if _RUN_LOOP is None or _RUN_LOOP.is_closed():
+            _RUN_LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_RUN_LOOP.run_forever, name="chat-stream-runs", daemon=True).start()
+        return _RUN_LOOP
+
+
+def _spawn(coro: Awaitable[None]) -> None:
+    task = asyncio.ensure_future(coro)
+    _RUNS.add(task)
+    task.add_done_callback(_RUNS.discard)
+
+
+def _json_safe(value: Any) -> Any:
+    return json.loads(json.dumps(value, default=str))
+
+
+def typed_event(ev: Any) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Map one graph stream event to (type, data), or None when clients do not see it."""
+    if not isinstance(ev, dict):
+        return None
+    kind = ev.get("event")
+    if kind == "on_chat_model_stream":
+        chunk = (ev.get("data", {}) or {}).get("chunk")
+        content = getattr(chunk, "content", None) if chunk else None
+        return ("delta", {"text": str(content)}) if content else None
+    if ev.get("type") == "message_delta":
+        return ("delta", {"text": ev["delta"]}) if ev.get("delta") else None
+    if ev.get("type") == "run_status":
+        return "run_status", {"status": ev.get("status")}
+    if kind == "on_tool_start":
+        return "tool_start", {"name": ev.get("name"), "run_id": str(ev.get("run_id", "")), "input": _json_safe((ev.get("data") or {}).get("input"))}
+    if kind in ("on_tool_end", "on_tool_error"):
+        data = ev.get("data") or {}
+        output = data.get("output")
+        output = getattr(output, "content", output)
+        return "tool_end", {
+            "name": ev.get("name"),
+            "run_id": str(ev.get("run_id", "")),
+            "output": _json_safe(output if kind == "on_tool_end" else data.get("error")),
+            "status": "success" if kind == "on_tool_end" else "error",
+        }
+    return None
+
+
+_RESUME_SALT = "chat.streams.resume"
+
+
+def resume_token(stream_id: str, owner: str) -> str:
+    """Signed token that lets `owner` resume `stream_id` without other credentials
+    (EventSource cannot send an Authorization header)."""
+    return signing.dumps([owner, stream_id], salt=_RESUME_SALT)
+
+
+def resume_token_owner(token: str, stream_id: str) -> Optional[str]:
+    """Owner named by a resume token for `stream_id`, or None if it is forged, expired or
+    was issued for another stream."""
+    max_age = getattr(settings, "CHAT_STREAM_RESUME_TOKEN_SECONDS", 900)
+    try:
+        owner, token_stream_id = signing.loads(token, salt=_RESUME_SALT, max_age=max_age)
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+    return str(owner) if token_stream_id == stream_id else None
+
+
+async def _produce(
+    stream_id: str,
+    token: str,
+    events: AsyncIterator[Any],
+    on_complete: Callable[[str], Awaitable[None]],
+) -> None:
+    text: List[str] = []
+    try:
+        # Tells clients reading the POST response which stream to resume, and with what
+        await STREAMS.append(stream_id, "run_status", {"status": "running", "stream_id": stream_id, "resume_token": token})
+        async for ev in events:
+            typed = typed_event(ev)
+            if typed is None or typed == ("run_status", {"status": "running"}):
+                continue
+            if typed[0] == "delta":
+                text.append(typed[1]["text"])
+            await STREAMS.append(stream_id, *typed)
+        await on_complete("".join(text))
+    except Exception as e:
+        logger.exception("chat stream %s failed", stream_id)
+        await STREAMS.append(stream_id, "error", {"message": str(e)})
+    finally:
+        await STREAMS.append(stream_id, "done", {})
+        await STREAMS.finish(stream_id)
+
+
+async def start_stream(
+    stream_id: str,
+    owner: str,
+    events: AsyncIterator[Any],
+    on_complete: Callable[[str], Awaitable[None]],
+) -> str:
+    """Run `events` to completion in the background, buffering typed events under
+    `stream_id`. `on_complete` gets the streamed assistant text once the run ends.
+    The run goes to the process-wide run loop, so it outlives the caller's event loop.
+    Returns the stream's resume token."""
+    token = resume_token(stream_id, owner)
+    await STREAMS.create(stream_id, owner)
+    _run_loop().call_soon_threadsafe(_spawn, _produce(stream_id, token, events, on_complete))
+    return token
+
+
+def _sse(event_id: Optional[int], event: str, data: Dict[str, Any]) -> bytes:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n".encode("utf-8")
+
+
+async def sse_events(stream_id: str, after: int = 0) -> AsyncGenerator[bytes, None]:
+    """SSE body for a stream from event id `after` on, ending after its `done` event.
+    Idle gaps get a comment line so proxies keep the connection open."""
+    heartbeat = float(getattr(settings, "CHAT_STREAM_HEARTBEAT_SECONDS", 15))
+    yield b"retry: 2000\n\n"
+    while True:
+        events, finished, dropped = await STREAMS.read(stream_id, after, heartbeat)
+        if dropped:
+            yield _sse(None, "error", {"message": "Some events are no longer buffered", "code": "events_dropped"})
+        for event_id, event, data in events:
+            yield _sse(event_id, event, data)
+            after = event_id
+        if finished and not events:
+            return
+        if not events:
+            yield b": ping\n\n"
@@ -1,3 +1,291 @@
+import asyncio
+import json
+import time
+import uuid
+from unittest import mock
+
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 
-# Create your tests here.
+from chat.models import Message, Thread
+
+
+class MessageSequenceTests(TestCase):
+    def setUp(self):
+        self.thread = Thread.objects.create(user_id=uuid.uuid4())
+
+    def test_append_allocates_consecutive_sequences(self):
+        seqs = [Message.objects.append(self.thread, role="user", content=str(i)).sequence for i in range(3)]
+        self.assertEqual(seqs, [1, 2, 3])
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.last_sequence, 3)
+
+    def test_append_by_thread_id(self):
+        Message.objects.append(self.thread, role="user", content="a")
+        m = Message.objects.append(str(self.thread.id), role="assistant", content="b")
+        self.assertEqual(m.sequence, 2)
+
+    def test_append_to_missing_thread(self):
+        with self.assertRaises(Thread.DoesNotExist):
+            Message.objects.append(uuid.uuid4(), role="user", content="a")
+
+    def test_sequence_is_unique_per_thread(self):
+        Message.objects.append(self.thread, role="user", content="a")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Message.objects.create(thread=self.thread, role="user", content="b", sequence=1)
+
+
+class SessionDetailPaginationTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from rest_framework.authtoken.models import Token
+
+        user = get_user_model().objects.create(username="pager")
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Token {Token.objects.create(user=user).key}"
+        self.thread = Thread.objects.create(user_id=user.id)
+        for i in range(12):
+            Message.objects.append(self.thread, role="user", content=f"message {i}" * (10 if i == 5 else 1))
+
+    def _get(self, **query):
+        resp = self.client.get(f"/api/chat/sessions/{self.thread.id}", query)
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()
+
+    def test_latest_page_then_older(self):
+        page = self._get(limit=5)
+        self.assertEqual([m["sequence"] for m in page["messages"]], [8, 9, 10, 11, 12])
+        self.assertEqual((page["nextBefore"], page["nextAfter"]), (8, None))
+        page = self._get(limit=5, before=page["nextBefore"])
+        self.assertEqual([m["sequence"] for m in page["messages"]], [3, 4, 5, 6, 7])
+        page = self._get(limit=5, before=page["nextBefore"])
+        self.assertEqual([m["sequence"] for m in page["messages"]], [1, 2])
+        self.assertEqual((page["nextBefore"], page["nextAfter"]), (None, 2))
+
+    def test_full_history_without_paging_parameters(self):
+        page = self._get()
+        self.assertEqual([m["sequence"] for m in page["messages"]], list(range(1, 13)))
+        self.assertEqual((page["nextBefore"], page["nextAfter"]), (None, None))
+        self.assertEqual(len(self._get(truncate=5)["messages"]), 12)
+
+    def test_after_cursor(self):
+        page = self._get(limit=5, after=9)
+        self.assertEqual([m["sequence"] for m in page["messages"]], [10, 11, 12])
+        self.assertEqual((page["nextBefore"], page["nextAfter"]), (10, None))
+
+    def test_truncate_and_full_message(self):
+        long = self._get(truncate=9, before=7, limit=1)["messages"][0]
+        self.assertEqual((long["content"], long["truncated"], long["contentLength"]), ("message 5", True, 90))
+        full = self.client.get(f"/api/chat/sessions/{self.thread.id}/messages/{long['id']}").json()
+        self.assertEqual(full["content"], "message 5" * 10)
+
+
+class SessionListTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from rest_framework.authtoken.models import Token
+
+        user = get_user_model().objects.create(username="lister")
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Token {Token.objects.create(user=user).key}"
+        self.threads = [Thread.objects.create(user_id=user.id, title=f"t{i}") for i in range(5)]
+        Thread.objects.create(user_id=user.id, title="ambient", is_ambient=True)
+        for i, t in enumerate(self.threads):
+            for j in range(i):
+                Message.objects.append(t, role="user", content=f"t{i} message {j}")
+
+    def test_recent_activity_order_with_preview_and_count(self):
+        Message.objects.append(self.threads[0], role="assistant", content="x" * 500)
+        with self.assertNumQueries(2):  # token auth + the page
+            page = self.client.get("/api/chat/sessions", {"limit": 2}).json()
+        self.assertEqual([i["title"] for i in page["items"]], ["t0", "t4"])
+        self.assertEqual(page["items"][0]["messageCount"], 1)
+        self.assertEqual(page["items"][0]["lastMessage"], {"role": "assistant", "preview": "x" * 120})
+        self.assertEqual(page["items"][1]["lastMessage"]["preview"], "t4 message 3")
+
+        titles = [i["title"] for i in page["items"]]
+        while page["nextBefore"]:
+            page = self.client.get("/api/chat/sessions", {"limit": 2, "before": page["nextBefore"]}).json()
+            titles += [i["title"] for i in page["items"]]
+        self.assertEqual(titles, ["t0", "t4", "t3", "t2", "t1"])
+
+
+class StreamAuthTests(TestCase):
+    def test_query_user_id_is_not_accepted(self):
+        t = Thread.objects.create(user_id=uuid.uuid4())
+        resp = self.client.get(f"/api/chat/sessions/{t.id}", {"user_id": str(t.user_id)})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.get("/api/chat/sessions", {"user_id": str(t.user_id)})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_resume_token_is_bound_to_stream(self):
+        from chat.streams import resume_token, resume_token_owner
+
+        token = resume_token("stream-a", "user-1")
+        self.assertEqual(resume_token_owner(token, "stream-a"), "user-1")
+        self.assertIsNone(resume_token_owner(token, "stream-b"))
+        self.assertIsNone(resume_token_owner(token + "x", "stream-a"))
+        with self.settings(CHAT_STREAM_RESUME_TOKEN_SECONDS=-1):
+            self.assertIsNone(resume_token_owner(token, "stream-a"))
+
+    def test_resume_rejects_foreign_token(self):
+        from chat.streams import resume_token
+
+        resp = self.client.get("/api/chat/interactive/stream/stream-b", {"resume_token": resume_token("stream-a", "user-1")})
+        self.assertEqual(resp.status_code, 403)
+
+
+class InteractiveStreamAsyncTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from rest_framework.authtoken.models import Token
+
+        self.user = get_user_model().objects.create(username="streamer")
+        self.auth = f"Token {Token.objects.create(user=self.user).key}"
+        self.thread = Thread.objects.create(user_id=self.user.id)
+
+    async def test_deltas_are_sent_as_they_are_produced(self):
+        consumed = asyncio.Event()
+
+        async def events(*args, **kwargs):
+            for word in ("Hel", "lo", "!"):
+                consumed.clear()
+                yield {"type": "message_delta", "delta": word}
+                # The next delta is only produced once the client has read this one
+                await asyncio.wait_for(consumed.wait(), 5)
+
+        with mock.patch("chat.views._graph_events", events), mock.patch("chat.views._persist_assistant") as persist:
+            resp = await self.async_client.post(
+                "/api/chat/interactive/stream",
+                {"text": "hi", "thread_id": str(self.thread.id)},
+                content_type="application/json",
+                AUTHORIZATION=self.auth,
+            )
+            self.assertEqual(resp.status_code, 200)
+            chunks = []
+            async for chunk in resp.streaming_content:
+                chunks.append(chunk)
+                consumed.set()
+        self.assertEqual(chunks, [b"Hel", b"lo", b"!"])
+        persist.assert_called_once_with(str(self.thread.id), "Hello!")
+
+
+def _sse_events(body):
+    """(id, event, data) per SSE block of `body`; id is None for events without one."""
+    out = []
+    for block in body.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            out.append((int(fields["id"]) if "id" in fields else None, fields["event"], json.loads(fields["data"])))
+    return out
+
+
+class ResumableStreamTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from rest_framework.authtoken.models import Token
+        from chat.streams import MemoryStreamBuffer
+
+        self.user = get_user_model().objects.create(username="resumer")
+        self.auth = f"Token {Token.objects.create(user=self.user).key}"
+        self.thread = Thread.objects.create(user_id=self.user.id)
+        self.buffer = MemoryStreamBuffer(max_events=100, max_streams=10, retention=60)
+        for target in ("chat.streams.STREAMS", "chat.views.STREAMS"):
+            patcher = mock.patch(target, self.buffer)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    async def _deltas(*args, **kwargs):
+        for word in ("Hel", "lo", "!"):
+            await asyncio.sleep(0.01)
+            yield {"type": "message_delta", "delta": word}
+
+    async def _body(self, resp):
+        return b"".join([chunk async for chunk in resp.streaming_content])
+
+    def _wait_done(self, stream_id, timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            events, finished, _ = asyncio.run(self.buffer.read(stream_id, 0, 0.1))
+            if finished:
+                return events
+        self.fail("stream did not finish")
+
+    async def test_sse_post_numbers_events_and_ends_with_done(self):
+        with mock.patch("chat.views._graph_events", self._deltas), mock.patch("chat.views._persist_assistant") as persist:
+            resp = await self.async_client.post(
+                "/api/chat/interactive/stream",
+                {"text": "hi", "thread_id": str(self.thread.id), "protocol": "sse"},
+                content_type="application/json",
+                AUTHORIZATION=self.auth,
+            )
+            events = _sse_events(await self._body(resp))
+        self.assertEqual(resp["Content-Type"], "text/event-stream; charset=utf-8")
+        self.assertEqual([e[0] for e in events], [1, 2, 3, 4, 5])
+        self.assertEqual([e[1] for e in events], ["run_status", "delta", "delta", "delta", "done"])
+        self.assertEqual(events[0][2]["stream_id"], resp["X-Stream-Id"])
+        self.assertEqual(events[0][2]["resume_token"], resp["X-Stream-Resume-Token"])
+        self.assertEqual("".join(e[2]["text"] for e in events if e[1] == "delta"), "Hello!")
+        persist.assert_called_once_with(str(self.thread.id), "Hello!")
+
+    def test_run_outlives_the_loop_that_started_it(self):
+        from chat.streams import start_stream
+
+        completed = []
+
+        async def on_complete(text):
+            completed.append(text)
+
+        # The request's loop is closed as soon as the view returns, as under WSGI
+        asyncio.run(start_stream("orphan", "user-1", self._deltas(), on_complete))
+        events = self._wait_done("orphan")
+        self.assertEqual([e[1] for e in events], ["run_status", "delta", "delta", "delta", "done"])
+        self.assertEqual(completed, ["Hello!"])
+
+    def _finished_stream(self, stream_id, owner, deltas):
+        async def fill():
+            await self.buffer.create(stream_id, owner)
+            for i in range(deltas):
+                await self.buffer.append(stream_id, "delta", {"text": str(i)})
+            await self.buffer.append(stream_id, "done", {})
+            await self.buffer.finish(stream_id)
+
+        asyncio.run(fill())
+
+    async def test_resume_after_last_event_id(self):
+        from chat.streams import resume_token
+
+        await asyncio.to_thread(self._finished_stream, "s1", str(self.user.id), 4)
+        resp = await self.async_client.get("/api/chat/interactive/stream/s1", AUTHORIZATION=self.auth, LAST_EVENT_ID="2")
+        self.assertEqual([(e[0], e[1]) for e in _sse_events(await self._body(resp))], [(3, "delta"), (4, "delta"), (5, "done")])
+
+        # EventSource reconnects carry the signed token instead of credentials
+        resp = await self.async_client.get("/api/chat/interactive/stream/s1", {"resume_token": resume_token("s1", str(self.user.id)), "last_event_id": 4})
+        self.assertEqual([(e[0], e[1]) for e in _sse_events(await self._body(resp))], [(5, "done")])
+
+        resp = await self.async_client.get("/api/chat/interactive/stream/s1", {"resume_token": resume_token("s1", "someone-else")})
+        self.assertEqual(resp.status_code, 404)
+
+    async def test_evicted_events_are_reported(self):
+        from chat.streams import MemoryStreamBuffer, sse_events
+
+        self.buffer = MemoryStreamBuffer(max_events=3, max_streams=10, retention=60)
+        with mock.patch("chat.streams.STREAMS", self.buffer):
+            await asyncio.to_thread(self._finished_stream, "s2", "user-1", 5)
+            body = b"".join([chunk async for chunk in sse_events("s2", after=1)])
+        events = _sse_events(body)
+        self.assertEqual((events[0][0], events[0][2]["code"]), (None, "events_dropped"))
+        self.assertEqual([e[0] for e in events[1:]], [4, 5, 6])
+
+    def test_finished_streams_are_evicted_first(self):
+        from chat.streams import MemoryStreamBuffer
+
+        buffer = MemoryStreamBuffer(max_events=10, max_streams=2, retention=60)
+
+        async def fill():
+            await buffer.create("live", "u")
+            await buffer.create("finished", "u")
+            await buffer.finish("finished")
+            await buffer.create("new", "u")
+            return [await buffer.owner(s) for s in ("live", "finished", "new")]
+
+        self.assertEqual(asyncio.run(fill()), ["u", None, "u"])
@@ -3,7 +3,11 @@ from . import views
 
 urlpatterns = [
     path("chat/interactive/stream", views.interactive_stream, name="interactive_stream"),
+    path("chat/interactive/stream/<str:stream_id>", views.interactive_stream_events, name="interactive_stream_events"),
     path("chat/sessions", views.sessions, name="chat_sessions"),
     path("chat/sessions/<uuid:session_id>", views.session_detail, name="chat_session_detail"),
+    path("chat/sessions/<uuid:session_id>/messages/<uuid:message_id>", views.session_message, name="chat_session_message"),
+    path("chat/sessions/<uuid:session_id>/checkpoints", views.session_checkpoints, name="chat_session_checkpoints"),
+    path("chat/sessions/<uuid:session_id>/fork", views.session_fork, name="chat_session_fork"),
     path("tts", views.tts, name="tts"),
 ]
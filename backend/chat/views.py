@@ -1,21 +1,30 @@
 from django.http import HttpRequest, StreamingHttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Length, Substr
 from django.utils.timezone import now
+from asgiref.sync import sync_to_async
+from datetime import datetime
 import json
-from typing import Any, Dict, Generator, List
-import asyncio
-import threading
-import queue
+from typing import Any, AsyncGenerator, Dict, List
+import logging
 import uuid
 
-from .models import Thread, Message, Run
+from .models import GraphCheckpoint, Thread, Message, Run
 from agents.models import Agent
 from agents.services import graph_factory
-from common.http import require_user
+from agents.services.checkpointer import DjangoCheckpointer
+from chat.streams import STREAMS, resume_token_owner, sse_events, start_stream
+from common.http import fast_json_response, require_user
 from rest_framework.authtoken.models import Token
 
 
+logger = logging.getLogger(__name__)
+
+SESSION_PREVIEW_CHARS = 120
+
+
 def _json(request: HttpRequest) -> Dict[str, Any]:
     try:
         return json.loads(request.body.decode("utf-8") or "{}")
@@ -49,29 +58,10 @@ def _auth_user_id(request: HttpRequest) -> str:
     raise ValueError("Missing user_id")
 
 
-@csrf_exempt
-def interactive_stream(request: HttpRequest):
-    """Stream interactive chat response from LangGraph.
-    Body: { text: str, thread_id?: str, user_id?: str }
-    Response: text/plain chunked assistant deltas
-    Also persists the assistant message at the end if a thread_id is provided (and user message assumed persisted separately).
-    """
-    cid = str(uuid.uuid4())[:8]
-    if request.method != "POST":
-        return JsonResponse({"error": "Method not allowed"}, status=405)
-    data = _json(request)
-    
-    try:
-        user_id = _auth_user_id(request)
-    except Exception as e:
-        return JsonResponse({"error": str(e)}, status=400)
-
-    text = (data.get("text") or "").strip()
-    thread_id = data.get("thread_id") or data.get("threadId")
-
-    if not text:
-        return JsonResponse({"error": "Missing text"}, status=400)
-
+def _open_stream(user_id: str, text: str, thread_id: Any) -> Any:
+    """Resolve (or create) the thread for a stream and make sure it has a Run for the
+    checkpointer. Returns the Thread, or a JsonResponse describing the error."""
+    thr = None
     # Fallback: create a thread if not provided
     if not thread_id:
         with transaction.atomic():
@@ -80,11 +70,10 @@ def interactive_stream(request: HttpRequest):
             if not last_agent:
                 # Create a minimal default agent for this user so chat can proceed
                 last_agent = Agent.objects.create(user_id=user_id, name="My Agent", description="", purpose="")
-            thread = Thread.objects.create(user_id=user_id, title=text[:80], agent=last_agent)
-            thread_id = str(thread.id)
-    
+            thr = Thread.objects.create(user_id=user_id, title=text[:80], agent=last_agent)
+
     try:
-        thr = thread if 'thread' in locals() else Thread.objects.get(id=thread_id)
+        thr = thr or Thread.objects.get(id=thread_id)
     except Thread.DoesNotExist:
         return JsonResponse({"error": "Invalid thread_id"}, status=400)
 
@@ -99,146 +88,173 @@ def interactive_stream(request: HttpRequest):
             with transaction.atomic():
                 run = Run.objects.create(thread=thr, status="running")
     except Exception as e:
-
         return JsonResponse({"error": f"Failed to create run: {e}"}, status=500)
-    
+    return thr
 
-    def generate() -> Generator[bytes, None, None]:
-        """Bridge async token stream to sync HTTP streaming response."""
-        acc: List[str] = []
-        q: "queue.Queue[bytes | None]" = queue.Queue()
 
-        # Safe JSON serializer for tool events (do not reshape; just coerce non-serializable values)
-        def _json_default(o):  # type: ignore[override]
-            try:
-                return str(o)
-            except Exception:
-                return None
-
-        def _runner() -> None:
-            async def _work():
-                try:
-                    # Set current agent context for tools
-                    try:
-                        from agents.services.knowledge import set_current_agent_id
-                        current_agent_id = None
-                        try:
-                            current_agent_id = str(thr.agent_id) if getattr(thr, "agent_id", None) else None
-                        except Exception:
-                            current_agent_id = None
-                        set_current_agent_id(current_agent_id)
-                    except Exception:
-                        pass
-                    # Use agent-aware streaming so tools are bound per agent.toolkits
-                    agent_id_for_tools = str(getattr(thr, "agent_id", "")) or None
-                    # Debug-only: no mutation/pairing; emit raw events
-                    if agent_id_for_tools:
-                        agen_stream = graph_factory.stream_interactive_async_with_agent  # type: ignore[attr-defined]
-                        async for ev in agen_stream(
-                            thread_id=thread_id,
-                            text=text,
-                            user_id=user_id,
-                            agent_id=agent_id_for_tools,
-                        ):
-                            if isinstance(ev, dict):
-                                # Convert model stream events to message_delta like the non-agent path
-                                if ev.get("event") == "on_chat_model_stream":
-                                    data = ev.get("data", {}) or {}
-                                    chunk = data.get("chunk")
-                                    if chunk and getattr(chunk, "content", None):
-                                        q.put(str(chunk.content).encode("utf-8"))
-                                        continue
-                                if ev.get("type") == "message_delta":
-                                    delta = ev.get("delta") or ""
-                                    if delta:
-                                        q.put(delta.encode("utf-8"))
-                                    continue
-                                if ev.get("event") in ("on_tool_start", "on_tool_end", "on_tool_error"):
-                                    try:
-                                        # Emit raw event line for frontend debugging
-                                        try:
-                                            import logging as _logging
-                                            _logging.getLogger(__name__).info("tool_event: %s", {k: ev.get(k) for k in ("event","name","run_id","id")} )
-                                        except Exception:
-                                            pass
-                                        q.put((json.dumps(ev, default=_json_default, ensure_ascii=False) + "\n").encode("utf-8"))
-                                    except Exception:
-                                        pass
-                                    continue
-                    else:
-                        async for ev in graph_factory.stream_interactive_async(
-                            thread_id, text, user_id,
-                        ):
-                            if isinstance(ev, dict):
-                                if ev.get("type") == "message_delta":
-                                    delta = ev.get("delta") or ""
-                                    if delta:
-                                        q.put(delta.encode("utf-8"))
-                                    continue
-                                if ev.get("event") in ("on_tool_start", "on_tool_end", "on_tool_error"):
-                                    try:
-                                        try:
-                                            import logging as _logging
-                                            _logging.getLogger(__name__).info("tool_event: %s", {k: ev.get(k) for k in ("event","name","run_id","id")} )
-                                        except Exception:
-                                            pass
-                                        q.put((json.dumps(ev, default=_json_default, ensure_ascii=False) + "\n").encode("utf-8"))
-                                    except Exception:
-                                        pass
-                                    continue
-                except Exception as e:
-                    
-                    q.put(f"\n[error] {e}\n".encode("utf-8"))
-                finally:
-                    q.put(None)
-
-            # Run the async stream on its own event loop
-            asyncio.run(_work())
-
-        t = threading.Thread(target=_runner, daemon=True)
-        t.start()
-
-        while True:
-            chunk = q.get()
-            if chunk is None:
-                break
-            try:
-                s = chunk.decode("utf-8")
-                acc.append(s)
-                
-            except Exception:
-                pass
-            yield chunk
-
-        # Persist assistant message at end
+def _json_default(o):  # type: ignore[override]
+    # Safe JSON serializer for tool events (do not reshape; just coerce non-serializable values)
+    try:
+        return str(o)
+    except Exception:
+        return None
+
+
+def _stream_bytes(ev: Any) -> bytes:
+    """Bytes sent to the client for one graph stream event (b"" when it sends nothing)."""
+    if not isinstance(ev, dict):
+        return b""
+    # Convert model stream events to message_delta like the non-agent path
+    if ev.get("event") == "on_chat_model_stream":
+        chunk = (ev.get("data", {}) or {}).get("chunk")
+        return str(chunk.content).encode("utf-8") if chunk and getattr(chunk, "content", None) else b""
+    if ev.get("type") == "message_delta":
+        return (ev.get("delta") or "").encode("utf-8")
+    if ev.get("event") in ("on_tool_start", "on_tool_end", "on_tool_error"):
         try:
-            content = "".join(acc)
-            
+            # Emit raw event line for frontend debugging
+            logger.info("tool_event: %s", {k: ev.get(k) for k in ("event", "name", "run_id", "id")})
+            return (json.dumps(ev, default=_json_default, ensure_ascii=False) + "\n").encode("utf-8")
+        except Exception:
+            return b""
+    return b""
+
+
+def _persist_assistant(thread_id: str, content: str) -> None:
+    Message.objects.append(thread_id, role="assistant", content=str(content))
+    # Best-effort: attempt smart title update after assistant reply
+    try:
+        _maybe_update_title(thread_id)
+    except Exception:
+        # Do not break streaming if title update fails
+        pass
+
+
+def _graph_events(thread_id: str, text: str, user_id: str, agent_id: Any) -> Any:
+    # Set current agent context for tools
+    try:
+        from agents.services.knowledge import set_current_agent_id
+        set_current_agent_id(agent_id)
+    except Exception:
+        pass
+    # Use agent-aware streaming so tools are bound per agent.toolkits
+    if agent_id:
+        return graph_factory.stream_interactive_async_with_agent(thread_id=thread_id, text=text, user_id=user_id, agent_id=agent_id)
+    return graph_factory.stream_interactive_async(thread_id, text, user_id)
+
+
+def _wants_sse(request: HttpRequest, data: Dict[str, Any]) -> bool:
+    return "text/event-stream" in (request.headers.get("Accept") or "") or data.get("protocol") == "sse"
+
+
+def _sse_response(stream_id: str, after: int, token: str = "") -> StreamingHttpResponse:
+    response = StreamingHttpResponse(sse_events(stream_id, after), content_type="text/event-stream; charset=utf-8")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: do not buffer the event stream
+    response["X-Stream-Id"] = stream_id
+    if token:
+        response["X-Stream-Resume-Token"] = token
+    return response
+
+
+async def interactive_stream(request: HttpRequest):
+    """Stream interactive chat response from LangGraph.
+    Body: { text: str, thread_id?: str, user_id?: str, protocol?: "sse" }
+    Response: text/plain chunked assistant deltas
+    Also persists the assistant message at the end if a thread_id is provided (and user message assumed persisted separately).
+
+    With `Accept: text/event-stream` (or protocol "sse") the response is a resumable SSE
+    stream of typed events instead (see chat.streams); the run then continues if the client
+    disconnects, and GET chat/interactive/stream/<stream_id> with Last-Event-ID resumes it.
+
+    Async view: the graph is iterated on the server's event loop, so an open stream costs a
+    coroutine, not a thread with its own event loop. ORM work runs through sync_to_async.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    data = _json(request)
+
+    try:
+        user_id = await sync_to_async(_auth_user_id)(request)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    text = (data.get("text") or "").strip()
+    if not text:
+        return JsonResponse({"error": "Missing text"}, status=400)
+
+    thr = await sync_to_async(_open_stream)(user_id, text, data.get("thread_id") or data.get("threadId"))
+    if isinstance(thr, JsonResponse):
+        return thr
+    thread_id = str(thr.id)
+    agent_id = str(thr.agent_id) if getattr(thr, "agent_id", None) else None
+
+    if _wants_sse(request, data):
+        stream_id = uuid.uuid4().hex
+
+        async def on_complete(content: str) -> None:
+            # Only the answer text is stored; tool events are not part of the message
             if content:
-                with transaction.atomic():
-                    thr2 = Thread.objects.get(id=thread_id)
-                    seq = (Message.objects.filter(thread=thr2).count() or 0) + 1
-                    # Ensure assistant content is JSON-safe text
-                    try:
-                        persist_text = str(content)
-                    except Exception:
-                        persist_text = ""
-                    Message.objects.create(thread=thr2, role="assistant", content=persist_text, sequence=seq)
-                # Best-effort: attempt smart title update after assistant reply
-                try:
-                    _maybe_update_title(thread_id)
-                except Exception as _e:
-                    # Do not break streaming if title update fails
-                    pass
-           
+                await sync_to_async(_persist_assistant, thread_sensitive=False)(thread_id, content)
+
+        token = await start_stream(stream_id, user_id, _graph_events(thread_id, text, user_id, agent_id), on_complete)
+        return _sse_response(stream_id, 0, token)
+
+    async def generate() -> AsyncGenerator[bytes, None]:
+        acc: List[str] = []
+        try:
+            async for ev in _graph_events(thread_id, text, user_id, agent_id):
+                chunk = _stream_bytes(ev)
+                if chunk:
+                    acc.append(chunk.decode("utf-8"))
+                    yield chunk
         except Exception as e:
-            
-            yield f"\n[error] {e}\n".encode("utf-8")
+            err = f"\n[error] {e}\n"
+            acc.append(err)
+            yield err.encode("utf-8")
+
+        # Persist assistant message at end; off the shared sync thread, as the title update calls the model
+        content = "".join(acc)
+        if content:
+            try:
+                await sync_to_async(_persist_assistant, thread_sensitive=False)(thread_id, content)
+            except Exception as e:
+                yield f"\n[error] {e}\n".encode("utf-8")
 
-    
     return StreamingHttpResponse(generate(), content_type="text/plain; charset=utf-8")
 
 
+async def interactive_stream_events(request: HttpRequest, stream_id: str):
+    """Resume an SSE chat stream: replays buffered events after Last-Event-ID (header, or
+    `last_event_id` query parameter), then follows the run until its `done` event.
+    Authenticated by session/token, or by the `resume_token` query parameter issued with
+    the stream (X-Stream-Resume-Token header and first run_status event)."""
+    if request.method != "GET":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    token = request.GET.get("resume_token")
+    if token:
+        user_id = resume_token_owner(token, stream_id)
+        if user_id is None:
+            return JsonResponse({"error": "Invalid or expired resume token"}, status=403)
+    else:
+        try:
+            user_id = await sync_to_async(_auth_user_id)(request)
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=400)
+    if await STREAMS.owner(stream_id) != user_id:
+        return JsonResponse({"error": "Unknown or expired stream"}, status=404)
+    try:
+        after = max(0, int(request.headers.get("Last-Event-ID") or request.GET.get("last_event_id") or 0))
+    except ValueError:
+        after = 0
+    return _sse_response(stream_id, after)
+
+
+# Set directly: Django 4.2's csrf_exempt wraps views in a sync function, hiding the coroutine
+interactive_stream.csrf_exempt = True
+interactive_stream_events.csrf_exempt = True
+
+
 # ---- Smart title generation (best-effort) ----
 from langchain_core.messages import HumanMessage
 
@@ -308,7 +324,9 @@ def _maybe_update_title(thread_id: str) -> None:
 
 @csrf_exempt
 def sessions(request: HttpRequest):
-    """GET: list sessions (threads) for current user
+    """GET: list sessions (threads) for current user, most recently active first, with the
+       last message preview and message count
+       Query: limit? (default 50, max 200), before? (nextBefore from the previous page)
        POST: create session { title: str, agent_id?: str }
     """
     try:
@@ -317,17 +335,48 @@ def sessions(request: HttpRequest):
         return JsonResponse({"error": str(e)}, status=400)
 
     if request.method == "GET":
-        # Exclude ambient threads from chat history sidebar
         try:
-            items = Thread.objects.filter(user_id=user_id, is_ambient=False).order_by("-created_at")
-        except Exception:
-            # Back-compat if old DB without is_ambient
-            items = Thread.objects.filter(user_id=user_id).order_by("-created_at")
-        return JsonResponse({
+            limit = max(1, min(int(request.GET.get("limit") or 50), 200))
+        except ValueError:
+            return JsonResponse({"error": "Invalid limit"}, status=400)
+        # Exclude ambient threads from chat history sidebar
+        qs = Thread.objects.filter(user_id=user_id, is_ambient=False)
+        before = request.GET.get("before")
+        if before:
+            try:
+                # Cursor: "<updated_at>|<id>" of the previous page's last item
+                stamp, tid = before.rsplit("|", 1)
+                # An unencoded "+00:00" arrives as " 00:00"
+                anchor = (datetime.fromisoformat(stamp.replace(" ", "+")), uuid.UUID(tid))
+            except ValueError:
+                return JsonResponse({"error": "Invalid before"}, status=400)
+            qs = qs.filter(Q(updated_at__lt=anchor[0]) | Q(updated_at=anchor[0], id__lt=anchor[1]))
+        last = Message.objects.filter(thread=OuterRef("pk")).order_by("-sequence")
+        rows = list(
+            qs.order_by("-updated_at", "-id")
+            .annotate(
+                last_role=Subquery(last.values("role")[:1]),
+                last_preview=Subquery(last.values(p=Substr("content", 1, SESSION_PREVIEW_CHARS))[:1]),
+                message_count=Subquery(
+                    Message.objects.filter(thread=OuterRef("pk")).order_by().values("thread").annotate(n=Count("id")).values("n")
+                ),
+            )
+            .values("id", "title", "agent_id", "created_at", "updated_at", "last_role", "last_preview", "message_count")[:limit]
+        )
+        return fast_json_response({
             "items": [
-                {"id": str(t.id), "title": t.title, "createdAt": t.created_at.isoformat(), "agentId": str(t.agent_id) if t.agent_id else None}
-                for t in items
-            ]
+                {
+                    "id": str(r["id"]),
+                    "title": r["title"],
+                    "createdAt": r["created_at"].isoformat(),
+                    "updatedAt": r["updated_at"].isoformat(),
+                    "agentId": str(r["agent_id"]) if r["agent_id"] else None,
+                    "lastMessage": {"role": r["last_role"], "preview": r["last_preview"]} if r["last_role"] else None,
+                    "messageCount": r["message_count"] or 0,
+                }
+                for r in rows
+            ],
+            "nextBefore": f"{rows[-1]['updated_at'].isoformat()}|{rows[-1]['id']}" if len(rows) == limit else None,
         })
 
     if request.method == "POST":
@@ -350,9 +399,68 @@ def sessions(request: HttpRequest):
     return JsonResponse({"error": "Method not allowed"}, status=405)
 
 
+def _message_json(m: Message, truncate: int = 0) -> Dict[str, Any]:
+    out = {"id": str(m.id), "role": m.role, "sequence": m.sequence, "createdAt": m.created_at.isoformat()}
+    if truncate:
+        out["content"] = m.preview
+        out["truncated"] = m.content_length > truncate
+        out["contentLength"] = m.content_length
+    else:
+        out["content"] = m.content
+    return out
+
+
+def _message_page(t: Thread, request: HttpRequest) -> Any:
+    """A thread's messages in display order, keyed by sequence. Pagination is opt-in: without
+    limit/before/after this is the whole history; with only `limit` it is the latest page, and
+    `before`/`after` page towards older/newer messages.
+    Returns the response fields, or a JsonResponse describing a bad parameter."""
+    try:
+        limit = max(1, min(int(request.GET.get("limit") or 50), 200))
+        before = int(request.GET["before"]) if request.GET.get("before") else None
+        after = int(request.GET["after"]) if request.GET.get("after") else None
+        truncate = max(0, int(request.GET.get("truncate") or 0))
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit, before, after or truncate"}, status=400)
+    if before is not None and after is not None:
+        return JsonResponse({"error": "Pass only one of before and after"}, status=400)
+
+    qs = Message.objects.filter(thread=t)
+    if truncate:
+        # Cut long contents (tool event dumps) in the database; the rest stays unread
+        qs = qs.only("id", "role", "sequence", "created_at").annotate(
+            preview=Substr("content", 1, truncate), content_length=Length("content"),
+        )
+    else:
+        qs = qs.only("id", "role", "content", "sequence", "created_at")
+    if not any(request.GET.get(k) for k in ("limit", "before", "after")):
+        rows = list(qs.order_by("sequence"))
+        return {"messages": [_message_json(m, truncate) for m in rows], "nextBefore": None, "nextAfter": None}
+    # One row past the page tells whether there is more in the direction of travel
+    if after is not None:
+        rows = list(qs.filter(sequence__gt=after).order_by("sequence")[:limit + 1])
+        older, newer = True, len(rows) > limit
+        rows = rows[:limit]
+    else:
+        if before is not None:
+            qs = qs.filter(sequence__lt=before)
+        rows = list(qs.order_by("-sequence")[:limit + 1])
+        older, newer = len(rows) > limit, before is not None
+        rows = rows[:limit][::-1]
+    return {
+        "messages": [_message_json(m, truncate) for m in rows],
+        "nextBefore": rows[0].sequence if rows and older else None,
+        "nextAfter": rows[-1].sequence if rows and newer else None,
+    }
+
+
 @csrf_exempt
 def session_detail(request: HttpRequest, session_id: str):
-    """GET: return session with messages
+    """GET: return session with one page of messages, oldest first
+       Query: limit? (max 200; default 50 once paging), before?/after? (sequence cursors);
+       without any of the three every message is returned, with only limit the latest page.
+       truncate? (cut each content to this many characters; fetch the full message
+       from chat/sessions/<id>/messages/<message_id>)
        POST: append a message { role: "user"|"assistant"|..., content: str }
     """
     try:
@@ -366,15 +474,14 @@ def session_detail(request: HttpRequest, session_id: str):
         return JsonResponse({"error": "Not found"}, status=404)
 
     if request.method == "GET":
-        msgs = Message.objects.filter(thread=t).order_by("sequence", "created_at")
-        return JsonResponse({
+        page = _message_page(t, request)
+        if isinstance(page, JsonResponse):
+            return page
+        return fast_json_response({
             "id": str(t.id),
             "title": t.title,
             "agentId": str(t.agent_id) if t.agent_id else None,
-            "messages": [
-                {"id": str(m.id), "role": m.role, "content": m.content, "createdAt": m.created_at.isoformat()}
-                for m in msgs
-            ],
+            **page,
         })
 
     if request.method == "POST":
@@ -383,9 +490,7 @@ def session_detail(request: HttpRequest, session_id: str):
         content = (data.get("content") or data.get("message", {}).get("content") or "").strip()
         if not content:
             return JsonResponse({"error": "Missing content"}, status=400)
-        with transaction.atomic():
-            seq = (Message.objects.filter(thread=t).count() or 0) + 1
-            m = Message.objects.create(thread=t, role=role, content=content, sequence=seq)
+        m = Message.objects.append(t, role=role, content=content)
         return JsonResponse({"id": str(m.id), "role": m.role, "content": m.content, "createdAt": m.created_at.isoformat()})
 
     if request.method == "PATCH":
@@ -404,6 +509,126 @@ def session_detail(request: HttpRequest, session_id: str):
     return JsonResponse({"error": "Method not allowed"}, status=405)
 
 
+@csrf_exempt
+def session_message(request: HttpRequest, session_id: str, message_id: str):
+    """GET: one message with its full content (for pages fetched with truncate)."""
+    if request.method != "GET":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    try:
+        user_id = _auth_user_id(request)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    m = (
+        Message.objects.filter(id=message_id, thread_id=session_id, thread__user_id=user_id)
+        .only("id", "role", "content", "sequence", "created_at")
+        .first()
+    )
+    if m is None:
+        return JsonResponse({"error": "Not found"}, status=404)
+    return fast_json_response(_message_json(m))
+
+
+@csrf_exempt
+def session_checkpoints(request: HttpRequest, session_id: str):
+    """GET: checkpoints of a session, newest first, to pick a fork point.
+       Query: limit? (default 50, max 200), before? (checkpoint id from the previous page)
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    try:
+        user_id = _auth_user_id(request)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    try:
+        t = Thread.objects.get(id=session_id, user_id=user_id)
+    except Thread.DoesNotExist:
+        return JsonResponse({"error": "Not found"}, status=404)
+
+    try:
+        limit = max(1, min(int(request.GET.get("limit") or 50), 200))
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+    saver = DjangoCheckpointer()
+    qs = GraphCheckpoint.objects.filter(thread=t, checkpoint_ns=saver.namespace)
+    before = request.GET.get("before")
+    if before:
+        anchor = qs.filter(checkpoint_id=before).values_list("created_at", "id").first()
+        if anchor is None:
+            return JsonResponse({"error": "Invalid before"}, status=400)
+        qs = qs.filter(Q(created_at__lt=anchor[0]) | Q(created_at=anchor[0], id__lt=anchor[1]))
+    rows = list(
+        qs.order_by("-created_at", "-id").values("checkpoint_id", "parent_id", "source", "step", "created_at")[:limit]
+    )
+    return JsonResponse({
+        "items": [
+            {"id": r["checkpoint_id"], "parentId": r["parent_id"] or None, "source": r["source"], "step": r["step"], "createdAt": r["created_at"].isoformat()}
+            for r in rows
+        ],
+        "nextBefore": rows[-1]["checkpoint_id"] if len(rows) == limit else None,
+    })
+
+
+@csrf_exempt
+def session_fork(request: HttpRequest, session_id: str):
+    """POST: branch a session at one of its checkpoints into a new session
+       Body: { checkpoint_id: str, title?: str, before_sequence?: int }
+       The new session shares the checkpoint state by reference and continues from it on the
+       next interactive turn. Messages with sequence < before_sequence are copied for display.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    try:
+        user_id = _auth_user_id(request)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    try:
+        src = Thread.objects.get(id=session_id, user_id=user_id)
+    except Thread.DoesNotExist:
+        return JsonResponse({"error": "Not found"}, status=404)
+
+    data = _json(request)
+    checkpoint_id = (data.get("checkpoint_id") or data.get("checkpointId") or "").strip()
+    if not checkpoint_id:
+        return JsonResponse({"error": "Missing checkpoint_id"}, status=400)
+    before_sequence = data.get("before_sequence", data.get("beforeSequence"))
+    try:
+        before_sequence = int(before_sequence) if before_sequence is not None else None
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "Invalid before_sequence"}, status=400)
+    title = (data.get("title") or "").strip() or (src.title or "New chat")
+    try:
+        with transaction.atomic():
+            t = Thread.objects.create(user_id=user_id, title=title[:255], agent_id=src.agent_id, is_ambient=False)
+            cfg = DjangoCheckpointer().fork({"configurable": {"thread_id": str(src.id), "checkpoint_id": checkpoint_id}}, str(t.id))
+            if before_sequence is not None:
+                msgs = Message.objects.filter(thread=src, sequence__lt=before_sequence).order_by("sequence", "created_at")
+                Message.objects.bulk_create([
+                    Message(
+                        thread=t,
+                        role=m.role,
+                        content=m.content,
+                        events_json=m.events_json,
+                        tool_name=m.tool_name,
+                        tool_call_id=m.tool_call_id,
+                        sequence=m.sequence,
+                    )
+                    for m in msgs
+                ])
+                # New messages in the fork continue after the copied ones
+                t.last_sequence = max((m.sequence for m in msgs), default=0)
+                t.save(update_fields=["last_sequence"])
+    except GraphCheckpoint.DoesNotExist:
+        return JsonResponse({"error": "Checkpoint not found"}, status=404)
+    return JsonResponse({
+        "id": str(t.id),
+        "title": t.title,
+        "createdAt": t.created_at.isoformat(),
+        "agentId": str(t.agent_id) if t.agent_id else None,
+        "checkpointId": cfg["configurable"]["checkpoint_id"],
+        "forkedFrom": {"id": str(src.id), "checkpointId": checkpoint_id},
+    })
+
+
 @csrf_exempt
 def tts(request: HttpRequest):
     """Stub TTS endpoint; kept for UI compatibility."""
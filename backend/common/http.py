@@ -1,8 +1,13 @@
 from typing import Any, Dict, Optional
 import json
-from django.http import HttpRequest
+from django.http import HttpRequest, HttpResponse
 from rest_framework.authtoken.models import Token
 
+try:  # several times faster than json on large message lists
+    import orjson
+except Exception:  # pragma: no cover - optional
+    orjson = None
+
 
 def json_body(request: HttpRequest) -> Dict[str, Any]:
     """Safely parse JSON body for application/json requests."""
@@ -14,6 +19,13 @@ def json_body(request: HttpRequest) -> Dict[str, Any]:
         return {}
 
 
+def fast_json_response(data: Any, status: int = 200) -> HttpResponse:
+    """JsonResponse equivalent serialized with orjson when available. `data` must hold
+    JSON-native values only (format datetimes and UUIDs before passing them in)."""
+    body = orjson.dumps(data) if orjson is not None else json.dumps(data).encode("utf-8")
+    return HttpResponse(body, status=status, content_type="application/json")
+
+
 def require_user(request: HttpRequest) -> Optional[Dict[str, Any]]:
     """Return current user from session or Token header.
 
@@ -33,7 +45,7 @@ def require_user(request: HttpRequest) -> Optional[Dict[str, Any]]:
                 user = token.user
             except Token.DoesNotExist:
                 user = None
-    if not user:
+    if not (user and getattr(user, "is_authenticated", False)):
         return None
     return {
         "id": str(user.id),
@@ -14,9 +14,18 @@ from .services.composio_service import ComposioService
 from .models import ConnectedIntegration
 from common.http import require_user, json_body
 from agents.tasks import ambient_run_task
+from agents.services.graph_factory import invalidate_agent_graphs
+from agents.services.tool_cache import AGENT_TOOLS
+from agents.services.tool_result_cache import TOOL_RESULTS
 from agents.models import Agent, Job
 
 
+def _connections_changed(user_id: str) -> None:
+    """Drop everything derived from the user's connections: graphs, tool bindings, tool results."""
+    invalidate_agent_graphs(user_id=user_id)
+    AGENT_TOOLS.invalidate_user(user_id)
+    TOOL_RESULTS.invalidate_user(user_id)
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def create_connected_account(request: HttpRequest):
@@ -63,6 +72,7 @@ def create_connected_account(request: HttpRequest):
                         "status": status,
                     },
                 )
+                _connections_changed(ci_user_id)
         except Exception as e:
             logging.exception("Failed to persist ConnectedIntegration (custom auth): %s", e)
         return JsonResponse({"connectedAccount": connected, "authConfigId": auth_cfg["id"]}, status=201)
@@ -106,6 +116,7 @@ def initiate_oauth(request: HttpRequest):
                             "status": status,
                         },
                     )
+                    _connections_changed(ci_user_id)
             except Exception as e:
                 logging.exception("Failed to persist ConnectedIntegration (oauth wait): %s", e)
             return JsonResponse({"connectedAccount": connected}, status=200)
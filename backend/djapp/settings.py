@@ -204,6 +204,32 @@ else:
         }
     }
 
+# Shared cache (cross-worker stamps/counters); per-process memory when Redis is absent
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# SSE chat streams buffer their events per run so clients can resume with Last-Event-ID:
+# the newest CHAT_STREAM_BUFFER_EVENTS events, kept CHAT_STREAM_RETENTION_SECONDS after the run.
+# "redis" lets a reconnect land on any worker; "memory" needs sticky sessions.
+CHAT_STREAM_BUFFER = os.getenv('CHAT_STREAM_BUFFER', 'redis' if REDIS_URL else 'memory').lower()
+CHAT_STREAM_BUFFER_EVENTS = int(os.getenv('CHAT_STREAM_BUFFER_EVENTS', '2000'))
+CHAT_STREAM_RETENTION_SECONDS = int(os.getenv('CHAT_STREAM_RETENTION_SECONDS', '600'))
+CHAT_STREAM_MAX_STREAMS = int(os.getenv('CHAT_STREAM_MAX_STREAMS', '1000'))
+CHAT_STREAM_HEARTBEAT_SECONDS = float(os.getenv('CHAT_STREAM_HEARTBEAT_SECONDS', '15'))
+# Lifetime of the signed resume_token that lets an EventSource reconnect without credentials
+CHAT_STREAM_RESUME_TOKEN_SECONDS = int(os.getenv('CHAT_STREAM_RESUME_TOKEN_SECONDS', '900'))
+
 # Supabase settings removed; migrating to Django auth
 SUPABASE_PROJECT_URL = ''
 SUPABASE_JWKS_URL = ''
@@ -214,10 +240,104 @@ SUPABASE_SERVICE_ROLE_KEY = ''
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 COMPOSIO_API_KEY = os.getenv('COMPOSIO_API_KEY', '')
 
+# ---- LLM clients ----
+# Shared ChatOpenAI clients per (model, temperature, base URL) over pooled keep-alive connections.
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', '')
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv('LLM_HTTP_MAX_CONNECTIONS', '100'))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv('LLM_HTTP_MAX_KEEPALIVE', '20'))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv('LLM_HTTP_KEEPALIVE_EXPIRY', '60'))
+LLM_HTTP_TIMEOUT = float(os.getenv('LLM_HTTP_TIMEOUT', '60'))
+LLM_HTTP_CONNECT_TIMEOUT = float(os.getenv('LLM_HTTP_CONNECT_TIMEOUT', '10'))
+# HTTP/2 multiplexes concurrent requests over one connection when h2 is installed.
+LLM_HTTP2 = os.getenv('LLM_HTTP2', 'true').lower() in ('1', 'true', 'yes')
+# LLM_BACKEND=fake swaps every chat model for a deterministic fake (also used when no
+# OPENAI_API_KEY is set): replies depend only on FAKE_LLM_SEED and the messages, stream at
+# FAKE_LLM_TOKENS_PER_SECOND (0 = instant) after FAKE_LLM_FIRST_TOKEN_MS, and call a bound tool
+# with probability FAKE_LLM_TOOL_CALL_RATE. FAKE_LLM_SCRIPT points to a JSON list of scripted
+# replies ({"content": ..., "tool_calls": [{"name": ..., "args": {...}}]}), one per model call.
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'openai').lower()
+FAKE_LLM_SEED = int(os.getenv('FAKE_LLM_SEED', '0'))
+FAKE_LLM_FIRST_TOKEN_MS = float(os.getenv('FAKE_LLM_FIRST_TOKEN_MS', '0'))
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv('FAKE_LLM_TOKENS_PER_SECOND', '0'))
+FAKE_LLM_RESPONSE_TOKENS = int(os.getenv('FAKE_LLM_RESPONSE_TOKENS', '24'))
+FAKE_LLM_TOOL_CALL_RATE = float(os.getenv('FAKE_LLM_TOOL_CALL_RATE', '0'))
+FAKE_LLM_SCRIPT = os.getenv('FAKE_LLM_SCRIPT', '')
+# Prompt history per model call: the newest CONTEXT_KEEP_TURNS turns stay verbatim, older ones
+# are folded into a rolling summary once a call would exceed its token budget.
+# CONTEXT_TOKEN_BUDGETS overrides the budget per model, e.g. "gpt-4o-mini=64000,gpt-4o=96000".
+CONTEXT_WINDOW_ENABLED = os.getenv('CONTEXT_WINDOW_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '32000'))
+CONTEXT_TOKEN_BUDGETS = {
+    name.strip(): int(value)
+    for name, _, value in (item.partition('=') for item in os.getenv('CONTEXT_TOKEN_BUDGETS', '').split(',') if '=' in item)
+}
+CONTEXT_KEEP_TURNS = int(os.getenv('CONTEXT_KEEP_TURNS', '6'))
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv('CONTEXT_SUMMARY_MAX_TOKENS', '512'))
+CONTEXT_SUMMARY_MODEL = os.getenv('CONTEXT_SUMMARY_MODEL', '')
+# Token counts of message texts, so each call only tokenizes messages it has not seen; 0 disables.
+CONTEXT_TOKEN_CACHE_SIZE = int(os.getenv('CONTEXT_TOKEN_CACHE_SIZE', '8192'))
+# Tool calls of one model message run concurrently; a call over its deadline returns a timeout
+# ToolMessage. TOOL_TIMEOUTS overrides per tool name, e.g. "GMAIL_SEND_EMAIL=60,knowledge-search=10".
+TOOL_EXECUTOR_MAX_WORKERS = int(os.getenv('TOOL_EXECUTOR_MAX_WORKERS', '8'))
+TOOL_TIMEOUT_SECONDS = float(os.getenv('TOOL_TIMEOUT_SECONDS', '30'))
+TOOL_TURN_TIMEOUT_SECONDS = float(os.getenv('TOOL_TURN_TIMEOUT_SECONDS', '90'))
+TOOL_TIMEOUTS = {
+    name.strip(): float(value)
+    for name, _, value in (item.partition('=') for item in os.getenv('TOOL_TIMEOUTS', '').split(',') if '=' in item)
+}
+# Results of tools opted in with @cached_tool, per (tool, args, user); 0 disables.
+TOOL_RESULT_CACHE_SIZE = int(os.getenv('TOOL_RESULT_CACHE_SIZE', '1024'))
+# Agents with many Composio tools bind only the TOOL_SELECTION_TOP_K most relevant to the turn
+# (plus knowledge/job/HITL tools); at or below TOOL_SELECTION_MIN_TOOLS candidates all are bound.
+# Tools lead the cached prompt prefix, so a turn whose selection differs from the last one
+# re-sends the whole prompt uncached; keep the threshold high enough that the schema tokens
+# saved outweigh that. An embedder whose measured recall (eval_tool_selection) is below
+# TOOL_SELECTION_MIN_RECALL is not used and every tool is bound.
+TOOL_SELECTION_ENABLED = os.getenv('TOOL_SELECTION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+TOOL_SELECTION_TOP_K = int(os.getenv('TOOL_SELECTION_TOP_K', '12'))
+TOOL_SELECTION_MIN_TOOLS = int(os.getenv('TOOL_SELECTION_MIN_TOOLS', '64'))
+TOOL_SELECTION_CONTEXT_MESSAGES = int(os.getenv('TOOL_SELECTION_CONTEXT_MESSAGES', '4'))
+TOOL_SELECTION_EMBEDDING_MODEL = os.getenv('TOOL_SELECTION_EMBEDDING_MODEL', '')
+TOOL_SELECTION_MIN_RECALL = float(os.getenv('TOOL_SELECTION_MIN_RECALL', '0.95'))
+TOOL_EMBEDDING_CACHE_SIZE = int(os.getenv('TOOL_EMBEDDING_CACHE_SIZE', '4096'))
+
 # ---- Celery (ambient jobs) ----
 # If no broker/backend provided, Celery will still start but tasks won't persist results.
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', REDIS_URL or '')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', REDIS_URL or '')
+# Requires a running `celery -A djapp beat` process (see render.yaml).
+CELERY_BEAT_SCHEDULE = {
+    'compact-graph-checkpoints': {
+        'task': 'agents.tasks.jobs.compact_graph_checkpoints',
+        'schedule': float(os.getenv('CHECKPOINT_RETENTION_INTERVAL_SECONDS', '3600')),
+    },
+}
+
+# ---- LangGraph checkpointer ----
+# Delta mode stores only changed channels per superstep with a full snapshot every N steps.
+CHECKPOINT_DELTA_ENABLED = os.getenv('CHECKPOINT_DELTA_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+CHECKPOINT_SNAPSHOT_INTERVAL = int(os.getenv('CHECKPOINT_SNAPSHOT_INTERVAL', '20'))
+# Checkpoint blobs at or above this many bytes are zstd-compressed (0 disables).
+CHECKPOINT_COMPRESS_THRESHOLD = int(os.getenv('CHECKPOINT_COMPRESS_THRESHOLD', '16384'))
+# In-process cache of the latest checkpoint per thread. Cross-worker invalidation relies on
+# the shared Django cache, so it defaults on only when Redis backs CACHES.
+CHECKPOINT_CACHE_ENABLED = os.getenv('CHECKPOINT_CACHE_ENABLED', 'true' if REDIS_URL else 'false').lower() in ('1', 'true', 'yes')
+CHECKPOINT_CACHE_MAX_BYTES = int(os.getenv('CHECKPOINT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# Async checkpoint I/O through a psycopg pool (Postgres only), one pool per event loop.
+CHECKPOINT_ASYNC_POOL_ENABLED = os.getenv('CHECKPOINT_ASYNC_POOL_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+CHECKPOINT_POOL_MIN_SIZE = int(os.getenv('CHECKPOINT_POOL_MIN_SIZE', '1'))
+CHECKPOINT_POOL_MAX_SIZE = int(os.getenv('CHECKPOINT_POOL_MAX_SIZE', '10'))
+CHECKPOINT_POOL_TIMEOUT = float(os.getenv('CHECKPOINT_POOL_TIMEOUT', '30'))
+# Compiled agent graphs kept per process (0 disables; graphs are rebuilt on every message).
+AGENT_GRAPH_CACHE_SIZE = int(os.getenv('AGENT_GRAPH_CACHE_SIZE', '128'))
+# Composio tool bindings per (user, toolkits): in-process LRU plus raw schemas in the shared cache.
+COMPOSIO_TOOLS_CACHE_SIZE = int(os.getenv('COMPOSIO_TOOLS_CACHE_SIZE', '256'))
+COMPOSIO_TOOLS_CACHE_TTL = int(os.getenv('COMPOSIO_TOOLS_CACHE_TTL', '600'))
+# Retention: keep the newest N checkpoints per thread; expire idle ambient threads after N days.
+CHECKPOINT_RETENTION_KEEP_LAST = int(os.getenv('CHECKPOINT_RETENTION_KEEP_LAST', '50'))
+CHECKPOINT_RETENTION_AMBIENT_DAYS = int(os.getenv('CHECKPOINT_RETENTION_AMBIENT_DAYS', '14'))
+CHECKPOINT_RETENTION_BATCH_SIZE = int(os.getenv('CHECKPOINT_RETENTION_BATCH_SIZE', '500'))
+CHECKPOINT_RETENTION_MAX_BATCHES = int(os.getenv('CHECKPOINT_RETENTION_MAX_BATCHES', '50'))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
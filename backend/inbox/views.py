@@ -90,8 +90,7 @@ def inbox_respond(request, id: str):
         result = graph_factory.resume_ambient(str(thread.id), str(run.id), {"type": rtype, "args": args})
         content = result.get("message", "") or "(no output)"
         with transaction.atomic():
-            seq = Message.objects.filter(thread=thread).count()
-            Message.objects.create(thread=thread, role="assistant", content=content, sequence=seq)
+            Message.objects.append(thread, role="assistant", content=content)
             run.status = "succeeded"
             run.save(update_fields=["status"])
             # Create a new job_result inbox item for completion
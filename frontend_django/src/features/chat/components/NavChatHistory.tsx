@@ -6,7 +6,7 @@ import { SidebarGroup, SidebarGroupLabel, SidebarMenu, SidebarMenuItem, SidebarM
 import { Plus } from "lucide-react";
 import { chatApi } from "@/shared/lib/api";
 
-type SessionItem = { id: string; title: string; createdAt: string };
+type SessionItem = { id: string; title: string; createdAt: string; lastMessage?: { role: string; preview: string } | null };
 
 function NavChatHistoryInner() {
   const router = useRouter();
@@ -15,6 +15,7 @@ function NavChatHistoryInner() {
 
   const [items, setItems] = useState<SessionItem[]>([]);
   const [loading, setLoading] = useState<boolean>(false);
+  const [nextBefore, setNextBefore] = useState<string | null>(null);
 
   useEffect(() => {
     let cancelled = false;
@@ -22,7 +23,10 @@ function NavChatHistoryInner() {
       try {
         setLoading(true);
         const res = await chatApi.listSessions();
-        if (!cancelled) setItems(res.items || []);
+        if (!cancelled) {
+          setItems(res.items || []);
+          setNextBefore(res.nextBefore);
+        }
       } catch (e) {
         console.error(e);
       } finally {
@@ -33,6 +37,20 @@ function NavChatHistoryInner() {
     return () => { cancelled = true };
   }, []);
 
+  const onLoadMore = async () => {
+    if (!nextBefore) return;
+    try {
+      setLoading(true);
+      const res = await chatApi.listSessions(nextBefore);
+      setItems(prev => [...prev, ...(res.items || [])]);
+      setNextBefore(res.nextBefore);
+    } catch (e) {
+      console.error(e);
+    } finally {
+      setLoading(false);
+    }
+  };
+
   const onNewChat = async () => {
     try {
       const created = await chatApi.createSession("New chat");
@@ -72,12 +90,19 @@ function NavChatHistoryInner() {
                 sp.set("session", it.id);
                 router.push(`/workspace/chat?${sp.toString()}`);
               }}
-              title={it.title || "Untitled"}
+              title={it.lastMessage?.preview || it.title || "Untitled"}
             >
               <span className="truncate">{it.title || "Untitled"}</span>
             </SidebarMenuButton>
           </SidebarMenuItem>
         ))}
+        {!loading && nextBefore && (
+          <SidebarMenuItem>
+            <SidebarMenuButton onClick={onLoadMore}>
+              <span className="text-muted-foreground">Show more</span>
+            </SidebarMenuButton>
+          </SidebarMenuItem>
+        )}
         {!loading && items.length === 0 && (
           <SidebarMenuItem>
             <SidebarMenuButton disabled>
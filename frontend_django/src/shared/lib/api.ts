@@ -58,9 +58,15 @@ export async function apiStream(path: string, body: any): Promise<Response> {
 
 // Chat API (Django)
 export const chatApi = {
-  listSessions: () => apiFetch(`/api/chat/sessions`, { method: "GET" }) as Promise<{ items: { id: string; title: string; createdAt: string; agentId?: string | null }[] }>,
+  // Most recently active first; pass nextBefore back as `before` for the next page
+  listSessions: (before?: string | null) => apiFetch(`/api/chat/sessions${before ? `?before=${encodeURIComponent(before)}` : ""}`, { method: "GET" }) as Promise<{ items: { id: string; title: string; createdAt: string; updatedAt: string; agentId?: string | null; lastMessage: { role: string; preview: string } | null; messageCount: number }[]; nextBefore: string | null }>,
   createSession: (title: string, agentId?: string) => apiFetch(`/api/chat/sessions`, { method: "POST", body: JSON.stringify({ title, agentId }) }) as Promise<{ id: string; title: string; createdAt: string; agentId?: string | null }>,
-  getSession: (id: string) => apiFetch(`/api/chat/sessions/${id}`, { method: "GET" }) as Promise<{ id: string; title: string; agentId?: string | null; messages: { id: string; role: string; content: string; createdAt: string }[] }>,
+  // Whole history by default; pass limit (and follow nextBefore) to page from the latest
+  getSession: (id: string, page: { limit?: number; before?: number; after?: number; truncate?: number } = {}) => {
+    const q = new URLSearchParams(Object.entries(page).filter(([, v]) => v != null).map(([k, v]) => [k, String(v)])).toString();
+    return apiFetch(`/api/chat/sessions/${id}${q ? `?${q}` : ""}`, { method: "GET" }) as Promise<{ id: string; title: string; agentId?: string | null; messages: { id: string; role: string; content: string; sequence: number; createdAt: string; truncated?: boolean; contentLength?: number }[]; nextBefore: number | null; nextAfter: number | null }>;
+  },
+  getMessage: (id: string, messageId: string) => apiFetch(`/api/chat/sessions/${id}/messages/${messageId}`, { method: "GET" }) as Promise<{ id: string; role: string; content: string; sequence: number; createdAt: string }>,
   appendMessage: (id: string, role: string, content: string) => apiFetch(`/api/chat/sessions/${id}`, { method: "POST", body: JSON.stringify({ role, content }) }) as Promise<{ id: string; role: string; content: string; createdAt: string }>,
   updateSessionAgent: (id: string, agentId: string) => apiFetch(`/api/chat/sessions/${id}`, { method: "PATCH", body: JSON.stringify({ agentId }) }) as Promise<{ id: string; agentId: string }>,
   streamInteractive: (text: string, threadId?: string) => apiStream(`/api/chat/interactive/stream`, { text, thread_id: threadId }),